@@ -0,0 +1,51 @@
+"""
+Benchmark residual evaluations of a multi-control `optimize.Cameras` model.
+
+Usage: python benchmarks/cameras_residuals.py [n_matches] [n_points] [seconds]
+"""
+import glimpse
+from glimpse.imports import (np, sys, time)
+
+def build_model(n_matches=1000, n_points=50, seed=0):
+    """
+    Return a `Cameras` model of `RotationMatches` between consecutive cameras.
+
+    Arguments:
+        n_matches (int): Number of `RotationMatches` (cameras - 1)
+        n_points (int): Number of point pairs per `RotationMatches`
+        seed (int): Random seed
+    """
+    np.random.seed(seed)
+    cams = [glimpse.Camera(viewdir=(0.01 * i, 0, 0), imgsz=(800, 600), f=(600, 600))
+        for i in range(n_matches + 1)]
+    uv = np.random.uniform((0, 0), (800, 600), size=(n_points, 2))
+    matches = [glimpse.optimize.RotationMatches((camA, camB), (uv, uv + 1))
+        for camA, camB in zip(cams[:-1], cams[1:])]
+    return glimpse.optimize.Cameras(cams, matches,
+        cam_params=[dict(viewdir=True)] * len(cams), sparsity=False)
+
+def evaluations_per_second(model, seconds=5):
+    """
+    Return the number of full residual evaluations per second.
+
+    Arguments:
+        model (`optimize.Cameras`): Model
+        seconds (float): Minimum duration of the benchmark
+    """
+    params = np.array(list(model.params.valuesdict().values()))
+    model.residuals(params=params)
+    n = 0
+    start = time.time()
+    while time.time() - start < seconds:
+        model.residuals(params=params)
+        n += 1
+    return n / (time.time() - start)
+
+if __name__ == '__main__':
+    args = [float(arg) for arg in sys.argv[1:]]
+    n_matches, n_points = [int(arg) for arg in args[:2]] + [1000, 50][len(args[:2]):]
+    seconds = args[2] if len(args) > 2 else 5
+    model = build_model(n_matches=n_matches, n_points=n_points)
+    rate = evaluations_per_second(model, seconds=seconds)
+    print('{0} RotationMatches x {1} points: {2:.2f} residual evaluations / s'.format(
+        n_matches, n_points, rate))
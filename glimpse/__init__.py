@@ -1,5 +1,5 @@
-from .image import (Camera, Image, Exif)
+from .image import (Camera, CameraArray, Image, Exif)
 from .observer import (Observer)
 from .tracker import (Tracker, Tracks, CartesianMotionModel, CylindricalMotionModel)
-from .raster import (Grid, Raster, RasterInterpolant)
+from .raster import (Grid, Raster, LazyRaster, RasterInterpolant)
 from . import (helpers, optimize, svg, convert, config, unumpy)
@@ -1,14 +1,14 @@
 from .imports import sharedmem
 _MapReduce = sharedmem.MapReduce
+_MapReduceBackends = dict(
+    process=sharedmem.MapReduce,
+    thread=sharedmem.MapReduceByThread
+)
 _UseMatMul = True
 
 def set_sharedmem_backend(backend):
-    backends = dict(
-        process=sharedmem.MapReduce,
-        thread=sharedmem.MapReduceByThread
-    )
     global _MapReduce
-    _MapReduce = backends[backend]
+    _MapReduce = _MapReduceBackends[backend]
 
 def use_numpy_matmul(flag):
     global _UseMatMul
@@ -4,6 +4,7 @@ from .imports import (require,
     np, pickle, pyproj, json, collections, copy, pandas, scipy, gzip, PIL,
     sklearn, cv2, copyreg, os, re, datetime, matplotlib, shapely, sharedmem,
     sys, progress, osgeo)
+from . import config
 
 # ---- General ---- #
 
@@ -338,6 +339,104 @@ def _pickle_cv2_keypoints(k):
     return cv2.KeyPoint, (k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave, k.class_id)
 copyreg.pickle(cv2.KeyPoint().__class__, _pickle_cv2_keypoints)
 
+# ---- Keypoints ---- #
+
+def keypoints_to_array(keypoints):
+    """
+    Return keypoints as a structured array.
+
+    Descriptors are not included, so that they can be kept (and memory-mapped)
+    as a separate contiguous array (see `write_keypoints()`).
+
+    Arguments:
+        keypoints (iterable): Keypoints as `cv2.KeyPoint` objects
+
+    Returns:
+        array: Structured array with fields x, y, size, angle, response, octave
+    """
+    dtype = [('x', 'f4'), ('y', 'f4'), ('size', 'f4'), ('angle', 'f4'),
+        ('response', 'f4'), ('octave', 'i4')]
+    array = np.empty(len(keypoints), dtype=dtype)
+    if len(keypoints):
+        array['x'], array['y'] = np.array([k.pt for k in keypoints], dtype=np.float32).T
+        for field in ('size', 'angle', 'response', 'octave'):
+            array[field] = [getattr(k, field) for k in keypoints]
+    return array
+
+def keypoint_coordinates(keypoints):
+    """
+    Return the image coordinates of keypoints.
+
+    Arguments:
+        keypoints: Keypoints as a structured array (see `keypoints_to_array()`)
+            or `cv2.KeyPoint` objects
+
+    Returns:
+        array: Image coordinates (n, 2)
+    """
+    if isinstance(keypoints, np.ndarray) and keypoints.dtype.names:
+        return np.column_stack((keypoints['x'], keypoints['y'])).astype(float)
+    else:
+        return np.array([k.pt for k in keypoints], dtype=float).reshape(-1, 2)
+
+def descriptors_path(path):
+    """
+    Return the path of the descriptors file paired with a '.npy' keypoints file.
+
+    Arguments:
+        path (str): Path to keypoints file ('*.npy')
+
+    Returns:
+        str: Path to descriptors file ('*.descriptors.npy')
+    """
+    return path[:-len('.npy')] + '.descriptors.npy'
+
+def write_keypoints(keypoints, path):
+    """
+    Write keypoints and descriptors to file.
+
+    Files ending in '.npy' are written as a structured array (see `keypoints_to_array()`),
+    with descriptors written as a contiguous float32 array to `descriptors_path(path)`.
+    All others are written as a binary `pickle` of the keypoints tuple.
+
+    Arguments:
+        keypoints (tuple): Keypoints (structured array or `cv2.KeyPoint` objects) and descriptors
+        path (str): Path to file
+    """
+    if path.endswith('.npy'):
+        array, descriptors = keypoints
+        if not (isinstance(array, np.ndarray) and array.dtype.names):
+            array = keypoints_to_array(array)
+        if descriptors is None:
+            descriptors = np.empty((len(array), 0), dtype=np.float32)
+        make_path_directories(path, is_file=True)
+        np.save(path, array)
+        np.save(descriptors_path(path), np.ascontiguousarray(descriptors, dtype=np.float32))
+    else:
+        write_pickle(keypoints, path)
+
+def read_keypoints(path, mmap_mode='r'):
+    """
+    Read keypoints and descriptors from file.
+
+    Files ending in '.npy' are read (memory-mapped) as a structured array,
+    without creating `cv2.KeyPoint` objects, and descriptors are memory-mapped
+    as a contiguous float32 array from `descriptors_path(path)`.
+
+    Arguments:
+        path (str): Path to file
+        mmap_mode (str): Memory-map mode passed to `numpy.load()` for '.npy' files
+
+    Returns:
+        tuple: Keypoints (structured array or `cv2.KeyPoint` objects) and descriptors
+    """
+    if path.endswith('.npy'):
+        array = np.load(path, mmap_mode=mmap_mode)
+        descriptors = np.load(descriptors_path(path), mmap_mode=mmap_mode)
+        return array, descriptors
+    else:
+        return read_pickle(path)
+
 # ---- JSON ---- #
 
 def read_json(path, **kwargs):
@@ -426,13 +525,18 @@ def gaussian_filter(array, mask=None, fill=False, **kwargs):
         return scipy.ndimage.filters.gaussian_filter(array, **kwargs)
     else:
         x = array.copy()
-        x[~mask] = 0
+        excluded = ~mask
+        x[excluded] = 0
         xf = scipy.ndimage.filters.gaussian_filter(x, **kwargs)
         x[mask] = 1
         xf_sum = scipy.ndimage.filters.gaussian_filter(x, **kwargs)
-        x = xf / xf_sum
+        if np.issubdtype(xf.dtype, np.floating):
+            # Reuse buffer
+            x = np.divide(xf, xf_sum, out=xf)
+        else:
+            x = xf / xf_sum
         if not fill:
-            x[~mask] = array[~mask]
+            x[excluded] = array[excluded]
         return x
 
 def maximum_filter(array, mask=None, fill=False, **kwargs):
@@ -489,6 +593,82 @@ def median_filter(array, mask=None, fill=False, **kwargs):
             x[mask] = array[mask]
         return x
 
+def gaussian_filter_radius(sigma, truncate=4.0, **kwargs):
+    """
+    Return the radius of influence of `gaussian_filter()`.
+
+    Arguments:
+        sigma: Standard deviation of the gaussian kernel, for all or each axis
+        truncate (float): Truncation of the kernel in standard deviations
+        **kwargs (dict): Other arguments to `gaussian_filter()` (ignored)
+
+    Returns:
+        array: Number of cells (rows, cols)
+    """
+    sigma = np.broadcast_to(sigma, (2, ))
+    return np.array([int(truncate * float(s) + 0.5) for s in sigma])
+
+def maximum_filter_radius(size=None, footprint=None, origin=0, **kwargs):
+    """
+    Return the radius of influence of `maximum_filter()`.
+
+    Arguments:
+        size: Shape of the filter, for all or each axis
+        footprint (array): Boolean filter footprint (overrides `size`)
+        origin: Placement of the filter, for all or each axis
+        **kwargs (dict): Other arguments to `maximum_filter()` (ignored)
+
+    Returns:
+        array: Number of cells (rows, cols)
+    """
+    if footprint is not None:
+        size = np.shape(footprint)
+    size = np.broadcast_to(size, (2, ))
+    return size // 2 + np.abs(np.broadcast_to(origin, (2, )))
+
+def tiled_filter(fun, array, tiles, halo, mask=None, parallel=False, **kwargs):
+    """
+    Return an array filtered in tiles.
+
+    Each tile is filtered together with a surrounding halo of cells, so that
+    results are identical to filtering the whole array as long as the halo
+    covers the radius of influence of the filter
+    (see `gaussian_filter_radius()` and `maximum_filter_radius()`).
+
+    Arguments:
+        fun (callable): Filter with signature `fun(array, mask=None, **kwargs)`
+        array (array): 2-dimensional array to filter
+        tiles (iterable): Pairs of slice objects (rows, cols) covering `array`
+            (see `Grid.tile_indices()`)
+        halo (iterable): Number of cells (rows, cols) to include around each tile
+        mask (array): Boolean mask of cells to include (True) or exclude (False).
+            If `None`, all cells are included.
+        parallel: Number of parallel processes (int),
+            or whether to work in parallel (bool). If `True`,
+            defaults to `os.cpu_count()`.
+        **kwargs (dict): Additional arguments to `fun`
+    """
+    parallel = _parse_parallel(parallel)
+    halo = np.broadcast_to(halo, (2, ))
+    results = dict(array=None)
+    def process(rows, cols):
+        start = max(rows.start - halo[0], 0), max(cols.start - halo[1], 0)
+        padded = (
+            slice(start[0], min(rows.stop + halo[0], array.shape[0])),
+            slice(start[1], min(cols.stop + halo[1], array.shape[1])))
+        x = fun(array[padded],
+            mask=None if mask is None else mask[padded], **kwargs)
+        return rows, cols, x[
+            (rows.start - start[0]):(rows.stop - start[0]),
+            (cols.start - start[1]):(cols.stop - start[1])]
+    def reduce(rows, cols, x):
+        if results['array'] is None:
+            results['array'] = np.empty(array.shape, dtype=x.dtype)
+        results['array'][rows, cols] = x
+    with config._MapReduce(np=parallel) as pool:
+        pool.map(func=process, reduce=reduce, star=True, sequence=tuple(tiles))
+    return results['array']
+
 # ---- Arrays: Images ---- #
 
 # NOTE: Unused
@@ -843,6 +1023,48 @@ def boolean_split(x, mask, axis=0, circular=False, include='all'):
     else:
         return list()
 
+def kabsch_rotation(a, b, weights=None):
+    """
+    Return the rotation that best aligns one set of vectors with another.
+
+    Finds the rotation matrix `R` that minimizes the (weighted) sum of squared
+    differences `|R a_i - b_i|^2` with the Kabsch algorithm
+    (https://en.wikipedia.org/wiki/Kabsch_algorithm).
+    Stacks of vector sets are solved independently.
+
+    Arguments:
+        a (array): Vectors to rotate (..., n, 3)
+        b (array): Target vectors (..., n, 3)
+        weights (array): Weight of each vector pair (..., n)
+
+    Returns:
+        array: Rotation matrix (..., 3, 3)
+    """
+    a = np.asarray(a)
+    if weights is not None:
+        a = a * np.expand_dims(weights, axis=-1)
+    H = np.einsum('...na,...nb->...ab', a, b)
+    return kabsch_covariance_rotation(H)
+
+def kabsch_covariance_rotation(H):
+    """
+    Return the rotation that maximizes the alignment of a covariance matrix.
+
+    Arguments:
+        H (array): Cross-covariance matrix `sum(a_i b_i^T)` (..., 3, 3)
+            (see `kabsch_rotation()`)
+
+    Returns:
+        array: Rotation matrix (..., 3, 3)
+    """
+    U, S, Vt = np.linalg.svd(H)
+    V = np.swapaxes(Vt, -1, -2)
+    Ut = np.swapaxes(U, -1, -2)
+    # Correct for reflection
+    d = np.sign(np.linalg.det(np.matmul(V, Ut)))
+    V[..., :, 2] *= np.expand_dims(d, axis=-1)
+    return np.matmul(V, Ut)
+
 def project_points_plane(points, plane):
     """
     Return projection of points on plane.
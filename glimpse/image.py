@@ -166,32 +166,80 @@ class Camera(object):
         #   rr = [C3 S3 0; -S3 C3 0; 0 0 1];
         # Apply all rotations in order
         #   R = rr * rp * ry * ri;
-        radians = np.deg2rad(self.viewdir)
+        return self.__class__._rotation_matrix(self.viewdir)
+
+    @property
+    def Rprime(self):
+        return self.__class__._rotation_matrix_prime(self.viewdir)
+
+    @staticmethod
+    def _rotation_matrix(viewdir):
+        """
+        Return the rotation matrix for view directions.
+
+        Arguments:
+            viewdir (array_like): View direction in degrees (3, ) or (n, 3)
+
+        Returns:
+            array: Rotation matrix (3, 3) or (n, 3, 3) (see `R`)
+        """
+        radians = np.deg2rad(viewdir).T
         C = np.cos(radians)
         S = np.sin(radians)
-        return np.array([
+        R = np.array([
             [C[0] * C[2] + S[0] * S[1] * S[2],  C[0] * S[1] * S[2] - C[2] * S[0], -C[1] * S[2]],
             [C[2] * S[0] * S[1] - C[0] * S[2],  S[0] * S[2] + C[0] * C[2] * S[1], -C[1] * C[2]],
             [C[1] * S[0]                     ,  C[0] * C[1]                     ,  S[1]       ]
         ])
+        return np.moveaxis(R, (0, 1), (-2, -1))
 
-    @property
-    def Rprime(self):
-        radians = np.deg2rad(self.viewdir)
+    @staticmethod
+    def _rotation_matrix_viewdir(R):
+        """
+        Return the view direction of a rotation matrix.
+
+        Inverse of `_rotation_matrix()` for pitch within (-90, 90) degrees.
+
+        Arguments:
+            R (array): Rotation matrix (3, 3) or (n, 3, 3)
+
+        Returns:
+            array: View direction in degrees (3, ) or (n, 3)
+        """
+        R = np.asarray(R)
+        radians = np.stack((
+            np.arctan2(R[..., 2, 0], R[..., 2, 1]),
+            np.arcsin(np.clip(R[..., 2, 2], -1, 1)),
+            np.arctan2(-R[..., 0, 2], -R[..., 1, 2])), axis=-1)
+        return np.rad2deg(radians)
+
+    @staticmethod
+    def _rotation_matrix_prime(viewdir):
+        """
+        Return the derivative of the rotation matrix for view directions.
+
+        Arguments:
+            viewdir (array_like): View direction in degrees (3, ) or (n, 3)
+
+        Returns:
+            array: Derivatives (3, 3, 3) or (n, 3, 3, 3) (see `Rprime`)
+        """
+        radians = np.deg2rad(viewdir).T
         C = np.cos(radians)
         S = np.sin(radians)
+        Z = np.zeros_like(C[0])
         Rprime = np.stack((
             [[ C[0] * S[1] * S[2] - S[0] * C[2],  S[0] * S[2] + C[0] * S[1] * C[2],  C[0] * C[1]],
              [-S[0] * S[1] * S[2] - C[0] * C[2],  C[0] * S[2] - S[0] * S[1] * C[2], -S[0] * C[1]],
-             [ 0                               ,  0                               ,  0]],
+             [ Z                               ,  Z                               ,  Z]],
             [[ S[0] * C[1] * S[2]              ,  S[0] * C[1] * C[2]              , -S[0] * S[1]],
              [ C[0] * C[1] * S[2]              ,  C[0] * C[1] * C[2]              , -C[0] * S[1]],
              [ S[1] * S[2]                     ,  S[1] * C[2]                     ,  C[1]]],
-            [[ S[0] * S[1] * C[2] - C[0] * S[2], -S[0] * S[1] * S[2] - C[0] * C[2],  0],
-             [ S[0] * S[2] + C[0] * S[1] * C[2],  S[0] * C[2] - C[0] * S[1] * S[2],  0],
-             [-C[1] * C[2]                     ,  C[1] * S[2]                     ,  0]]
+            [[ S[0] * S[1] * C[2] - C[0] * S[2], -S[0] * S[1] * S[2] - C[0] * C[2],  Z],
+             [ S[0] * S[2] + C[0] * S[1] * C[2],  S[0] * C[2] - C[0] * S[1] * S[2],  Z],
+             [-C[1] * C[2]                     ,  C[1] * S[2]                     ,  Z]]
         ), axis=1)
-        return Rprime * (np.pi / 180)
+        return np.moveaxis(Rprime, (0, 1, 2), (-3, -2, -1)) * (np.pi / 180)
 
     @property
     def original_imgsz(self):
@@ -658,6 +706,7 @@ class Camera(object):
 
         Arguments:
             dem (`Raster`): `Raster` object containing elevations.
+                A `LazyRaster` is read one tile at a time.
             values (array): Values to use in building the image.
                 Must have the same 2-dimensional shape as `dem.Z` but can have
                 multiple layers stacked along the 3rd dimension.
@@ -688,8 +737,6 @@ class Camera(object):
         """
         assert values is None or values.shape[0:2] == dem.shape
         assert mask is None or mask.shape == dem.shape
-        if mask is None:
-            mask = ~np.isnan(dem.Z)
         parallel = helpers._parse_parallel(parallel)
         has_values = values is not None
         if not has_values and not return_depth:
@@ -710,11 +757,16 @@ class Camera(object):
         # Define parallel process
         bar = helpers._progress_bar(max=ntiles)
         def process(ij):
-            tile_mask = mask[ij]
+            if mask is None:
+                tile = dem[ij]
+                tile_mask = ~np.isnan(tile.Z)
+            else:
+                tile_mask = mask[ij]
             if not np.count_nonzero(tile_mask):
                 # No cells selected
                 return None
-            tile = dem[ij]
+            if mask is not None:
+                tile = dem[ij]
             if has_values:
                 tile_values = values[ij]
             # Scale tile based on distance from camera
@@ -1121,6 +1173,487 @@ class Camera(object):
         y = (uv[1] - (self.imgsz[1] * 0.5 + self.c[1])) * (1 / self.f[1])
         return helpers.grid_to_points(np.meshgrid(x, y))
 
+    def _distort_jacobian(self, xy):
+        """
+        Return the derivatives of distorted camera coordinates.
+
+        Arguments:
+            xy (array): Camera coordinates (n, 2)
+
+        Returns:
+            array: Distorted camera coordinates (n, 2)
+            array: Derivatives with respect to `xy` (n, 2, 2)
+            array: Derivatives with respect to `k` and `p` (n, 2, 8)
+        """
+        x, y = xy[:, 0], xy[:, 1]
+        r2 = x**2 + y**2
+        k, p = self.k, self.p
+        # dr = num / den (see _radial_distortion())
+        num = 1 + r2 * (k[0] + r2 * (k[1] + r2 * k[2]))
+        den = 1 + r2 * (k[3] + r2 * (k[4] + r2 * k[5]))
+        dr = num / den
+        ddr = ((k[0] + r2 * (2 * k[1] + 3 * r2 * k[2])) * den -
+            (k[3] + r2 * (2 * k[4] + 3 * r2 * k[5])) * num) / den**2
+        xty = x * y
+        dxy = xy * dr[:, None] + self._tangential_distortion(xy, r2)
+        # Derivatives with respect to xy
+        dxy_xy = np.empty((len(xy), 2, 2))
+        dxy_xy[:, 0, 0] = dr + 2 * x**2 * ddr + 2 * y * p[0] + 6 * x * p[1]
+        dxy_xy[:, 0, 1] = 2 * xty * ddr + 2 * x * p[0] + 2 * y * p[1]
+        dxy_xy[:, 1, 0] = dxy_xy[:, 0, 1]
+        dxy_xy[:, 1, 1] = dr + 2 * y**2 * ddr + 6 * y * p[0] + 2 * x * p[1]
+        # Derivatives with respect to k, p
+        powers = np.column_stack((r2, r2**2, r2**3))
+        ddr_k = np.hstack((powers, -powers * dr[:, None])) / den[:, None]
+        dxy_kp = np.empty((len(xy), 2, 8))
+        dxy_kp[:, :, 0:6] = xy[:, :, None] * ddr_k[:, None, :]
+        dxy_kp[:, 0, 6] = 2 * xty
+        dxy_kp[:, 1, 6] = r2 + 2 * y**2
+        dxy_kp[:, 0, 7] = r2 + 2 * x**2
+        dxy_kp[:, 1, 7] = 2 * xty
+        return dxy, dxy_xy, dxy_kp
+
+    def _world2camera_jacobian(self, xyz, directions=False, correction=False):
+        """
+        Return the derivatives of camera coordinates projected from world coordinates.
+
+        Arguments:
+            xyz (array): World coordinates (n, 3)
+            directions (bool): Whether `xyz` are absolute coordinates (False)
+                or ray directions (True)
+            correction: Arguments to `helpers.elevation_corrections()` (dict),
+                `True` for default arguments, or `None` or `False` to skip.
+                Only applies if `directions` is `False`.
+
+        Returns:
+            array: Camera coordinates (n, 2)
+            array: Derivatives with respect to `vector` (n, 2, 20)
+            array: Derivatives with respect to `xyz` (n, 2, 3)
+        """
+        if directions:
+            dxyz = xyz
+        else:
+            dxyz = xyz - self.xyz
+            if correction is True:
+                correction = dict()
+            if isinstance(correction, dict):
+                # Apply elevation correction
+                dxyz[:, 2] += helpers.elevation_corrections(
+                    squared_distances=np.sum(dxyz[:, 0:2]**2, axis=1),
+                    **correction)
+        R = self.R
+        xyz_c = np.dot(dxyz, R.T)
+        xy = xyz_c[:, 0:2] / xyz_c[:, 2:3]
+        # Derivatives of perspective division
+        dxy_c = np.zeros((len(xyz_c), 2, 3))
+        dxy_c[:, 0, 0] = dxy_c[:, 1, 1] = 1 / xyz_c[:, 2]
+        dxy_c[:, :, 2] = -xy / xyz_c[:, 2:3]
+        dxy_xyz = np.matmul(dxy_c, R)
+        jacobian = np.zeros((len(xyz_c), 2, 20))
+        # viewdir: Rprime[:, i, :] is the transpose of dR / dviewdir[i]
+        jacobian[:, :, 3:6] = np.matmul(dxy_c,
+            np.einsum('jik,nj->nki', self.Rprime, dxyz))
+        if not directions:
+            if isinstance(correction, dict):
+                # Correction is linear in squared horizontal distance
+                slope = helpers.elevation_corrections(squared_distances=1,
+                    **correction)
+                dxy_xyz[:, :, 0:2] += dxy_xyz[:, :, 2:3] * 2 * slope * dxyz[:, None, 0:2]
+            # xyz
+            jacobian[:, :, 0:3] = -dxy_xyz
+        # Set points behind camera to NaN
+        behind = xyz_c[:, 2] <= 0
+        xy[behind, :] = np.nan
+        jacobian[behind] = np.nan
+        return xy, jacobian, dxy_xyz
+
+    def _camera2image_jacobian(self, xy):
+        """
+        Return the derivatives of image coordinates projected from camera coordinates.
+
+        Arguments:
+            xy (array): Camera coordinates (n, 2)
+
+        Returns:
+            array: Derivatives with respect to `vector` (n, 2, 20)
+            array: Derivatives with respect to `xy` (n, 2, 2)
+        """
+        dxy, dxy_xy, dxy_kp = self._distort_jacobian(xy)
+        f = self.f[None, :, None]
+        jacobian = np.zeros((len(xy), 2, 20))
+        # imgsz
+        jacobian[:, 0, 6] = jacobian[:, 1, 7] = 0.5
+        # f
+        jacobian[:, 0, 8], jacobian[:, 1, 9] = dxy[:, 0], dxy[:, 1]
+        # c
+        jacobian[:, 0, 10] = jacobian[:, 1, 11] = 1
+        # k, p
+        jacobian[:, :, 12:20] = f * dxy_kp
+        return jacobian, f * dxy_xy
+
+    def _image2camera_jacobian(self, xy):
+        """
+        Return the derivatives of camera coordinates projected from image coordinates.
+
+        Derivatives of the undistortion are computed by implicit differentiation
+        of the distortion model.
+
+        Arguments:
+            xy (array): Camera coordinates (n, 2), as returned by `_image2camera()`
+
+        Returns:
+            array: Derivatives with respect to `vector` (n, 2, 20)
+        """
+        dxy, dxy_xy, dxy_kp = self._distort_jacobian(xy)
+        # Derivatives of distorted coordinates: (uv - (imgsz / 2 + c)) / f
+        jacobian = np.zeros((len(xy), 2, 20))
+        jacobian[:, 0, 6], jacobian[:, 1, 7] = -0.5 / self.f
+        jacobian[:, 0, 8], jacobian[:, 1, 9] = (-dxy / self.f).T
+        jacobian[:, 0, 10], jacobian[:, 1, 11] = -1 / self.f
+        jacobian[:, :, 12:20] = -dxy_kp
+        return np.linalg.solve(dxy_xy, jacobian)
+
+    def _camera2world_jacobian(self, xy):
+        """
+        Return the derivatives of world ray directions projected from camera coordinates.
+
+        Arguments:
+            xy (array): Camera coordinates (n, 2)
+
+        Returns:
+            array: Derivatives with respect to `vector` (n, 3, 20)
+            array: Derivatives with respect to `xy` (n, 3, 2)
+        """
+        xy_hat = np.column_stack((xy, np.ones(len(xy))))
+        jacobian = np.zeros((len(xy), 3, 20))
+        # viewdir: Rprime[:, i, :] is the transpose of dR / dviewdir[i]
+        jacobian[:, :, 3:6] = np.einsum('jik,nk->nji', self.Rprime, xy_hat)
+        dxyz_xy = np.broadcast_to(self.R.T[:, 0:2], (len(xy), 3, 2))
+        return jacobian, dxyz_xy
+
+    def _project_jacobian(self, xyz, directions=False, correction=False):
+        """
+        Return the derivatives of image coordinates projected from world coordinates.
+
+        See `project()` for details.
+
+        Arguments:
+            xyz (array): World coordinates (n, 3)
+            directions (bool): Whether `xyz` are absolute coordinates (False)
+                or ray directions (True)
+            correction: Arguments to `helpers.elevation_corrections()` (dict),
+                `True` for default arguments, or `None` or `False` to skip.
+
+        Returns:
+            array: Derivatives with respect to `vector` (n, 2, 20)
+            array: Derivatives with respect to `xyz` (n, 2, 3)
+        """
+        xy, world_jacobian, dxy_xyz = self._world2camera_jacobian(xyz,
+            directions=directions, correction=correction)
+        jacobian, duv_xy = self._camera2image_jacobian(xy)
+        jacobian += np.matmul(duv_xy, world_jacobian)
+        return jacobian, np.matmul(duv_xy, dxy_xyz)
+
+class CameraArray(object):
+    """
+    Stack of distorted camera models.
+
+    A `CameraArray` stores the vectors of many cameras in a single array,
+    so that world coordinates can be projected into (and image coordinates
+    projected out of) all cameras at once by broadcasting,
+    rather than by looping over `Camera` objects.
+
+    Cameras are indexed like a list: an integer returns a `Camera` whose
+    :attr:`Camera.vector` is a view into :attr:`vectors`
+    (so that changes to either are shared), while a slice or array
+    returns a new `CameraArray`.
+
+    Attributes:
+        vectors (numpy.ndarray): Camera vectors (n, 20) (see :attr:`Camera.vector`)
+        xyz (numpy.ndarray): Positions in world coordinates (n, 3)
+        viewdir (numpy.ndarray): View directions in degrees (n, 3)
+        imgsz (numpy.ndarray): Image sizes in pixels (n, 2)
+        f (numpy.ndarray): Focal lengths in pixels (n, 2)
+        c (numpy.ndarray): Principal point offsets in pixels (n, 2)
+        k (numpy.ndarray): Radial distortion coefficients (n, 6)
+        p (numpy.ndarray): Tangential distortion coefficients (n, 2)
+        R (numpy.ndarray): Rotation matrices (n, 3, 3) (see :attr:`Camera.R`)
+    """
+
+    def __init__(self, vectors):
+        self.vectors = np.atleast_2d(np.asarray(vectors, dtype=float))[:, 0:20]
+
+    # ---- Properties (dependent) ----
+
+    @property
+    def xyz(self):
+        return self.vectors[:, 0:3]
+
+    @property
+    def viewdir(self):
+        return self.vectors[:, 3:6]
+
+    @property
+    def imgsz(self):
+        return self.vectors[:, 6:8]
+
+    @property
+    def f(self):
+        return self.vectors[:, 8:10]
+
+    @property
+    def c(self):
+        return self.vectors[:, 10:12]
+
+    @property
+    def k(self):
+        return self.vectors[:, 12:18]
+
+    @property
+    def p(self):
+        return self.vectors[:, 18:20]
+
+    @property
+    def R(self):
+        return Camera._rotation_matrix(self.viewdir)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def __getitem__(self, index):
+        if np.issubdtype(type(index), np.integer):
+            return Camera(vector=self.vectors[index])
+        return CameraArray(self.vectors[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    # ----- Methods (class) ----
+
+    @classmethod
+    def from_cameras(cls, cams):
+        """
+        Return a `CameraArray` from cameras.
+
+        Arguments:
+            cams (iterable): `Camera` objects
+
+        Returns:
+            `CameraArray`: Copy of the camera vectors
+        """
+        return cls(np.row_stack([cam.vector for cam in cams]))
+
+    # ---- Methods (public) ----
+
+    def to_cameras(self):
+        """
+        Return the cameras as a list of independent `Camera` objects.
+        """
+        return [Camera(vector=vector.copy()) for vector in self.vectors]
+
+    def copy(self):
+        """
+        Return a copy.
+        """
+        return CameraArray(self.vectors.copy())
+
+    def project(self, xyz, directions=False, correction=False,
+        return_depth=False):
+        """
+        Project world coordinates to image coordinates in all cameras.
+
+        Arguments:
+            xyz (array): World coordinates, either shared by all cameras (m, 3)
+                or specific to each camera (n, m, 3)
+            directions (bool): Whether `xyz` are absolute coordinates (False)
+                or ray directions (True)
+            correction: Arguments to `helpers.elevation_corrections()` (dict),
+                `True` for default arguments, or `None` or `False` to skip.
+                Only applies if `directions` is `False`.
+            return_depth (bool): Whether to return the distance of each point
+                along each camera's optical axis
+
+        Returns:
+            array: Image coordinates (n, m, 2)
+            array (optional): Point depth (n, m)
+        """
+        xy = self._world2camera(xyz, directions=directions,
+            correction=correction, return_depth=return_depth)
+        if return_depth:
+            xy, depth = xy
+        uv = self._camera2image(xy)
+        if return_depth:
+            return uv, depth
+        else:
+            return uv
+
+    def invproject(self, uv, directions=True, depth=1):
+        """
+        Project image coordinates to world coordinates or ray directions in all cameras.
+
+        Arguments:
+            uv (array): Image coordinates, either shared by all cameras (m, 2)
+                or specific to each camera (n, m, 2)
+            directions (bool): Whether to return world ray directions relative
+                to each camera position (True) or absolute coordinates by adding
+                on each camera position (False)
+            depth: Distance of rays along each camera's optical axis, as either a
+                scalar, a vector (m, ), or an array (n, m)
+
+        Returns:
+            array: World coordinates or ray directions (n, m, 3)
+        """
+        xy = self._image2camera(uv)
+        return self._camera2world(xy, directions=directions, depth=depth)
+
+    def inframe(self, uv):
+        """
+        Test whether image coordinates are in or on each image frame.
+
+        Arguments:
+            uv (array): Image coordinates (n, m, 2)
+
+        Returns:
+            array: Whether each point is in frame (n, m)
+        """
+        return np.all((uv >= 0) & (uv <= self.imgsz[:, None, :]), axis=-1)
+
+    # ---- Methods (private) ----
+
+    def _distort(self, xy):
+        """
+        Apply distortion to camera coordinates.
+
+        Arguments:
+            xy (array): Camera coordinates (n, m, 2)
+        """
+        # X' = dr * X + dt
+        if not self.k.any() and not self.p.any():
+            return xy
+        k = self.k[:, None, :]
+        p = self.p[:, None, :]
+        r2 = np.sum(xy**2, axis=-1)
+        r4 = r2 * r2
+        r6 = r4 * r2
+        dr = ((1 + k[..., 0] * r2 + k[..., 1] * r4 + k[..., 2] * r6) /
+            (1 + k[..., 3] * r2 + k[..., 4] * r4 + k[..., 5] * r6))
+        x, y = xy[..., 0], xy[..., 1]
+        xty = x * y
+        dt = np.stack((
+            2 * xty * p[..., 0] + p[..., 1] * (r2 + 2 * x**2),
+            p[..., 0] * (r2 + 2 * y**2) + 2 * xty * p[..., 1]), axis=-1)
+        return xy * dr[..., None] + dt
+
+    def _undistort(self, xy, iterations=20):
+        """
+        Remove distortion from camera coordinates.
+
+        Uses the iterative Oulu University method for all cameras at once
+        (see `Camera._undistort_oulu()`).
+
+        Arguments:
+            xy (array): Camera coordinates (n, m, 2)
+            iterations (int): Number of iterations
+        """
+        # X = (X' - dt) / dr
+        if not self.k.any() and not self.p.any():
+            return xy
+        k = self.k[:, None, :]
+        p = self.p[:, None, :]
+        uxy = xy
+        for _ in range(iterations):
+            r2 = np.sum(uxy**2, axis=-1)
+            r4 = r2 * r2
+            r6 = r4 * r2
+            dr = ((1 + k[..., 0] * r2 + k[..., 1] * r4 + k[..., 2] * r6) /
+                (1 + k[..., 3] * r2 + k[..., 4] * r4 + k[..., 5] * r6))
+            x, y = uxy[..., 0], uxy[..., 1]
+            xty = x * y
+            dt = np.stack((
+                2 * xty * p[..., 0] + p[..., 1] * (r2 + 2 * x**2),
+                p[..., 0] * (r2 + 2 * y**2) + 2 * xty * p[..., 1]), axis=-1)
+            uxy = (xy - dt) * (1 / dr[..., None])
+        return uxy
+
+    def _world2camera(self, xyz, directions=False, correction=False,
+        return_depth=False):
+        """
+        Project world coordinates to camera coordinates.
+
+        Arguments:
+            xyz (array): World coordinates (m, 3) or (n, m, 3)
+            directions (bool): Whether `xyz` are absolute coordinates (False)
+                or ray directions (True)
+            correction: Arguments to `helpers.elevation_corrections()` (dict),
+                `True` for default arguments, or `None` or `False` to skip.
+                Only applies if `directions` is `False`.
+            return_depth (bool): Whether to return the distance of each point
+                along each camera's optical axis
+        """
+        if directions:
+            dxyz = xyz
+        else:
+            dxyz = xyz - self.xyz[:, None, :]
+            if correction is True:
+                correction = dict()
+            if isinstance(correction, dict):
+                # Apply elevation correction
+                dxyz[..., 2] += helpers.elevation_corrections(
+                    squared_distances=np.sum(dxyz[..., 0:2]**2, axis=-1),
+                    **correction)
+        # Convert coordinates to ray directions (n, m, 3)
+        xyz_c = np.matmul(dxyz, np.swapaxes(self.R, 1, 2))
+        # Normalize by perspective division
+        xy = xyz_c[..., 0:2] / xyz_c[..., 2:3]
+        # Set points behind camera to NaN
+        xy[xyz_c[..., 2] <= 0] = np.nan
+        if return_depth:
+            return xy, xyz_c[..., 2]
+        else:
+            return xy
+
+    def _camera2world(self, xy, directions=True, depth=1):
+        """
+        Project camera coordinates to world coordinates or ray directions.
+
+        Arguments:
+            xy (array): Camera coordinates (n, m, 2)
+            directions (bool): Whether to return world ray directions relative
+                to each camera position (True) or absolute coordinates by adding
+                on each camera position (False)
+            depth: Distance of rays along each camera's optical axis, as either a
+                scalar, a vector (m, ), or an array (n, m)
+        """
+        R = self.R
+        # Multiply 2-d coordinates and simulate z = 1 with 3rd row of rotation matrix
+        xyz = np.einsum('nmi,nij->nmj', xy, R[:, 0:2, :]) + R[:, None, 2, :]
+        if np.any(depth != 1):
+            xyz *= np.asarray(depth, dtype=float)[..., None]
+        if not directions:
+            xyz += self.xyz[:, None, :]
+        return xyz
+
+    def _camera2image(self, xy):
+        """
+        Project camera to image coordinates.
+
+        Arguments:
+            xy (array): Camera coordinates (n, m, 2)
+        """
+        xy = self._distort(xy)
+        return xy * self.f[:, None, :] + (self.imgsz / 2 + self.c)[:, None, :]
+
+    def _image2camera(self, uv):
+        """
+        Project image to camera coordinates.
+
+        Arguments:
+            uv (array): Image coordinates (m, 2) or (n, m, 2)
+        """
+        xy = (uv - (self.imgsz * 0.5 + self.c)[:, None, :]) * (1 / self.f[:, None, :])
+        return self._undistort(xy)
+
 class Exif(object):
     """
     Container and parser of image metadata.
@@ -1316,6 +1849,7 @@ class Image(object):
             are known absolutely. "Anchor" images are used as a reference for
             optimizing other images whose camera parameters are not known absolutely.
         keypoints_path (str): Path for caching image keypoints and their descriptors
+            (binary `pickle`, or structured array if ending in '.npy')
             to a `pickle` file. Unless specified, defaults to `path` with a '.pkl' extension.
         keypoints: Cached keypoints
         I (numpy.ndarray): Cached image content
@@ -1463,7 +1997,7 @@ class Image(object):
         Return cached keypoints.
 
         Returns :attr:`keypoints` or reads them from :attr:`keypoints_path` with
-        :func:`helpers.read_pickle`.
+        :func:`helpers.read_keypoints` (memory-mapped if a '.npy' file).
         Keypoints are expected to be in the form produced by
         :func:`optimize.detect_keypoints`.
         """
@@ -1473,7 +2007,7 @@ class Image(object):
                 return None
             else:
                 try:
-                    self.keypoints = helpers.read_pickle(self.keypoints_path)
+                    self.keypoints = helpers.read_keypoints(self.keypoints_path)
                 except IOError:
                     warnings.warn('No keypoints found at keypoints path')
         return self.keypoints
@@ -1483,10 +2017,11 @@ class Image(object):
         Write keypoints to file.
 
         Writes :attr:`keypoints` to :attr:`keypoints_path` with
-        :func:`helpers.write_pickle`.
+        :func:`helpers.write_keypoints`, as a structured array if a '.npy' file
+        (with descriptors in a separate contiguous array, see :func:`helpers.descriptors_path`).
         """
         if self.keypoints is not None and self.keypoints_path is not None:
-            helpers.write_pickle(self.keypoints, path=self.keypoints_path)
+            helpers.write_keypoints(self.keypoints, path=self.keypoints_path)
         else:
             raise ValueError('No keypoints, or keypoints path not specified')
 
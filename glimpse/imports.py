@@ -20,6 +20,7 @@ import numbers
 import os
 import re
 import shutil
+import sqlite3
 import sys
 import time
 import traceback
@@ -32,6 +33,7 @@ import numpy as np
 import scipy.interpolate
 import scipy.ndimage
 import scipy.optimize
+import scipy.sparse.csgraph
 import scipy.spatial
 
 # ---- Optional ----
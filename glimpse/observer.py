@@ -1,7 +1,7 @@
 from __future__ import (print_function, division, unicode_literals)
 from .backports import *
 from .imports import (np, scipy, datetime, matplotlib, os)
-from . import (helpers, raster)
+from . import (helpers, raster, image)
 
 class Observer(object):
     """
@@ -53,6 +53,26 @@ class Observer(object):
             if any(img.cam.imgsz != images[0].cam.imgsz):
                 raise ValueError('Image sizes (imgsz) are not equal')
 
+    def append_images(self, images, datetimes=None):
+        """
+        Append images to the end of the sequence.
+
+        Arguments:
+            images (iterable): Image objects with camera position (xyz), focal length (f),
+                and image size (imgsz) equal to those of `self.images`
+            datetimes (iterable): Image capture times, by default read from `images[i].datetime`
+        """
+        images = list(images)
+        self.test_images(list(self.images[:1]) + images)
+        if datetimes is None:
+            datetimes = [img.datetime for img in images]
+        datetimes = np.concatenate((self.datetimes, datetimes))
+        time_deltas = np.array([dt.total_seconds() for dt in np.diff(datetimes)])
+        if any(time_deltas <= 0):
+            raise ValueError('Image datetimes are not stricly increasing')
+        self.images = list(self.images) + images
+        self.datetimes = datetimes
+
     def index(self, value, maxdt=datetime.timedelta(0)):
         """
         Retrieve the index of an image.
@@ -277,6 +297,9 @@ class Observer(object):
         if frames is None:
             frames = np.arange(len(self.images))
         dxyz = self.images[frames[0]].cam.invproject(np.atleast_2d(uv))
+        # Project point into all frames at once
+        cams = image.CameraArray.from_cameras([self.images[i].cam for i in frames])
+        puvs = dict(zip(frames, cams.project(dxyz, directions=True)[:, 0]))
         halfsize = (size[0] * 0.5, size[1] * 0.5)
         # Initialize plot
         fig, ax = matplotlib.pyplot.subplots(ncols=2, **subplots)
@@ -290,7 +313,7 @@ class Observer(object):
         ax[1].set_ylim(uv[1] + halfsize[1], uv[1] - halfsize[0])
         # Update plot
         def update_plot(i):
-            puv = self.images[i].cam.project(dxyz, directions=True)[0]
+            puv = puvs[i]
             box = np.vstack([puv - halfsize, puv + halfsize]).ravel()
             inbounds = self.images[i].cam.inframe(helpers.box_to_polygon(box))
             if np.any(inbounds):
@@ -348,7 +371,10 @@ class Observer(object):
         halfsize = (size[0] * 0.5, size[1] * 0.5)
         # Initialize plot
         fig, ax = matplotlib.pyplot.subplots(ncols=2, **subplots)
-        track_uv = self.images[frames[0]].cam.project(xyz[0:1])
+        # Project all points into all frames at once
+        cams = image.CameraArray.from_cameras([self.images[i].cam for i in frames])
+        track_uvs = cams.project(np.asarray(xyz)[:len(frames)])
+        track_uv = track_uvs[0, 0:1]
         uv = track_uv[-1]
         box = self.tile_box(uv, size=size)
         tile = self.extract_tile(img=frames[0], box=box)
@@ -363,7 +389,7 @@ class Observer(object):
         # Update plot
         def update_plot(i):
             j = np.where(frames == i)[0][0]
-            track_uv = self.images[i].cam.project(xyz[:(j + 1)])
+            track_uv = track_uvs[j, :(j + 1)]
             uv = track_uv[-1]
             box = self.tile_box(uv, size=size)
             tile = self.extract_tile(img=i, box=box)
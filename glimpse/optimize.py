@@ -1,7 +1,7 @@
 from __future__ import (print_function, division, unicode_literals)
 from .backports import *
 from .imports import (np, scipy, cv2, lmfit, matplotlib, sys, os, copy, pickle,
-    warnings, datetime)
+    warnings, datetime, sqlite3, collections)
 from . import (helpers, config, image)
 
 # ---- Controls ----
@@ -75,6 +75,24 @@ class Points(object):
             raise ValueError('Camera has changed position (xyz) and `directions=True`')
         return self.cam.project(self.xyz[index], directions=self.directions, correction=self.correction)
 
+    def jacobian(self, index=None):
+        """
+        Return the derivatives of predicted image coordinates.
+
+        Arguments:
+            index (array_like or slice): Indices of world points to project, or all if `None`
+
+        Returns:
+            list: Derivatives with respect to `cam.vector` (n, 2, 20)
+        """
+        if index is None:
+            index = slice(None)
+        if self.directions and not self.is_static():
+            raise ValueError('Camera has changed position (xyz) and `directions=True`')
+        jacobian, _ = self.cam._project_jacobian(self.xyz[index],
+            directions=self.directions, correction=self.correction)
+        return [jacobian]
+
     def is_static(self):
         """
         Test whether the camera is at its original position.
@@ -164,7 +182,7 @@ class Lines(object):
         self.uvs = list(uvs)
         self.step = step
         if step:
-            self.uvi = np.vstack((helpers.interpolate_line(uv, dx=step) for uv in self.uvs))
+            self.uvi = np.vstack([helpers.interpolate_line(uv, dx=step) for uv in self.uvs])
         else:
             self.uvi = np.vstack(self.uvs)
         self.xyzs = xyzs
@@ -401,6 +419,55 @@ class Matches(object):
         dxyz = self.cams[cam_out].invproject(self.uvs[cam_out][index])
         return self.cams[cam_in].project(dxyz, directions=True)
 
+    def jacobian(self, index=None, cam=0):
+        """
+        Return the derivatives of predicted image coordinates.
+
+        Arguments:
+            index (array_like or slice): Indices of points to project from other camera
+            cam (Camera or int): Camera to project points into
+
+        Returns:
+            list: Derivatives with respect to each `cams[i].vector` (n, 2, 20)
+        """
+        if not self.is_static():
+            raise ValueError('Cameras have different positions (xyz)')
+        if index is None:
+            index = slice(None)
+        cam_in = self.cam_index(cam)
+        cam_out = 0 if cam_in else 1
+        xy = self.cams[cam_out]._image2camera(self.uvs[cam_out][index])
+        return self._jacobians(xy, cam_in=cam_in, cam_out=cam_out, internals=True)
+
+    def _jacobians(self, xy, cam_in, cam_out, internals=True, image=True):
+        """
+        Return the derivatives of coordinates projected between cameras.
+
+        Arguments:
+            xy (array): Camera coordinates in the other camera (n, 2)
+            cam_in (int): Index of camera to project points into
+            cam_out (int): Index of camera to project points from
+            internals (bool): Whether `xy` depend on the internal parameters
+                (imgsz, f, c, k, p) of the other camera
+            image (bool): Whether to return derivatives of image coordinates (True)
+                or camera coordinates (False)
+        """
+        dxyz = self.cams[cam_out]._camera2world(xy)
+        if image:
+            jacobian_in, dxyz_jacobian = self.cams[cam_in]._project_jacobian(
+                dxyz, directions=True)
+        else:
+            _, jacobian_in, dxyz_jacobian = self.cams[cam_in]._world2camera_jacobian(
+                dxyz, directions=True)
+        world_jacobian, dxyz_xy = self.cams[cam_out]._camera2world_jacobian(xy)
+        if internals:
+            world_jacobian += np.matmul(dxyz_xy,
+                self.cams[cam_out]._image2camera_jacobian(xy))
+        jacobians = [None, None]
+        jacobians[cam_in] = jacobian_in
+        jacobians[cam_out] = np.matmul(dxyz_jacobian, world_jacobian)
+        return jacobians
+
     def is_static(self):
         """
         Test whether the cameras are at the same position.
@@ -578,6 +645,28 @@ class RotationMatches(Matches):
         dxyz = self.cams[cam_out]._camera2world(self.xys[cam_out][index])
         return self.cams[cam_in].project(dxyz, directions=True)
 
+    def jacobian(self, index=None, cam=0):
+        """
+        Return the derivatives of predicted image coordinates.
+
+        Arguments:
+            index (array_like or slice): Indices of points to project from other camera
+            cam (Camera or int): Camera to project points into
+
+        Returns:
+            list: Derivatives with respect to each `cams[i].vector` (n, 2, 20)
+        """
+        if not self.is_static():
+            raise ValueError('Cameras have different positions (xyz)')
+        if not self.is_original_internals():
+            raise ValueError('Camera internal parameters (imgsz, f, c, k, p) have changed')
+        if index is None:
+            index = slice(None)
+        cam_in = self.cam_index(cam)
+        cam_out = 0 if cam_in else 1
+        return self._jacobians(self.xys[cam_out][index],
+            cam_in=cam_in, cam_out=cam_out, internals=False)
+
     def is_original_internals(self):
         """
         Test whether camera internal parameters are unchanged.
@@ -664,6 +753,28 @@ class RotationMatchesXY(RotationMatches):
         dxyz = self.cams[cam_out]._camera2world(self.xys[cam_out][index])
         return self.cams[cam_in]._world2camera(dxyz, directions=True)
 
+    def jacobian(self, index=None, cam=0):
+        """
+        Return the derivatives of predicted camera coordinates.
+
+        Arguments:
+            index (array_like or slice): Indices of points to project from other camera
+            cam (Camera or int): Camera to project points into
+
+        Returns:
+            list: Derivatives with respect to each `cams[i].vector` (n, 2, 20)
+        """
+        if not self.is_static():
+            raise ValueError('Cameras have different positions (xyz)')
+        if not self.is_original_internals():
+            raise ValueError('Camera internal parameters (imgsz, f, c, k, p) have changed')
+        if index is None:
+            index = slice(None)
+        cam_in = self.cam_index(cam)
+        cam_out = 0 if cam_in else 1
+        return self._jacobians(self.xys[cam_out][index],
+            cam_in=cam_in, cam_out=cam_out, internals=False, image=False)
+
     def plot(self, *args, **kwargs):
         raise AttributeError('plot() not supported by RotationMatchesXY')
 
@@ -704,6 +815,9 @@ class RotationMatchesXYZ(RotationMatches):
     def observed(self, *args, **kwargs):
         raise AttributeError('observed() not supported by RotationMatchesXYZ')
 
+    def jacobian(self, *args, **kwargs):
+        raise AttributeError('jacobian() not supported by RotationMatchesXYZ')
+
     def predicted(self, index=None, cam=0):
         """
         Predict world coordinates for a camera.
@@ -814,6 +928,81 @@ class Polynomial(object):
         if polynomial:
             matplotlib.pyplot.plot(self.data[:, 0], self.predict(params), c=polynomial)
 
+class RotationModel(object):
+    """
+    Closed-form relative rotation model for image-image point correspondences.
+
+    Estimates the view direction of one camera (`matches.cams[cam]`)
+    that best aligns its normalized camera rays with the world rays
+    of the other camera, using the Kabsch algorithm (see `helpers.kabsch_rotation()`).
+    The estimate is fast but minimizes an algebraic (ray) error rather than
+    the reprojection error, so it is best used to generate RANSAC hypotheses
+    (see `optimize.ransac(hypothesis=...)`) for a nonlinear model (`Cameras`)
+    refined only on the final inlier set.
+
+    Attributes:
+        matches (`RotationMatches`): Image-image point correspondences
+            (`RotationMatches`, `RotationMatchesXY`, or `RotationMatchesXYZ`)
+        cam (int): Index of the camera with the view direction to estimate
+    """
+
+    def __init__(self, matches, cam=1):
+        self.matches = matches
+        self.cam = cam
+
+    def data_size(self):
+        """
+        Count the number of point pairs.
+        """
+        return self.matches.size
+
+    def _rays(self, index=slice(None)):
+        """
+        Return world rays of the other camera and camera rays of the camera.
+
+        Arguments:
+            index (array_like or slice): Indices of point pairs
+        """
+        other = 0 if self.cam else 1
+        xys = self.matches.xys
+        a = self.matches.cams[other]._camera2world(xys[other][index])
+        b = np.column_stack((xys[self.cam][index], np.ones(len(a))))
+        a *= 1 / np.linalg.norm(a, ord=2, axis=1).reshape(-1, 1)
+        b *= 1 / np.linalg.norm(b, ord=2, axis=1).reshape(-1, 1)
+        return a, b
+
+    def fit(self, index=slice(None)):
+        """
+        Return the view direction that best aligns the rays of point pairs.
+
+        Arguments:
+            index (array_like or slice): Indices of point pairs to use in fitting
+
+        Returns:
+            array: View direction of `self.matches.cams[self.cam]` (degrees)
+        """
+        a, b = self._rays(index)
+        R = helpers.kabsch_rotation(a, b)
+        return image.Camera._rotation_matrix_viewdir(R)
+
+    def errors(self, params, index=slice(None)):
+        """
+        Compute the reprojection errors of point pairs in the camera image.
+
+        Arguments:
+            params (array): View direction of `self.matches.cams[self.cam]` (degrees)
+            index (array_like or slice): Indices of point pairs for which to compute errors
+        """
+        # NOTE: Project with a copy, since the cameras may be shared between threads
+        cam = self.matches.cams[self.cam].copy()
+        cam.viewdir = params
+        other = 0 if self.cam else 1
+        xys = self.matches.xys
+        dxyz = self.matches.cams[other]._camera2world(xys[other][index])
+        puv = cam.project(dxyz, directions=True)
+        uv = cam._camera2image(xys[self.cam][index])
+        return np.linalg.norm(puv - uv, axis=1)
+
 class Cameras(object):
     """
     Multi-camera optimization.
@@ -842,6 +1031,8 @@ class Cameras(object):
         group_params (list): Parameters to optimize together for all cameras in
             each group (see `parse_params()`)
         weights (array): Weights for each control point
+        control_breaks (array): Index of the first point of each control
+            in the flat layout (see `compile()`)
         scales (array): Scale factors for each parameter (see `camera_scales()`)
         sparsity (sparse matrix): Sparsity structure for the estimation of the
             Jacobian matrix
@@ -855,6 +1046,7 @@ class Cameras(object):
             cams, controls, cam_params, group_indices, group_params)
         # Core attributes
         self.cams = cams
+        self._cam_index = {cam: i for i, cam in enumerate(self.cams)}
         controls = self.__class__.prune_controls(controls, cams=self.cams)
         self.controls = controls
         ncams = len(self.cams)
@@ -868,6 +1060,8 @@ class Cameras(object):
             group_params = [dict()] * len(self.group_indices)
         self.group_params = group_params
         self.weights = weights
+        # Concatenated observations and prediction buffer
+        self.compile()
         # Build lmfit parameters
         # params, cam_masks, group_masks, cam_breaks, group_breaks for set_cameras()
         self.update_params()
@@ -884,6 +1078,15 @@ class Cameras(object):
         if sparsity:
             self._build_sparsity()
 
+    @property
+    def controls(self):
+        return self._controls
+
+    @controls.setter
+    def controls(self, value):
+        self._controls = value
+        self.invalidate()
+
     @property
     def weights(self):
         return self._weights
@@ -1141,34 +1344,40 @@ class Cameras(object):
 
     def _build_sparsity(self):
         # Number of observations
-        m_control = [2 * control.size for control in self.controls]
-        m = sum(m_control)
+        m_control = np.array([2 * control.size for control in self.controls], dtype=int)
+        m = m_control.sum()
         # Number of parameters
-        n_groups = [np.count_nonzero(mask) for mask in self.group_masks]
-        n_cams = [np.count_nonzero(mask) for mask in self.cam_masks]
-        n = sum(n_groups) + sum(n_cams)
-        # Group lookup
-        groups = np.zeros((len(self.cams), len(self.group_indices)), dtype=bool)
-        for i, idx in enumerate(self.group_indices):
-            groups[idx, i] = True
-        # Initialize sparse matrix with zeros
-        S = scipy.sparse.lil_matrix((m, n), dtype=int)
+        n = self.cam_breaks[-1]
+        # Camera (column) of each control (row)
+        pairs = np.array([(i, self._cam_index[cam])
+            for i, control in enumerate(self.controls)
+            for cam in control.cams if cam in self._cam_index], dtype=int).reshape(-1, 2)
+        control_breaks = np.cumsum(np.append(0, m_control))
+        lengths = m_control[pairs[:, 0]]
+        # Row of each control observation, repeated for each camera
+        offsets = np.repeat(control_breaks[pairs[:, 0]], lengths)
+        positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        rows = offsets + positions
+        cols = np.repeat(pairs[:, 1], lengths)
+        A = scipy.sparse.coo_matrix(
+            (np.ones(len(rows), dtype=int), (rows, cols)), shape=(m, len(self.cams)))
+        # Parameters (columns) of each camera (rows)
+        cam_cols = [np.arange(self.cam_breaks[i], self.cam_breaks[i + 1])
+            for i in range(len(self.cams))]
+        group_cols = [np.arange(self.group_breaks[i], self.group_breaks[i + 1])
+            for i in range(len(self.group_indices))]
+        cam_rows = [np.full(len(cols), i) for i, cols in enumerate(cam_cols)]
+        group_rows = [np.repeat(np.asarray(idx, dtype=int), len(cols))
+            for idx, cols in zip(self.group_indices, group_cols)]
+        group_cols = [np.tile(cols, len(idx))
+            for idx, cols in zip(self.group_indices, group_cols)]
+        rows = np.concatenate(cam_rows + group_rows).astype(int)
+        cols = np.concatenate(cam_cols + group_cols).astype(int)
+        P = scipy.sparse.coo_matrix(
+            (np.ones(len(rows), dtype=int), (rows, cols)), shape=(len(self.cams), n))
         # Build matrix
-        control_breaks = np.cumsum([0] + m_control)
-        for i, control in enumerate(self.controls):
-            ctrl_slice = slice(control_breaks[i], control_breaks[i + 1])
-            for cam in control.cams:
-                try:
-                    j = self.cams.index(cam)
-                except ValueError:
-                    continue
-                cam_slice = slice(self.cam_breaks[j], self.cam_breaks[j + 1])
-                # Camera parameters
-                S[ctrl_slice, cam_slice] = 1
-                # Group parameters
-                for group in np.nonzero(groups[j])[0]:
-                    group_slice = slice(self.group_breaks[group], self.group_breaks[group + 1])
-                    S[ctrl_slice, group_slice] = 1
+        S = A.tocsr().dot(P.tocsc()).tocsr()
+        S.data[:] = 1
         self.sparsity = S
 
     def update_params(self):
@@ -1206,6 +1415,44 @@ class Cameras(object):
             for mask in self.group_masks])
         self.cam_breaks = np.cumsum([self.group_breaks[-1]] + [np.count_nonzero(mask)
             for mask in self.cam_masks])
+        self._build_scatter()
+
+    def _build_scatter(self):
+        """
+        Pre-compute the scatter index for `set_cameras()`.
+
+        Maps each position in the flat parameter vector to the (camera, element)
+        positions it occupies in the stacked camera vectors (ncams, 20),
+        such that `self._stacked[rows, cols] = params[positions]`.
+        Group parameters are repeated for each camera in the group, and
+        camera parameters take precedence over group parameters.
+        Also lists each camera with parameters, its row of the stacked vectors,
+        and the positions of its parameter elements (`self._scatter_cams`).
+        """
+        rows, cols, positions = [], [], []
+        for i, idx in enumerate(self.group_indices):
+            elements = np.nonzero(self.group_masks[i])[0]
+            rows.append(np.repeat(np.asarray(idx, dtype=int), len(elements)))
+            cols.append(np.tile(elements, len(idx)))
+            positions.append(np.tile(
+                np.arange(self.group_breaks[i], self.group_breaks[i + 1]), len(idx)))
+        for j, mask in enumerate(self.cam_masks):
+            elements = np.nonzero(mask)[0]
+            rows.append(np.full(len(elements), j))
+            cols.append(elements)
+            positions.append(np.arange(self.cam_breaks[j], self.cam_breaks[j + 1]))
+        rows, cols, positions = [np.concatenate(x).astype(int)
+            for x in (rows, cols, positions)]
+        # Keep last assignment to each element (camera over group)
+        flat = rows * 20 + cols
+        _, last = np.unique(flat[::-1], return_index=True)
+        keep = len(flat) - 1 - last
+        self._scatter = rows[keep], cols[keep], positions[keep]
+        masks = np.zeros((len(self.cams), 20), dtype=bool)
+        masks[self._scatter[0], self._scatter[1]] = True
+        self._stacked = np.zeros((len(self.cams), 20), dtype=float)
+        self._scatter_cams = [(self.cams[j], self._stacked[j], np.flatnonzero(masks[j]))
+            for j in np.flatnonzero(masks.any(axis=1))]
 
     def set_cameras(self, params):
         """
@@ -1213,17 +1460,30 @@ class Cameras(object):
 
         The operation can be reversed with `self.reset_cameras()`.
 
+        Arrays are scattered into a persistent stack of camera vectors (ncams, 20)
+        with a single fancy assignment (see `self._build_scatter()`),
+        and copied in place into the parameter elements of each camera
+        with parameters, so that references to `Camera.vector` remain valid.
+
         Arguments:
             params (iterable or `lmfit.Parameters`): Parameter values ordered first
                 by group or camera [group0 | group1 | cam0 | cam1 | ...],
                 then ordered by position in `Camera.vector`.
         """
+        if isinstance(params, np.ndarray):
+            rows, cols, positions = self._scatter
+            self._stacked[rows, cols] = params[positions]
+            for cam, row, elements in self._scatter_cams:
+                cam.vector.put(elements, row.take(elements))
+            return
         if isinstance(params, lmfit.parameter.Parameters):
             params = list(params.valuesdict().values())
         for i, idx in enumerate(self.group_indices):
             for j in idx:
                 self.cams[j].vector[self.group_masks[i]] = params[self.group_breaks[i]:self.group_breaks[i + 1]]
-                self.cams[j].vector[self.cam_masks[j]] = params[self.cam_breaks[j]:self.cam_breaks[j + 1]]
+        # NOTE: Includes cameras not in any group
+        for j, cam in enumerate(self.cams):
+            cam.vector[self.cam_masks[j]] = params[self.cam_breaks[j]:self.cam_breaks[j + 1]]
 
     def reset_cameras(self, vectors=None, save=False):
         """
@@ -1239,8 +1499,9 @@ class Cameras(object):
         else:
             if save:
                 self.vectors = vectors
+        # NOTE: Copy in place, so that references to `Camera.vector` remain valid
         for cam, vector in zip(self.cams, vectors):
-            cam.vector = vector.copy()
+            cam.vector[:] = vector
 
     def data_size(self):
         """
@@ -1248,46 +1509,104 @@ class Cameras(object):
         """
         return np.sum([control.size for control in self.controls])
 
+    def compile(self):
+        """
+        Build the flat layout of observations across all camera control.
+
+        Observed image coordinates are concatenated once (`self._observed`)
+        and a prediction buffer (`self._predicted`) is preallocated, into which
+        each control writes its predictions at rows
+        `self.control_breaks[i]:self.control_breaks[i + 1]`.
+        Called again automatically on the next evaluation if `controls`
+        is set or after `.invalidate()`, which must be called
+        if control observations change (e.g. after `resize()` or `filter()`).
+        """
+        self.control_breaks = np.cumsum([0] + [control.size for control in self.controls])
+        self._observed = np.vstack([control.observed() for control in self.controls])
+        self._observed.flags.writeable = False
+        self._predicted = np.empty(self._observed.shape, dtype=float)
+
+    def invalidate(self):
+        """
+        Mark the flat layout (see `.compile()`) as out of date.
+
+        The layout is rebuilt on the next evaluation. Must be called if
+        control observations change (e.g. after `resize()` or `filter()`).
+        """
+        self._observed = None
+
+    def _update_layout(self):
+        """
+        Rebuild the flat layout (see `.compile()`) if it has been invalidated.
+        """
+        if self._observed is None:
+            self.compile()
+
+    def _control_indices(self, index):
+        """
+        Yield the point indices of `index` belonging to each control.
+
+        Arguments:
+            index (array_like or slice): Indices of points
+
+        Yields:
+            tuple: Control, positions in `index`, and indices of control points
+        """
+        if isinstance(index, slice):
+            index = np.arange(self.control_breaks[-1])[index]
+        else:
+            index = np.asarray(index)
+            if index.dtype == bool:
+                index = np.nonzero(index)[0]
+        for i, control in enumerate(self.controls):
+            start, stop = self.control_breaks[i:i + 2]
+            positions = np.nonzero((index >= start) & (index < stop))[0]
+            if len(positions):
+                yield control, positions, index[positions] - start
+
     def observed(self, index=None):
         """
         Return the observed image coordinates for all camera control.
 
+        Coordinates are read from the layout built by `.compile()`
+        and returned as a new array.
         See control `observed()` method for more details.
 
         Arguments:
             index (array or slice): Indices of points to return, or all if `None`
         """
-        if len(self.controls) == 1:
-            return self.controls[0].observed(index=index)
-        else:
-            # TODO: Map index to subindices for each control
-            if index is None:
-                index = slice(None)
-            return np.vstack((control.observed() for control in self.controls))[index]
+        self._update_layout()
+        observed = self._observed if index is None else self._observed[index]
+        # NOTE: Basic indexing returns a read-only view
+        return observed if observed.flags.writeable else observed.copy()
 
-    def predicted(self, params=None, index=None):
+    def predicted(self, params=None, index=None, out=None):
         """
         Return the predicted image coordinates for all camera control.
 
+        Each control writes its predictions into a slice of a single array.
         See control `predicted()` method for more details.
 
         Arguments:
             params (array or `lmfit.Parameters`): Parameter values (see `.set_cameras()`)
             index (array or slice): Indices of points to return, or all if `None` (default)
+            out (array): Array in which to place the result, or a new array if `None`
         """
+        self._update_layout()
         if params is not None:
             vectors = [cam.vector.copy() for cam in self.cams]
             self.set_cameras(params)
-        if len(self.controls) == 1:
-            result = self.controls[0].predicted(index=index)
+        if out is None:
+            out = np.empty(self.observed(index=index).shape, dtype=float)
+        if index is None:
+            for i, control in enumerate(self.controls):
+                out[self.control_breaks[i]:self.control_breaks[i + 1]] = control.predicted()
         else:
-            # TODO: Map index to subindices for each control
-            if index is None:
-                index = slice(None)
-            result = np.vstack((control.predicted() for control in self.controls))[index]
+            for control, positions, subindex in self._control_indices(index):
+                out[positions] = control.predicted(index=subindex)
         if params is not None:
             self.reset_cameras(vectors)
-        return result
+        return out
 
     def residuals(self, params=None, index=None):
         """
@@ -1299,13 +1618,94 @@ class Cameras(object):
             params (array or `lmfit.Parameters`): Parameter values (see `.set_cameras()`)
             index (array_like or slice): Indices of points to include, or all if `None`
         """
-        d = self.predicted(params=params, index=index) - self.observed(index=index)
-        if self.weights is None:
-            return d
+        self._update_layout()
+        if index is None:
+            predicted = self.predicted(params=params, out=self._predicted)
+            d = predicted - self._observed
         else:
-            if index is None:
-                index = slice(None)
-            return d * self.weights[index]
+            d = self.predicted(params=params, index=index)
+            d -= self.observed(index=index)
+        if self.weights is not None:
+            d *= self.weights if index is None else self.weights[index]
+        return d
+
+    def jacobian(self, params=None, index=None):
+        """
+        Return the Jacobian of the reprojection residuals for all camera control.
+
+        Computed from analytic derivatives (see control `jacobian()` methods),
+        so `Lines` are not supported.
+
+        Arguments:
+            params (array or `lmfit.Parameters`): Parameter values (see `.set_cameras()`)
+            index (array_like or slice): Indices of points to include, or all if `None`
+
+        Returns:
+            `scipy.sparse.csr_matrix`: Derivatives of the flattened residuals
+                (u0, v0, u1, v1, ...) with respect to each parameter
+        """
+        if params is not None:
+            vectors = [cam.vector.copy() for cam in self.cams]
+            self.set_cameras(params)
+        # Parameter positions (in camera vector) and columns of each camera
+        cam_columns = []
+        for i, cam_mask in enumerate(self.cam_masks):
+            positions = [np.nonzero(cam_mask)[0]]
+            columns = [np.arange(self.cam_breaks[i], self.cam_breaks[i + 1])]
+            for group, idx in enumerate(self.group_indices):
+                if i in idx:
+                    # NOTE: Camera parameters take precedence (see set_cameras())
+                    mask = self.group_masks[group] & ~cam_mask
+                    positions.append(np.nonzero(mask)[0])
+                    columns.append(np.arange(
+                        self.group_breaks[group], self.group_breaks[group + 1])[
+                        mask[self.group_masks[group]]])
+            cam_columns.append((np.concatenate(positions), np.concatenate(columns)))
+        rows, cols, values = [], [], []
+        row = 0
+        for control in self.controls:
+            for cam, jacobian in zip(control.cams, control.jacobian()):
+                i = self._cam_index.get(cam)
+                if i is None:
+                    continue
+                positions, columns = cam_columns[i]
+                if not len(positions):
+                    continue
+                jacobian = jacobian.reshape(-1, 20)[:, positions]
+                rows.append(np.repeat(row + np.arange(len(jacobian)), len(positions)))
+                cols.append(np.tile(columns, len(jacobian)))
+                values.append(jacobian.ravel())
+            row += 2 * control.size
+        if params is not None:
+            self.reset_cameras(vectors)
+        shape = row, self.cam_breaks[-1]
+        if values:
+            # NOTE: Duplicate (row, col) are summed (e.g. group parameters)
+            J = scipy.sparse.coo_matrix((
+                np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                shape=shape).tocsr()
+        else:
+            J = scipy.sparse.csr_matrix(shape)
+        if self.weights is not None:
+            J = scipy.sparse.diags(np.repeat(self.weights.ravel(), 2)).dot(J).tocsr()
+        if index is not None:
+            J = J[self._residual_index(index)]
+        return J
+
+    def _residual_index(self, index):
+        """
+        Return the indices of flattened residuals for points.
+
+        Arguments:
+            index (array_like or slice): Indices of points
+        """
+        if isinstance(index, slice):
+            index = np.arange(self.data_size())[index]
+        else:
+            index = np.asarray(index)
+            if index.dtype == bool:
+                index = np.nonzero(index)[0]
+        return np.dstack((2 * index, 2 * index + 1)).ravel()
 
     def errors(self, params=None, index=None):
         """
@@ -1320,7 +1720,8 @@ class Cameras(object):
         return np.linalg.norm(self.residuals(params=params, index=index), axis=1)
 
     def fit(self, index=None, cam_params=None, group_params=None, full=False,
-        method='least_squares', nan_policy='omit', reduce_fcn=None, **kwargs):
+        method='least_squares', nan_policy='omit', reduce_fcn=None,
+        jacobian=False, backend=None, **kwargs):
         """
         Return optimal camera parameter values.
 
@@ -1328,6 +1729,14 @@ class Cameras(object):
         or a derivative objective function across all control.
         See `lmfit.minimize()` (https://lmfit.github.io/lmfit-py/fitting.html).
 
+        With `backend='scipy'`, `scipy.optimize.least_squares()` is called directly
+        on the flat parameter array, which is scattered into the camera vectors
+        without building `lmfit.Parameters` at each evaluation (see `.set_cameras()`).
+        This is always the case with `jacobian=True`, since `lmfit`
+        converts Jacobians to dense arrays. Missing residuals (`np.nan`) are
+        omitted by setting them (and their derivatives) to zero
+        (equivalent to `nan_policy='omit'`), and `reduce_fcn` is not supported.
+
         Arguments:
             index (array or slice): Indices of residuals to include, or all if `None`
             cam_params (list): Sequence of `cam_params` to fit iteratively
@@ -1335,7 +1744,21 @@ class Cameras(object):
             group_params (list): Sequence of `group_params` to fit iteratively
                 before the final run. Must be `None` or same length as `cam_params`.
             full (bool): Whether to return the full result of `lmfit.Minimize()`
-            **kwargs: Additional arguments to `lmfit.minimize()`.
+                (or of `scipy.optimize.least_squares()`, with `params` added,
+                if `backend` is 'scipy')
+            jacobian (bool): Whether to use the analytic Jacobian
+                (`method='least_squares'` and `backend='scipy'` only).
+                If `None`, it is used if supported by all controls
+                and `backend` is 'scipy'.
+            backend (str): Fitting backend
+                (`method='least_squares'` only for 'scipy').
+
+                    - 'lmfit': `lmfit.minimize()` with `lmfit.Parameters`
+                    - 'scipy': `scipy.optimize.least_squares()` with raw arrays
+                    - `None`: 'scipy' if `jacobian` is True, else 'lmfit'
+
+            **kwargs: Additional arguments to `lmfit.minimize()`
+                (or `scipy.optimize.least_squares()` if `backend` is 'scipy').
                 `self.scales` and `self.jac_sparsity` (if computed) are applied
                 to the following arguments if not provided:
 
@@ -1348,22 +1771,33 @@ class Cameras(object):
                 by group or camera (group, cam0, cam1, ...),
                 then ordered by position in `Camera.vector`.
         """
+        if jacobian is None:
+            jacobian = method == 'least_squares' and backend == 'scipy' and all(
+                hasattr(control, 'jacobian') for control in self.controls)
+        if jacobian and method != 'least_squares':
+            raise ValueError("Analytic jacobian requires method='least_squares'")
+        if backend is None:
+            backend = 'scipy' if jacobian else 'lmfit'
+        if backend not in ('lmfit', 'scipy'):
+            raise ValueError('Unsupported backend: ' + str(backend))
+        if jacobian and backend != 'scipy':
+            raise ValueError("Analytic jacobian requires backend='scipy'")
+        if backend == 'scipy' and method != 'least_squares':
+            raise ValueError("Backend 'scipy' requires method='least_squares'")
+        if backend == 'scipy' and (nan_policy != 'omit' or reduce_fcn is not None):
+            raise ValueError(
+                "Backend 'scipy' requires nan_policy='omit' and reduce_fcn=None")
         if method == 'leastsq':
             if self.scales is not None and not hasattr(kwargs, 'diag'):
                 kwargs['diag'] = self.scales
-        if method == 'least_squares':
+        if method == 'least_squares' and not jacobian:
             if self.scales is not None and not hasattr(kwargs, 'x_scale'):
                 kwargs['x_scale'] = self.scales
             if self.sparsity is not None and not hasattr(kwargs, 'jac_sparsity'):
                 if index is None:
                     kwargs['jac_sparsity'] = self.sparsity
                 else:
-                    if isinstance(index, slice):
-                        jac_index = np.arange(self.data_size())[index]
-                    else:
-                        jac_index = index
-                    jac_index = np.dstack((2 * jac_index, 2 * jac_index + 1)).ravel()
-                    kwargs['jac_sparsity'] = self.sparsity[jac_index]
+                    kwargs['jac_sparsity'] = self.sparsity[self._residual_index(index)]
         def callback(params, iter, resid, *args, **kwargs):
             err = np.linalg.norm(resid.reshape(-1, 2), ord=2, axis=1).mean()
             sys.stdout.write('\r' + str(err))
@@ -1377,12 +1811,17 @@ class Cameras(object):
                 iter_group_params = group_params[n] if group_params else self.group_params
                 model = Cameras(cams=self.cams, controls=self.controls,
                     cam_params=iter_cam_params, group_params=iter_group_params)
-                values = model.fit(index=index, method=method, nan_policy=nan_policy, reduce_fcn=reduce_fcn, **kwargs)
+                values = model.fit(index=index, method=method, nan_policy=nan_policy,
+                    reduce_fcn=reduce_fcn, jacobian=jacobian, backend=backend, **kwargs)
                 if values is not None:
                     model.set_cameras(params=values)
             self.update_params()
-        result = lmfit.minimize(params=self.params, fcn=self.residuals, kws=dict(index=index), iter_cb=callback,
-            method=method, nan_policy=nan_policy, reduce_fcn=reduce_fcn, **kwargs)
+        if backend == 'scipy':
+            result = self._fit_least_squares(index=index, jacobian=jacobian,
+                callback=callback, **kwargs)
+        else:
+            result = lmfit.minimize(params=self.params, fcn=self.residuals, kws=dict(index=index), iter_cb=callback,
+                method=method, nan_policy=nan_policy, reduce_fcn=reduce_fcn, **kwargs)
         sys.stdout.write('\n')
         if iterations:
             self.reset_cameras()
@@ -1392,8 +1831,63 @@ class Cameras(object):
         if full:
             return result
         elif result.success:
+            if backend == 'scipy':
+                return result.x
             return np.array(list(result.params.valuesdict().values()))
 
+    def _fit_least_squares(self, index=None, jacobian=False, callback=None, **kwargs):
+        """
+        Return optimal camera parameter values with `scipy.optimize.least_squares()`.
+
+        Parameter values are passed as raw arrays to `.residuals()`
+        (and `.jacobian()`), bypassing `lmfit.Parameters`.
+
+        Arguments:
+            index (array or slice): Indices of residuals to include, or all if `None`
+            jacobian (bool): Whether to use the analytic Jacobian (`self.jacobian()`).
+                If `False`, the Jacobian is estimated by finite differences
+                restricted to `self.sparsity` (if computed).
+            callback (callable): Function called with the residuals of each
+                evaluation, with signature `callback(params, iter, resid)`
+            **kwargs: Additional arguments to `scipy.optimize.least_squares()`
+
+        Returns:
+            `scipy.optimize.OptimizeResult`: Result, with parameter values
+                as `lmfit.Parameters` added as `params`
+        """
+        params = self.params.copy()
+        x0 = np.array([param.value for param in params.values()])
+        bounds = (
+            [param.min for param in params.values()],
+            [param.max for param in params.values()])
+        if self.scales is not None:
+            kwargs.setdefault('x_scale', self.scales)
+        if not jacobian and self.sparsity is not None:
+            if index is None:
+                kwargs.setdefault('jac_sparsity', self.sparsity)
+            else:
+                kwargs.setdefault('jac_sparsity',
+                    self.sparsity[self._residual_index(index)])
+        evaluations = [0]
+        def fun(x):
+            residuals = self.residuals(params=x, index=index).ravel()
+            if callback is not None:
+                evaluations[0] += 1
+                callback(params, evaluations[0], residuals[~np.isnan(residuals)])
+            residuals[np.isnan(residuals)] = 0
+            return residuals
+        def jac(x):
+            J = self.jacobian(params=x, index=index)
+            J.data[np.isnan(J.data)] = 0
+            return J
+        result = scipy.optimize.least_squares(fun=fun, x0=x0,
+            jac=jac if jacobian else kwargs.pop('jac', '2-point'),
+            bounds=bounds, **kwargs)
+        for param, value in zip(params.values(), result.x):
+            param.value = value
+        result.params = params
+        return result
+
     def plot(self, params=None, cam=0, index=None, scale=1, width=5, selected='red', unselected=None,
         lines_observed='green', lines_predicted='yellow'):
         """
@@ -1454,6 +1948,8 @@ class ObserverCameras(object):
         matcher (KeypointMatcher): KeypointMatcher object used by
             `self.build_keypoints()` and `self.build_matches()`
         viewdirs (array): Original camera view directions
+        solution (array): Camera view directions found by the last call to `self.fit()`,
+            or `None`
     """
 
     def __init__(self, observer, matches=None, anchors=None):
@@ -1470,6 +1966,7 @@ class ObserverCameras(object):
         # Placeholders
         self.viewdirs = np.vstack([img.cam.viewdir.copy()
             for img in self.observer.images])
+        self.solution = None
 
     def set_cameras(self, viewdirs):
         for i, img in enumerate(self.observer.images):
@@ -1485,119 +1982,639 @@ class ObserverCameras(object):
         self.matcher.build_matches(*args, **kwargs)
         self.matches = self.matcher.matches_as_type(RotationMatchesXYZ, copy=False)
 
-    def fit(self, anchor_weight=1e6, method='bfgs', **params):
+    def append_images(self, images, **params):
         """
-        Return optimal camera view directions.
+        Append images to the observer and match them to the existing images.
 
-        The Broyden-Fletcher-Goldfarb-Shanno (BFGS) algorithm is used to find
-        the camera view directions that minimize the sum of the absolute differences
-        (L1-norm). See `scipy.optimize.minimize(method='bfgs')`.
+        The matches of the new images are appended to `self.matches`
+        (see `KeypointMatcher.append_images()`), so that the next call to
+        `self.fit(warm_start=True)` starts from the previous solution.
 
         Arguments:
-            anchor_weight (float): Weight on anchor image view directions being correct
-            **params: Additional arguments to `scipy.optimize.minimize()`
+            images (iterable): Image objects in ascending temporal order,
+                all later than the last image of the observer
+            **params: Additional arguments to `KeypointMatcher.append_images()`
+        """
+        images = list(images)
+        self.observer.append_images(images)
+        self.viewdirs = np.vstack([self.viewdirs] +
+            [img.cam.viewdir.copy() for img in images])
+        self.matcher.append_images(images, **params)
+        self.matches = self.matcher.matches_as_type(RotationMatchesXYZ, copy=False)
+
+    def _build_layout(self, matches=None):
+        """
+        Return the normalized camera coordinates of all matches grouped by image.
+
+        Each point is a homogeneous camera coordinate `(x, y, 1)` scaled to
+        unit length, so that rotating it gives the normalized world ray
+        direction returned by `RotationMatchesXYZ.predicted()`.
+
+        Arguments:
+            matches: Matches in sparse matrix format (data, row, col).
+                If `None`, `self.matches` is used.
 
         Returns:
-            `scipy.optimize.OptimizeResult`: The optimization result.
-                Attributes include solution array `x`, boolean `success`, and `message`.
+            array: Integer indices of images with matches (n, )
+            array: Normalized homogeneous camera coordinates sorted by image (m, 3)
+            array: Index of the first point of each image (n, )
+            array: Indices of the points of each point pair (2, m / 2)
         """
-        # Ensure matches are in COO sparse matrix format
-        if isinstance(self.matches, scipy.sparse.coo.coo_matrix):
+        # Ensure matches are in COO sparse matrix format (data, row, col)
+        if matches is None:
             matches = self.matches
-        else:
+        if not all(hasattr(matches, attr) for attr in ('data', 'row', 'col')):
             matches = scipy.sparse.coo_matrix(matches)
+        sizes = np.array([m.size for m in matches.data], dtype=int)
+        point_images = np.concatenate((
+            np.repeat(matches.row, sizes), np.repeat(matches.col, sizes)))
+        xy = np.vstack([m.xys[0] for m in matches.data] + [m.xys[1] for m in matches.data])
+        xy_hat = np.column_stack((xy, np.ones(len(xy))))
+        xy_hat *= 1 / np.linalg.norm(xy_hat, ord=2, axis=1).reshape(-1, 1)
+        # Sort points by image
+        order = np.argsort(point_images, kind='mergesort')
+        positions = np.empty(len(order), dtype=int)
+        positions[order] = np.arange(len(order))
+        images, breaks = np.unique(point_images[order], return_index=True)
+        return images, xy_hat[order], breaks, positions.reshape(2, -1)
+
+    def segments(self):
+        """
+        Return the images of each independent segment of the match graph.
+
+        Segments are the connected components of the graph of matched image pairs.
+        For matches between temporal neighbors, these are the image sequences
+        between breaks in the matches (see `KeypointMatcher.match_breaks()`).
+        Images without matches are not included.
+
+        Returns:
+            list: Integer indices of the images of each segment
+        """
+        matches = self.matches
+        n = len(self.observer.images)
+        graph = scipy.sparse.coo_matrix(
+            (np.ones(len(matches.row)), (matches.row, matches.col)), shape=(n, n))
+        _, labels = scipy.sparse.csgraph.connected_components(graph, directed=False)
+        is_matched = np.zeros(n, dtype=bool)
+        is_matched[matches.row] = True
+        is_matched[matches.col] = True
+        order = np.argsort(labels, kind='mergesort')
+        splits = np.flatnonzero(np.diff(labels[order])) + 1
+        return [idx for idx in np.split(order, splits) if is_matched[idx[0]]]
+
+    def _fit_viewdirs(self, matches, viewdirs_0, anchors, anchor_viewdirs,
+        anchor_weight=1e6, method='bfgs', **params):
+        """
+        Return optimal view directions for the images of a set of matches.
+
+        Arguments:
+            matches: Matches in sparse matrix format (data, row, col),
+                with image indices relative to `viewdirs_0`
+            viewdirs_0 (array): Initial view directions (n, 3)
+            anchors (iterable): Indices of anchor images
+            anchor_viewdirs (array): View directions of anchor images
+            anchor_weight (float): Weight on anchor image view directions being correct
+            method (str): Optimization method (see `scipy.optimize.minimize()`)
+            **params: Additional arguments to `scipy.optimize.minimize()`
+
+        Returns:
+            `scipy.optimize.OptimizeResult`: The optimization result
+        """
+        images, xy_hat, breaks, pairs = self._build_layout(matches)
+        point_images = np.repeat(np.arange(len(images)), np.diff(np.append(breaks, len(xy_hat))))
+        anchors = np.asarray(anchors, dtype=int)
+        anchor_viewdirs = np.reshape(anchor_viewdirs, (-1, 3))
         # Define combined objective, jacobian function
         def fun(viewdirs):
             viewdirs = viewdirs.reshape(-1, 3)
-            self.set_cameras(viewdirs=viewdirs)
-            objective = 0
             gradients = np.zeros(viewdirs.shape)
-            for i in self.anchors:
-                objective += (anchor_weight / 2.0) * np.sum((viewdirs[i] - self.viewdirs[i])**2)
-                gradients[i] += anchor_weight * (viewdirs[i] - self.viewdirs[i])
-            for m, i, j in zip(matches.data, matches.row, matches.col):
-                # Project matches
-                dxyz = m.predicted(cam=0) - m.predicted(cam=1)
-                objective += np.sum(np.abs(dxyz))
-                # i -> j
-                xy_hat = np.column_stack((m.xys[0], np.ones(m.size)))
-                dD_dw = np.matmul(m.cams[0].Rprime, xy_hat.T)
-                delta = np.sign(dxyz).reshape(-1, 3, 1)
-                gradient = np.sum(np.matmul(dD_dw.T, delta).T, axis=2).squeeze()
-                gradients[i] += gradient
-                # j -> i
-                gradients[j] -= gradient
+            anchor_delta = viewdirs[anchors] - anchor_viewdirs
+            objective = (anchor_weight / 2.0) * np.sum(anchor_delta**2)
+            gradients[anchors] += anchor_weight * anchor_delta
+            # Rotate the points of each image to world ray directions
+            R = image.Camera._rotation_matrix(viewdirs[images])
+            dxyz = np.matmul(xy_hat[:, None, :], R[point_images])[:, 0, :]
+            delta = dxyz[pairs[0]] - dxyz[pairs[1]]
+            objective += np.sum(np.abs(delta))
+            # Sign of the derivative of the objective for each point
+            # NOTE: Points of the second image enter the objective with opposite sign
+            signs = np.empty(dxyz.shape)
+            signs[pairs[0]] = np.sign(delta)
+            signs[pairs[1]] = -signs[pairs[0]]
+            # Accumulate sign * xy_hat^T for each image
+            M = np.add.reduceat(signs[:, :, None] * xy_hat[:, None, :], breaks, axis=0)
+            # Rprime[:, i, :] is the transpose of dR / dviewdir[i]
+            Rprime = image.Camera._rotation_matrix_prime(viewdirs[images])
+            gradients[images] += np.einsum('kaib,kab->ki', Rprime, M)
             # Update console output
             sys.stdout.write('\r' + str(objective))
             sys.stdout.flush()
             return objective, gradients.ravel()
-        # Optimize camera view directions
-        viewdirs_0 = [img.cam.viewdir for img in self.observer.images]
-        result = scipy.optimize.minimize(
-            fun=fun, x0=viewdirs_0, jac=True, method=method, **params)
+        return scipy.optimize.minimize(
+            fun=fun, x0=np.ravel(viewdirs_0), jac=True, method=method, **params)
+
+    def fit(self, anchor_weight=1e6, method='bfgs', warm_start=False,
+        segments=False, parallel=False, **params):
+        """
+        Return optimal camera view directions.
+
+        The Broyden-Fletcher-Goldfarb-Shanno (BFGS) algorithm is used to find
+        the camera view directions that minimize the sum of the absolute differences
+        (L1-norm). See `scipy.optimize.minimize(method='bfgs')`.
+
+        BFGS stores a dense approximation of the inverse Hessian, whose size is
+        quadratic in the number of images. For long sequences, use limited-memory
+        BFGS (`method='l-bfgs-b'`, with history length `options=dict(maxcor=...)`)
+        and/or solve independent `segments` separately. Since the objective is
+        not smooth, L-BFGS-B may need a smaller tolerance (`options=dict(ftol=...)`).
+
+        Arguments:
+            anchor_weight (float): Weight on anchor image view directions being correct
+            method (str): Optimization method (see `scipy.optimize.minimize()`)
+            warm_start (bool): Whether to start from the previous solution (`self.solution`).
+                Images added since (see `self.append_images()`) start from their
+                original view direction plus the correction found for the last
+                previously solved image.
+            segments (bool): Whether to solve each segment of the match graph
+                (see `self.segments()`) independently
+            parallel: Number of segments to solve in parallel (int),
+                or whether to solve in parallel (bool). If `True`,
+                defaults to `os.cpu_count()`. Ignored if `segments` is `False`.
+            **params: Additional arguments to `scipy.optimize.minimize()`
+
+        Returns:
+            `scipy.optimize.OptimizeResult`: The optimization result.
+                Attributes include solution array `x`, boolean `success`, and `message`.
+                If `segments`, `segments` (list) holds the image indices and
+                `results` (list) the optimization result of each segment.
+        """
+        viewdirs_0 = np.vstack([img.cam.viewdir for img in self.observer.images])
+        if warm_start and self.solution is not None:
+            n = len(self.solution)
+            viewdirs_0[:n] = self.solution
+            viewdirs_0[n:] = self.viewdirs[n:] + (self.solution[-1] - self.viewdirs[n - 1])
+        anchors = np.asarray(self.anchors, dtype=int)
+        if not segments:
+            result = self._fit_viewdirs(self.matches, viewdirs_0=viewdirs_0,
+                anchors=anchors, anchor_viewdirs=self.viewdirs[anchors],
+                anchor_weight=anchor_weight, method=method, **params)
+        else:
+            parallel = helpers._parse_parallel(parallel)
+            groups = self.segments()
+            matches = self.matches
+            data = np.asarray(matches.data)
+            labels = np.full(len(viewdirs_0), -1)
+            positions = np.zeros(len(viewdirs_0), dtype=int)
+            for k, idx in enumerate(groups):
+                labels[idx] = k
+                positions[idx] = np.arange(len(idx))
+            # Define parallel process
+            def process(k, idx):
+                is_segment = labels[matches.row] == k
+                segment_matches = SparseMatches(data=data[is_segment],
+                    row=positions[matches.row[is_segment]],
+                    col=positions[matches.col[is_segment]], shape=(len(idx), len(idx)))
+                segment_anchors = anchors[labels[anchors] == k]
+                return self._fit_viewdirs(segment_matches, viewdirs_0=viewdirs_0[idx],
+                    anchors=positions[segment_anchors],
+                    anchor_viewdirs=self.viewdirs[segment_anchors],
+                    anchor_weight=anchor_weight, method=method, **params)
+            def reduce(result):
+                return result
+            # Run process in parallel
+            with config._MapReduce(np=parallel) as pool:
+                results = pool.map(func=process, reduce=reduce, star=True,
+                    sequence=tuple(enumerate(groups)))
+            x = viewdirs_0.copy()
+            for idx, result in zip(groups, results):
+                x[idx] = result.x.reshape(-1, 3)
+            failed = [k for k, result in enumerate(results) if not result.success]
+            result = scipy.optimize.OptimizeResult(
+                x=x.ravel(), fun=sum(result.fun for result in results),
+                success=not failed, segments=groups, results=results,
+                message='Optimization terminated successfully.' if not failed else
+                    'Segments ' + ', '.join(map(str, failed)) + ' failed: ' +
+                    results[failed[0]].message)
+        self.solution = result.x.reshape(-1, 3)
         self.reset_cameras()
         if not result.success:
             sys.stdout.write('\n') # new line
             print(result.message)
         return result
 
-# ---- RANSAC ----
+    def fit_online(self, window=5, start=None, anchor_weight=1e6, method='bfgs', **params):
+        """
+        Return camera view directions estimated one image at a time.
 
-def ransac(model, sample_size, max_error, min_inliers, iterations=100, **fit_kws):
-    """
-    Fit model parameters to data using the Random Sample Consensus (RANSAC) algorithm.
+        Images are added in temporal order. For each new image, the view directions
+        of the last `window` images (ending with the new image) are optimized
+        from their matches to each other and to older images. Older images are
+        held at their estimated view directions (as anchors), so that the cost per
+        image depends on `window` and the number of matches per image, but not
+        on the length of the sequence. Matches to later images are ignored.
+        Matches must be stored from the earlier (`row`) to the later (`col`) image.
 
-    Inspired by the pseudocode at https://en.wikipedia.org/wiki/Random_sample_consensus
+        Arguments:
+            window (int): Number of images whose view directions are optimized at each step
+            start (int): Index of the first image to estimate. Earlier images are held
+                at their previous solution (`self.solution`), also when in the
+                window of a later image. If `None`, continues from
+                the end of the previous solution, if any, or the first image.
+            anchor_weight (float): Weight on anchor image view directions being correct
+            method (str): Optimization method (see `scipy.optimize.minimize()`)
+            **params: Additional arguments to `scipy.optimize.minimize()`
 
-    Arguments:
-        model (object): Model and data object with the following methods:
+        Returns:
+            `scipy.optimize.OptimizeResult`: The optimization result.
+                Attributes include solution array `x`, boolean `success`, and `message`.
+        """
+        n = len(self.observer.images)
+        viewdirs = np.vstack([img.cam.viewdir for img in self.observer.images])
+        n_solved = 0 if self.solution is None else len(self.solution)
+        if start is None:
+            start = n_solved
+        if start > n_solved:
+            raise ValueError('start is beyond the end of the previous solution')
+        if start > 0:
+            viewdirs[:start] = self.solution[:start]
+        is_anchor = np.zeros(n, dtype=bool)
+        is_anchor[np.asarray(self.anchors, dtype=int)] = True
+        # Index matches by their second (later) image
+        matches = self.matches
+        if np.any(matches.row >= matches.col):
+            raise ValueError('Matches must be from earlier (row) to later (col) images')
+        data = np.asarray(matches.data)
+        order = np.argsort(matches.col, kind='mergesort')
+        sorted_cols = matches.col[order]
+        failed = []
+        for i in range(start, n):
+            if i > 0:
+                # Start from the correction of the previous image
+                viewdirs[i] = self.viewdirs[i] + (viewdirs[i - 1] - self.viewdirs[i - 1])
+            first = max(i - window + 1, start)
+            index = order[np.searchsorted(sorted_cols, first):
+                np.searchsorted(sorted_cols, i, side='right')]
+            if not len(index):
+                continue
+            # Number images of the window, then older matched images
+            older = np.setdiff1d(matches.row[index], np.arange(first, i + 1))
+            images = np.concatenate((np.arange(first, i + 1), older))
+            positions = dict(zip(images, range(len(images))))
+            rows = np.array([positions[j] for j in matches.row[index]], dtype=int)
+            cols = matches.col[index] - first
+            local_matches = SparseMatches(data=data[index], row=rows, col=cols,
+                shape=(len(images), len(images)))
+            # Anchor older images to their estimates and anchors to their original values
+            anchors = np.flatnonzero((np.arange(len(images)) > i - first) | is_anchor[images])
+            anchor_viewdirs = np.where(
+                is_anchor[images][anchors, None], self.viewdirs[images[anchors]],
+                viewdirs[images[anchors]])
+            result = self._fit_viewdirs(local_matches, viewdirs_0=viewdirs[images],
+                anchors=anchors, anchor_viewdirs=anchor_viewdirs,
+                anchor_weight=anchor_weight, method=method, **params)
+            viewdirs[first:(i + 1)] = result.x.reshape(-1, 3)[:(i - first + 1)]
+            if not result.success:
+                failed.append(i)
+        self.solution = viewdirs
+        self.reset_cameras()
+        result = scipy.optimize.OptimizeResult(
+            x=viewdirs.ravel(), success=not failed, failed=failed,
+            message='Optimization terminated successfully.' if not failed else
+                'Optimization failed for images ' + ', '.join(map(str, failed)))
+        if not result.success:
+            sys.stdout.write('\n') # new line
+            print(result.message)
+        return result
 
-            - `data_size()`: Returns maximum sample size
-            - `fit(index)`: Accepts sample indices and returns model parameters
-            - `errors(params, index)`: Accepts sample indices and model parameters and returns an error for each sample
+    @staticmethod
+    def _grid_boxes(imgsz, n=(3, 2), size=(256, 256)):
+        """
+        Return boxes centered on a regular grid spanning an image.
 
-        sample_size (int): Size of sample used to fit the model in each iteration
+        Arguments:
+            imgsz (iterable): Image size (nx, ny)
+            n (iterable): Number of boxes along x and y
+            size (iterable): Box size (nx, ny)
+
+        Returns:
+            array: Boxes (left, top, right, bottom) (n[0] * n[1], 4)
+        """
+        imgsz = np.asarray(imgsz, dtype=float)
+        size = np.minimum(np.broadcast_to(size, (2, )), imgsz)
+        cx, cy = [np.linspace(size[i] / 2, imgsz[i] - size[i] / 2, n[i]) for i in (0, 1)]
+        centers = np.column_stack([c.ravel() for c in np.meshgrid(cx, cy)])
+        return np.round(np.hstack((centers - size / 2, centers + size / 2))).astype(int)
+
+    def fit_coarse_to_fine(self, size=0.25, boxes=None, max_distance=20,
+        keypoints=None, matches=None, **params):
+        """
+        Return camera view directions estimated from coarse, then fine keypoints.
+
+        View directions are first fit (`self.fit()`) to matches between keypoints
+        detected on images downsampled by `size`. They are then refined from
+        matches between keypoints detected at full resolution, but only in small
+        image regions (`boxes`) and only within `max_distance` of their position
+        predicted from the coarse view directions (see `KeypointMatcher.build_matches()`).
+
+        Keypoints are held in memory (ignoring `Image.keypoints_path`)
+        and cleared when done.
+
+        Arguments:
+            size: Scale factor (float) or target image size (iterable)
+                at which to detect coarse keypoints
+            boxes (iterable): Image regions (left, top, right, bottom) in which to detect
+                fine keypoints. If `None`, 3 x 2 boxes of 256 x 256 pixels
+                spanning the image.
+            max_distance (float): Maximum distance (in pixels) of fine keypoint matches
+                from their predicted position
+            keypoints (dict): Additional arguments to `self.build_keypoints()`
+            matches (dict): Additional arguments to `self.build_matches()`
+            **params: Additional arguments to `self.fit()`
+
+        Returns:
+            `scipy.optimize.OptimizeResult`: The optimization result of the fine fit,
+                with the result of the coarse fit as attribute `coarse`.
+        """
+        images = self.observer.images
+        if boxes is None:
+            boxes = self._grid_boxes(images[0].cam.imgsz)
+        keypoints = dict() if keypoints is None else keypoints
+        matches = dict() if matches is None else matches
+        matches = helpers.merge_dicts(matches, dict(clear_keypoints=False))
+        keypoints_paths = [img.keypoints_path for img in images]
+        try:
+            for img in images:
+                img.keypoints_path = None
+            # Coarse: Match keypoints of downsampled images
+            self.build_keypoints(size=size, overwrite=True, **keypoints)
+            self.build_matches(**matches)
+            coarse = self.fit(**params)
+            # Fine: Match full-resolution keypoints near predicted positions
+            self.build_keypoints(boxes=boxes, overwrite=True, **keypoints)
+            self.set_cameras(coarse.x.reshape(-1, 3))
+            try:
+                self.build_matches(**helpers.merge_dicts(
+                    matches, dict(guided=True, max_distance=max_distance)))
+            finally:
+                self.reset_cameras()
+            result = self.fit(warm_start=True, **params)
+            result.coarse = coarse
+        finally:
+            for img, path in zip(images, keypoints_paths):
+                img.keypoints_path = path
+                img.keypoints = None
+        return result
+
+    def fit_direct(self, mask=None, **params):
+        """
+        Return camera view directions estimated by direct image alignment.
+
+        Each image is aligned to its temporal neighbor (see `optimize.align_rotation()`),
+        without keypoints, starting from the anchor images: forward from the first
+        anchor, then backward from the first anchor. Anchor images keep their
+        original view directions. Since errors accumulate along the sequence,
+        the result can be used to initialize `self.fit()` (e.g. via `self.solution`
+        and `warm_start=True`). If an alignment fails to converge, the image keeps
+        its initial view direction (the correction of its reference image),
+        and its index is reported in `failed`.
+
+        Arguments:
+            mask (array): Boolean array indicating the region of each image to use
+                (e.g. to exclude moving ice or sky)
+            **params: Additional arguments to `optimize.align_rotation()`
+
+        Returns:
+            `scipy.optimize.OptimizeResult`: The optimization result.
+                Attributes include solution array `x`, boolean `success`, `message`,
+                and the indices of the images that failed to align (`failed`).
+        """
+        images = self.observer.images
+        n = len(images)
+        viewdirs = self.viewdirs.copy()
+        is_anchor = np.zeros(n, dtype=bool)
+        is_anchor[np.asarray(self.anchors, dtype=int)] = True
+        first = np.flatnonzero(is_anchor)[0]
+        sequence = [(i - 1, i) for i in range(first + 1, n)] + [
+            (i + 1, i) for i in range(first - 1, -1, -1)]
+        previous = None
+        failed = []
+        for j, i in sequence:
+            if is_anchor[i]:
+                continue
+            # Start from the correction of the reference image
+            camA, camB = images[j].cam.copy(), images[i].cam.copy()
+            camA.viewdir = viewdirs[j]
+            camB.viewdir = self.viewdirs[i] + (viewdirs[j] - self.viewdirs[j])
+            IA = previous[1] if previous is not None and previous[0] == j else (
+                images[j].read(cache=False))
+            IB = images[i].read(cache=False)
+            viewdir, success = align_rotation(camA, IA, camB, IB, mask=mask,
+                return_success=True, **params)
+            if success:
+                viewdirs[i] = viewdir
+            else:
+                viewdirs[i] = camB.viewdir
+                failed.append(i)
+            previous = i, IB
+        self.solution = viewdirs
+        failed = sorted(failed)
+        result = scipy.optimize.OptimizeResult(
+            x=viewdirs.ravel(), success=not failed, failed=failed,
+            message='Alignment completed.' if not failed else
+                'Alignment failed for images ' + ', '.join(map(str, failed)))
+        if not result.success:
+            print(result.message)
+        return result
+
+# ---- RANSAC ----
+
+def ransac(model, sample_size, max_error, min_inliers, iterations=100,
+    confidence=None, method='ransac', parallel=False, batch_size=None,
+    hypothesis=None, **fit_kws):
+    """
+    Fit model parameters to data using the Random Sample Consensus (RANSAC) algorithm.
+
+    Inspired by the pseudocode at https://en.wikipedia.org/wiki/Random_sample_consensus
+
+    Hypotheses are fit to random samples in batches (in parallel if `parallel`).
+    If `confidence` is provided, the number of iterations is adapted after each batch
+    to the inlier ratio `w` of the best hypothesis so far, as the number of samples
+    needed to draw at least one sample of only inliers with probability `confidence`:
+    `log(1 - confidence) / log(1 - w**sample_size)`.
+
+    Hypotheses are scored by one of the following methods:
+
+        - 'ransac': Refit the model to the sample and the inliers outside the sample,
+            then score by the mean error of this consensus set.
+        - 'msac': Score by the sum of squared errors of all points, with errors
+            truncated at `max_error` (M-estimator SAC). The best hypothesis
+            is refit to its inliers.
+        - 'lo-msac': As 'msac', but each new best hypothesis is refit to its inliers
+            for as long as this improves the score (Locally Optimized RANSAC).
+
+    If a `hypothesis` function is provided (e.g. `RotationModel.fit()`), it replaces
+    `model.fit()` during the search, and `model.fit()` is only used to refit
+    the best model to its inliers.
+
+    Arguments:
+        model (object): Model and data object with the following methods:
+
+            - `data_size()`: Returns maximum sample size
+            - `fit(index)`: Accepts sample indices and returns model parameters
+            - `errors(params, index)`: Accepts sample indices and model parameters and returns an error for each sample
+
+        sample_size (int): Size of sample used to fit the model in each iteration
         max_error (float): Error below which a sample element is considered a model inlier
-        min_inliers (int): Number of inliers (in addition to `sample_size`) for a model to be considered valid
-        iterations (int): Number of iterations
+        min_inliers (int): Number of inliers (in addition to `sample_size`) for a model to be considered valid.
+            If the refit of the best model to its inliers has too few inliers,
+            the best model is returned instead.
+        iterations (int): Maximum number of iterations. Failed fits (`model.fit()`
+            returns `None`) count as iterations.
+        confidence (float): Probability (0-1) of having drawn at least one sample
+            of only inliers at which to stop early, or `None` to run all `iterations`
+        method (str): Hypothesis scoring method ('ransac', 'msac', or 'lo-msac')
+        parallel: Number of parallel processes (int), or whether to work in parallel (bool).
+            If `True`, all available CPU cores are used.
+        batch_size (int): Number of hypotheses evaluated between updates of the
+            iteration count. If `None`, the number of parallel processes (or 1).
+        hypothesis (callable): Function that accepts sample indices and returns
+            model parameters (same as `model.fit()`), or `None` to use `model.fit()`
         **fit_kws: Additional arguments to `model.fit()`
 
     Returns:
         array (int): Values of model parameters
         array (int): Indices of model inliers
     """
-    i = 0
-    params = None
-    err = np.inf
-    inlier_idx = None
-    while i < iterations:
-        maybe_idx, test_idx = ransac_sample(sample_size, model.data_size())
+    if method not in ('ransac', 'msac', 'lo-msac'):
+        raise ValueError("`method` must be 'ransac', 'msac', or 'lo-msac'")
+    parallel = helpers._parse_parallel(parallel)
+    if batch_size is None:
+        batch_size = max(parallel, 1)
+    data_size = model.data_size()
+    # Refit best model to its inliers if hypotheses are not consensus fits
+    refine = hypothesis is not None or method == 'msac'
+    if hypothesis is None:
+        def hypothesis(index):
+            return model.fit(index, **fit_kws)
+    def process(maybe_idx, test_idx):
         # maybe_inliers = data[maybe_idx]
-        maybe_params = model.fit(maybe_idx, **fit_kws)
+        maybe_params = hypothesis(maybe_idx)
         if maybe_params is None:
-            continue
-        # test_data = data[test_idx]
-        test_errs = model.errors(maybe_params, test_idx)
-        also_idx = test_idx[test_errs < max_error]
-        if len(also_idx) > min_inliers:
+            return None
+        if method == 'ransac':
+            # test_data = data[test_idx]
+            test_errs = model.errors(maybe_params, test_idx)
+            also_idx = test_idx[test_errs < max_error]
+            if len(also_idx) <= min_inliers:
+                return None
             # also_inliers = data[also_idx]
             better_idx = np.concatenate((maybe_idx, also_idx))
-            better_params = model.fit(better_idx, **fit_kws)
+            better_params = hypothesis(better_idx)
             if better_params is None:
-                continue
+                return None
             better_errs = model.errors(better_params, better_idx)
-            this_err = np.mean(better_errs)
-            if this_err < err:
-                params = better_params
-                err = this_err
-                inlier_idx = better_idx
-        i += 1
-    if params is None:
+            return better_params, better_idx, np.mean(better_errs)
+        else:
+            inlier_idx, score = _msac_score(model, maybe_params, max_error)
+            if len(inlier_idx) <= sample_size + min_inliers:
+                return None
+            return maybe_params, inlier_idx, score
+    best = None
+    max_iterations = iterations
+    i = 0
+    with config._MapReduce(np=parallel) as pool:
+        while i < iterations:
+            n = min(batch_size, iterations - i)
+            samples = [ransac_sample(sample_size, data_size) for _ in range(n)]
+            results = pool.map(func=process, star=True, sequence=samples)
+            i += n
+            improved = False
+            for result in results:
+                if result is not None and (best is None or result[2] < best[2]):
+                    best = result
+                    improved = True
+            if improved and method == 'lo-msac':
+                best = _msac_local_optimization(model, best, max_error, fit=hypothesis)
+            if confidence is not None and best is not None:
+                iterations = min(max_iterations,
+                    max(i, ransac_iterations(len(best[1]) / data_size, sample_size, confidence)))
+    if best is None:
         raise ValueError('Best fit does not meet acceptance criteria')
+    params = best[0]
+    if refine:
+        better_params = model.fit(best[1], **fit_kws)
+        if better_params is not None:
+            better_idx = np.where(model.errors(better_params) < max_error)[0]
+            if len(better_idx) > sample_size + min_inliers:
+                return better_params, better_idx
     # HACK: Recompute inlier index on best params
-    inlier_idx = np.where(model.errors(params) <= max_error)[0]
+    inlier_idx = np.where(model.errors(params) < max_error)[0]
     return params, inlier_idx
 
+def ransac_iterations(inlier_ratio, sample_size, confidence=0.99):
+    """
+    Return the number of RANSAC iterations needed to sample only inliers.
+
+    Arguments:
+        inlier_ratio (float): Fraction of data that are inliers
+        sample_size (int): Size of sample used to fit the model in each iteration
+        confidence (float): Probability (0-1) of drawing at least one sample
+            of only inliers
+
+    Returns:
+        int: Number of iterations
+    """
+    p = inlier_ratio ** sample_size
+    if p >= 1:
+        return 1
+    if p <= 0:
+        return np.iinfo(int).max
+    with np.errstate(divide='ignore'):
+        n = np.log(1 - confidence) / np.log1p(-p)
+    return int(min(np.ceil(n), np.iinfo(int).max))
+
+def _msac_score(model, params, max_error):
+    """
+    Return the inliers and truncated quadratic (MSAC) score of model parameters.
+
+    Missing errors (`np.nan`) are treated as outliers.
+
+    Arguments:
+        model (object): Model (see `ransac()`)
+        params (array): Values of model parameters
+        max_error (float): Error below which a sample element is considered a model inlier
+
+    Returns:
+        array (int): Indices of model inliers
+        float: Score (lower is better)
+    """
+    errors = model.errors(params)
+    inliers = errors < max_error
+    score = np.sum(errors[inliers]**2) + (len(errors) - np.count_nonzero(inliers)) * max_error**2
+    return np.nonzero(inliers)[0], score
+
+def _msac_local_optimization(model, best, max_error, fit):
+    """
+    Refit a RANSAC hypothesis to its inliers while the MSAC score improves.
+
+    Arguments:
+        model (object): Model (see `ransac()`)
+        best (tuple): Model parameters, inlier indices, and score
+        max_error (float): Error below which a sample element is considered a model inlier
+        fit (callable): Function that accepts indices and returns model parameters
+
+    Returns:
+        tuple: Model parameters, inlier indices, and score
+    """
+    while True:
+        params = fit(best[1])
+        if params is None:
+            return best
+        inlier_idx, score = _msac_score(model, params, max_error)
+        if score >= best[2]:
+            return best
+        best = params, inlier_idx, score
+
 def ransac_sample(sample_size, data_size):
     """
     Generate index arrays for a random sample and its outliers.
@@ -1616,9 +2633,190 @@ def ransac_sample(sample_size, data_size):
     np.random.shuffle(indices)
     return indices[:sample_size], indices[sample_size:]
 
+def _ransac_samples(sizes, sample_size):
+    """
+    Generate index arrays for random samples of several datasets.
+
+    Each sample is drawn without replacement (as for `ransac_sample()`)
+    with Robert Floyd's algorithm, vectorized over all datasets.
+
+    Arguments:
+        sizes (array): Size of each dataset (m, ), each larger than `sample_size`
+        sample_size (int): Size of each sample
+
+    Returns:
+        array (int): Sample indices into each dataset (m, sample_size)
+    """
+    sizes = np.asarray(sizes)
+    samples = np.empty((len(sizes), sample_size), dtype=int)
+    for i in range(sample_size):
+        # Draw from [0, j] and take j if already sampled
+        j = sizes - sample_size + i
+        t = (np.random.random_sample(len(sizes)) * (j + 1)).astype(int)
+        taken = np.any(samples[:, :i] == t.reshape(-1, 1), axis=1)
+        samples[:, i] = np.where(taken, j, t)
+    return samples
+
+# ---- Direct alignment ----
+
+def _image_pyramid(I, levels=1):
+    """
+    Return an image pyramid, from finest to coarsest.
+
+    Arguments:
+        I (array): Image data (float32)
+        levels (int): Number of levels
+
+    Returns:
+        list: Image data of each level
+    """
+    pyramid = [I]
+    for _ in range(levels - 1):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+def _standardize(I, mask=None):
+    """
+    Return image data with zero mean and unit variance (within mask).
+    """
+    values = I if mask is None else I[mask]
+    std = values.std()
+    return (I - values.mean()) / (std if std else 1)
+
+def phase_correlation_shift(IA, IB, mask=None):
+    """
+    Return the translation between two images by phase correlation.
+
+    Uses `cv2.phaseCorrelate()` with a Hanning window.
+
+    Arguments:
+        IA (array): Image A (grayscale)
+        IB (array): Image B (grayscale)
+        mask (array): Boolean array indicating the region of image A to use
+
+    Returns:
+        array: Shift of image B relative to image A (dx, dy)
+        float: Normalized peak of the correlation (0 to 1)
+    """
+    IA, IB = np.float32(IA), np.float32(IB)
+    if mask is not None:
+        IA, IB = IA * mask, IB * mask
+    window = cv2.createHanningWindow(tuple(IA.shape[1::-1]), cv2.CV_32F)
+    shift, response = cv2.phaseCorrelate(IA, IB, window)
+    return np.array(shift), response
+
+def align_rotation(camA, IA, camB, IB, mask=None, levels=3, iterations=20,
+    tol=1e-4, max_pixels=2**16, phase_correlation=True, return_success=False):
+    """
+    Return the view direction of camera B that best aligns image B to image A.
+
+    Cameras are assumed to share the same position (as for an `Observer`).
+    The photometric error between the pixels of image A and image B sampled
+    at their projection into camera B is minimized by Gauss-Newton iterations
+    on an image pyramid, from coarsest to finest. The derivatives of image
+    coordinates with respect to the view direction are computed with
+    `Camera.Rprime` (see `Camera._world2camera_jacobian()`).
+    Images are standardized (within `mask`) on each level to reduce
+    the effect of changes in illumination.
+
+    Arguments:
+        camA (`glimpse.Camera`): Camera of image A
+        IA (array): Image A (grayscale or color, with size `camA.imgsz`)
+        camB (`glimpse.Camera`): Camera of image B, with initial view direction
+        IB (array): Image B (grayscale or color, with size `camB.imgsz`)
+        mask (array): Boolean array indicating the region of image A to use
+            (e.g. to exclude moving ice or sky)
+        levels (int): Number of pyramid levels
+        iterations (int): Maximum number of iterations per level
+        tol (float): Change in view direction (degrees) below which to stop iterating
+        max_pixels (int): Maximum number of pixels of image A to use per level,
+            sampled on a regular grid
+        phase_correlation (bool): Whether to initialize the view direction
+            from the translation between the coarsest images found by
+            phase correlation (see `phase_correlation_shift()`)
+        return_success (bool): Whether to return whether the alignment succeeded
+
+    Returns:
+        array: View direction of camera B (degrees)
+        bool (optional): Whether the alignment succeeded, that is,
+            at least 3 sampled pixels projected into image B on every level
+            and the change in view direction fell below `tol` on the finest level
+    """
+    images = []
+    for I in (IA, IB):
+        if I.ndim > 2:
+            I = helpers.rgb_to_gray(I, method='average', weights=None)
+        images.append(np.float32(I))
+    pyramids = [_image_pyramid(I, levels=levels) for I in images]
+    if mask is not None:
+        mask = np.asarray(mask, dtype=np.uint8)
+        masks = [mask] + [cv2.resize(mask, tuple(I.shape[1::-1]),
+            interpolation=cv2.INTER_NEAREST) for I in pyramids[0][1:]]
+        masks = [m.astype(bool) for m in masks]
+    else:
+        masks = [None] * levels
+    camA, camB = camA.copy(), camB.copy()
+    viewdir = camB.viewdir.copy()
+    if phase_correlation:
+        # Rotation of camB consistent with translation of coarsest images
+        I = pyramids[0][-1]
+        shift, _ = phase_correlation_shift(I, pyramids[1][-1], mask=masks[-1])
+        shift *= camA.imgsz / np.flipud(I.shape[0:2])
+        box = np.vstack((0.25 * camA.imgsz, 0.75 * camA.imgsz))
+        uv = np.column_stack([c.ravel() for c in np.meshgrid(*box.T)])
+        matches = RotationMatches(cams=(camA, camB), uvs=(uv, uv + shift))
+        viewdir = RotationModel(matches, cam=1).fit()
+    in_frame = True
+    for level in reversed(range(levels)):
+        converged = False
+        IA, IB = pyramids[0][level], pyramids[1][level]
+        size = np.flipud(IA.shape[0:2])
+        cA, cB = camA.copy(), camB.copy()
+        cA.resize(size, force=True)
+        cB.resize(size, force=True)
+        # Sample pixels of image A
+        step = max(1, int(np.ceil(np.sqrt(IA.size / max_pixels))))
+        rows, cols = np.mgrid[0:IA.shape[0]:step, 0:IA.shape[1]:step]
+        rows, cols = rows.ravel(), cols.ravel()
+        if masks[level] is not None:
+            is_masked = masks[level][rows, cols]
+            rows, cols = rows[is_masked], cols[is_masked]
+        IA = _standardize(IA, masks[level])
+        IB = _standardize(IB)
+        values = IA[rows, cols]
+        dxyz = cA.invproject(np.column_stack((cols, rows)) + 0.5)
+        gy, gx = np.gradient(IB)
+        for _ in range(iterations):
+            cB.viewdir = viewdir
+            xy, jacobian, _ = cB._world2camera_jacobian(dxyz, directions=True)
+            uv = cB._camera2image(xy)
+            _, duv_dxy = cB._camera2image_jacobian(xy)
+            duv_dviewdir = np.matmul(duv_dxy, jacobian[:, :, 3:6])
+            # Sample image B at projected pixel centers
+            ij = np.flipud(uv.T) - 0.5
+            is_valid = (np.all(np.isfinite(ij), axis=0) &
+                (ij[0] >= 1) & (ij[0] <= IB.shape[0] - 2) &
+                (ij[1] >= 1) & (ij[1] <= IB.shape[1] - 2))
+            if np.count_nonzero(is_valid) < 3:
+                in_frame = False
+                break
+            ij = ij[:, is_valid]
+            sample = lambda I: scipy.ndimage.map_coordinates(I, ij, order=1)
+            residuals = sample(IB) - values[is_valid]
+            J = (sample(gx)[:, None] * duv_dviewdir[is_valid, 0] +
+                sample(gy)[:, None] * duv_dviewdir[is_valid, 1])
+            delta = np.linalg.lstsq(J, -residuals, rcond=None)[0]
+            viewdir = viewdir + delta
+            if np.all(np.abs(delta) < tol):
+                converged = True
+                break
+    if return_success:
+        return viewdir, in_frame and converged
+    return viewdir
+
 # ---- Keypoints ----
 
-def detect_keypoints(array, mask=None, method='sift', root=True, **params):
+def detect_keypoints(array, mask=None, method='sift', root=True, as_array=False, **params):
     """
     Return keypoints and descriptors for an image.
 
@@ -1627,11 +2825,13 @@ def detect_keypoints(array, mask=None, method='sift', root=True, **params):
         mask (array): Regions in which to detect keypoints (uint8)
         root (bool): Whether to return square root L1-normalized descriptors.
             See https://www.robots.ox.ac.uk/~vgg/publications/2012/Arandjelovic12/arandjelovic12.pdf.
+        as_array (bool): Whether to return keypoints as a structured array
+            (see `helpers.keypoints_to_array()`) rather than cv2.KeyPoint objects
         **params: Additional arguments passed to `cv2.xfeatures2d.SIFT()` or `cv2.xfeatures2d.SURF()`.
             See https://docs.opencv.org/master/d2/dca/group__xfeatures2d__nonfree.html.
 
     Returns:
-        list: Keypoints as cv2.KeyPoint objects
+        list or array: Keypoints as cv2.KeyPoint objects, or a structured array
         array: Descriptors as array rows
     """
     if method == 'sift':
@@ -1651,50 +2851,341 @@ def detect_keypoints(array, mask=None, method='sift', root=True, **params):
     if root and descriptors is not None:
         descriptors *= 1 / (descriptors.sum(axis=1, keepdims=True) + 1e-7)
         descriptors = np.sqrt(descriptors)
+    if as_array:
+        keypoints = helpers.keypoints_to_array(keypoints)
     return keypoints, descriptors
 
+def build_flann_index(descriptors, indexParams=dict(algorithm=1, trees=5)):
+    """
+    Return a FLANN index of keypoint descriptors.
+
+    The index may not copy the descriptors, so the caller should keep them
+    in memory for as long as the index is used.
+
+    Arguments:
+        descriptors (array): Descriptors as array rows (n, m)
+        indexParams (dict): Undocumented argument passed to `cv2.flann_Index()`
+
+    Returns:
+        `cv2.flann_Index`: Index of the descriptors
+    """
+    return cv2.flann_Index(descriptors, indexParams)
+
+class FlannIndexCache(object):
+    """
+    `FlannIndexCache` holds a bounded number of FLANN descriptor indices.
+
+    When full, the least recently used index is discarded.
+
+    Arguments:
+        maxsize (int): Maximum number of indices
+        indexParams (dict): Undocumented argument passed to `cv2.flann_Index()`
+
+    Attributes:
+        maxsize (int): Maximum number of indices
+        indexParams (dict): Undocumented argument passed to `cv2.flann_Index()`
+        hits (int): Number of indices reused
+        misses (int): Number of indices built
+    """
+
+    def __init__(self, maxsize=8, indexParams=dict(algorithm=1, trees=5)):
+        self.maxsize = maxsize
+        self.indexParams = indexParams
+        self.hits = 0
+        self.misses = 0
+        self._indices = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __contains__(self, key):
+        return key in self._indices
+
+    def get(self, key, descriptors):
+        """
+        Return the index for a key, building it if missing.
+
+        Arguments:
+            key: Hashable key (e.g. image index)
+            descriptors: Descriptors as array rows (n, m), or a function
+                returning them, used if the index is missing
+
+        Returns:
+            `cv2.flann_Index`: Index of the descriptors
+        """
+        if key in self._indices:
+            self._indices.move_to_end(key)
+            self.hits += 1
+        else:
+            if callable(descriptors):
+                descriptors = descriptors()
+            descriptors = np.ascontiguousarray(descriptors, dtype=np.float32)
+            # Keep descriptors with index, since the index may not copy them
+            self._indices[key] = (
+                build_flann_index(descriptors, indexParams=self.indexParams), descriptors)
+            self.misses += 1
+            while len(self._indices) > self.maxsize:
+                self._indices.popitem(last=False)
+        return self._indices[key][0]
+
+    def discard(self, key):
+        """
+        Discard the index for a key, if present.
+
+        Arguments:
+            key: Hashable key (e.g. image index)
+        """
+        self._indices.pop(key, None)
+
+    def clear(self):
+        """
+        Discard all indices.
+        """
+        self._indices.clear()
+
+def _transform_keypoints(keypoints, scale=1, offset=0):
+    """
+    Return keypoints with shifted and scaled coordinates.
+
+    Coordinates are transformed as `(xy + offset) * scale`,
+    and keypoint size is scaled by the mean of `scale`.
+
+    Arguments:
+        keypoints: Keypoints as a structured array (see `helpers.keypoints_to_array()`)
+            or `cv2.KeyPoint` objects
+        scale (array-like): Scale factor for x and y (2, )
+        offset (array-like): Offset for x and y (2, )
+
+    Returns:
+        array or list: Transformed keypoints (of the same type)
+    """
+    scale = np.broadcast_to(np.asarray(scale, dtype=float), (2, ))
+    offset = np.broadcast_to(np.asarray(offset, dtype=float), (2, ))
+    if isinstance(keypoints, np.ndarray) and keypoints.dtype.names:
+        keypoints = keypoints.copy()
+        keypoints['x'] = (keypoints['x'] + offset[0]) * scale[0]
+        keypoints['y'] = (keypoints['y'] + offset[1]) * scale[1]
+        keypoints['size'] *= scale.mean()
+        return keypoints
+    return [cv2.KeyPoint((k.pt[0] + offset[0]) * scale[0], (k.pt[1] + offset[1]) * scale[1],
+        k.size * scale.mean(), k.angle, k.response, k.octave, k.class_id)
+        for k in keypoints]
+
+def _concatenate_keypoints(results):
+    """
+    Return the keypoints and descriptors of several detections combined.
+
+    Arguments:
+        results (iterable): Keypoints and descriptors (see `detect_keypoints()`)
+
+    Returns:
+        list or array: Keypoints as cv2.KeyPoint objects, or a structured array
+        array: Descriptors as array rows
+    """
+    results = list(results)
+    if len(results) == 1:
+        return results[0]
+    if any(isinstance(keypoints, np.ndarray) for keypoints, _ in results):
+        keypoints = np.concatenate([keypoints for keypoints, _ in results])
+    else:
+        keypoints = [k for result in results for k in result[0]]
+    descriptors = [d for _, d in results if d is not None]
+    return keypoints, (np.vstack(descriptors) if descriptors else None)
+
+def _knn_match(da, db, k=1, mask=None,
+    indexParams=dict(algorithm=1, trees=5), searchParams=dict(checks=50), index=None):
+    """
+    Return the nearest neighbors of descriptors as arrays.
+
+    Uses `cv2.flann_Index.knnSearch()`, which returns indices and distances as
+    arrays, unless a mask is provided (`cv2.FlannBasedMatcher.knnMatch()`).
+
+    Arguments:
+        da (array): Query descriptors (n, m)
+        db (array): Train descriptors (p, m)
+        k (int): Number of nearest neighbors
+        mask (array): Permissible matches passed to `cv2.FlannBasedMatcher.knnMatch()`
+        indexParams (dict): Undocumented argument passed to `cv2.flann_Index()`
+        searchParams (dict): Undocumented argument passed to `cv2.flann_Index.knnSearch()`
+        index (`cv2.flann_Index`): Prebuilt index of the train descriptors `db`
+            (see `FlannIndexCache`). Ignored if `mask` is provided.
+
+    Returns:
+        array: Index of each query descriptor (n, )
+        array: Index of the `k` nearest train descriptors (n, k)
+        array: Euclidean distance to the `k` nearest train descriptors (n, k)
+    """
+    da = np.ascontiguousarray(da, dtype=np.float32)
+    if mask is None:
+        if index is None:
+            db = np.ascontiguousarray(db, dtype=np.float32)
+            index = build_flann_index(db, indexParams=indexParams)
+        train, distances = index.knnSearch(da, k, params=searchParams)
+        # FLANN returns squared Euclidean distances
+        distances = np.sqrt(distances, dtype=float)
+        query = np.arange(len(da))
+    else:
+        flann = cv2.FlannBasedMatcher(indexParams=indexParams, searchParams=searchParams)
+        db = np.ascontiguousarray(db, dtype=np.float32)
+        matches = [m for m in flann.knnMatch(da, db, k=k, mask=mask) if len(m) == k]
+        dmatches = [dm for m in matches for dm in m]
+        query = np.fromiter((m[0].queryIdx for m in matches), dtype=int, count=len(matches))
+        train = np.fromiter((dm.trainIdx for dm in dmatches), dtype=int,
+            count=len(dmatches)).reshape(-1, k)
+        distances = np.fromiter((dm.distance for dm in dmatches), dtype=float,
+            count=len(dmatches)).reshape(-1, k)
+    return query, train.astype(int, copy=False), distances
+
+def _guided_match(da, db, predicted, uvB, radius, k=1, mask=None, chunk_size=2**18):
+    """
+    Return the nearest neighbors of descriptors within a spatial window.
+
+    Only the train descriptors whose keypoints lie within `radius` of the
+    predicted position of each query keypoint are considered.
+    Candidates are found with a KD-tree of the train keypoint coordinates
+    (`scipy.spatial.cKDTree`), and descriptor distances computed in chunks.
+
+    Arguments:
+        da (array): Query descriptors (n, m)
+        db (array): Train descriptors (p, m)
+        predicted (array): Predicted train image coordinates of the query keypoints (n, 2).
+            Queries with non-finite predictions (e.g. behind the camera) have no candidates.
+        uvB (array): Train image coordinates of the train keypoints (p, 2)
+        radius (float): Radius of the spatial window (pixels)
+        k (int): Number of nearest neighbors.
+            Queries with no candidates are dropped, and queries with fewer than `k`
+            candidates are padded with index -1 and distance `np.inf`.
+        mask (array): Permissible matches (n, p), as for `cv2.FlannBasedMatcher.knnMatch()`
+        chunk_size (int): Maximum number of descriptor distances to compute at once
+
+    Returns:
+        array: Index of each query descriptor (n, )
+        array: Index of the `k` nearest train descriptors (n, k)
+        array: Euclidean distance to the `k` nearest train descriptors (n, k)
+    """
+    n = len(predicted)
+    finite = np.flatnonzero(np.isfinite(predicted).all(axis=1))
+    if len(finite):
+        tree = scipy.spatial.cKDTree(uvB)
+        candidates = tree.query_ball_point(predicted[finite], r=radius)
+    else:
+        candidates = []
+    counts = np.array([len(c) for c in candidates], dtype=int)
+    query = np.repeat(finite, counts)
+    if len(query):
+        train = np.concatenate(candidates).astype(int)
+    else:
+        train = np.array([], dtype=int)
+    if mask is not None:
+        is_permitted = np.asarray(mask)[query, train] != 0
+        query, train = query[is_permitted], train[is_permitted]
+    distances = np.empty(len(query))
+    for start in range(0, len(query), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        delta = (np.asarray(da, dtype=np.float32)[query[chunk]] -
+            np.asarray(db, dtype=np.float32)[train[chunk]])
+        distances[chunk] = np.sqrt(np.einsum('ij,ij->i', delta, delta))
+    # Sort candidates of each query by distance
+    order = np.lexsort((distances, query))
+    train, distances = train[order], distances[order]
+    counts = np.bincount(query, minlength=n)
+    is_valid = counts > 0
+    starts = (np.cumsum(counts) - counts)[is_valid]
+    index = starts[:, None] + np.arange(k)
+    has_neighbor = np.arange(k) < counts[is_valid, None]
+    index[~has_neighbor] = 0
+    return (np.flatnonzero(is_valid),
+        np.where(has_neighbor, train[index], -1),
+        np.where(has_neighbor, distances[index], np.inf))
+
+def _ratio_weights(ratios):
+    """
+    Return match weights from descriptor-distance ratios.
+
+    Weights are the inverse of the ratios (see `match_keypoints()`).
+    Matches without a ratio (`np.nan`, a single candidate in guided matching)
+    have a weight of 1, as for a ratio of 1 (the least distinctive).
+
+    Arguments:
+        ratios (array): Descriptor-distance ratio of each match (n, )
+    """
+    weights = np.ones(len(ratios), dtype=float)
+    has_ratio = ~np.isnan(ratios)
+    weights[has_ratio] = 1 / ratios[has_ratio]
+    return weights
+
 def match_keypoints(ka, kb, mask=None, max_ratio=None, max_distance=None,
     indexParams=dict(algorithm=1, trees=5), searchParams=dict(checks=50),
-    return_ratios=False):
+    return_ratios=False, index=None, predicted=None):
     """
     Return the coordinates of matched keypoint pairs.
 
+    If `predicted` positions are provided (guided matching), each keypoint of
+    image A is only matched to the keypoints of image B within `max_distance`
+    of its predicted position in image B.
+
     Arguments:
-        ka (tuple): Keypoints of image A (keypoints, descriptors)
+        ka (tuple): Keypoints of image A (keypoints, descriptors).
+            Keypoints may be cv2.KeyPoint objects or a structured array
+            (see `helpers.keypoints_to_array()`).
         kb (tuple): Keypoints of image B (keypoints, descriptors)
         mask (array): Region in which to retain keypoints (uint8)
         max_ratio (float): Maximum descriptor-distance ratio between the best
             and second best match. See http://www.cs.ubc.ca/~lowe/papers/ijcv04.pdf#page=20.
-        max_distance (float): Maximum coordinate-distance of matched keypoints
+            If both are exact (zero distance), the ratio is 1.
+            With `predicted`, a keypoint with a single candidate in its window
+            has no second best match: its ratio is `np.nan`, and it is not
+            rejected by `max_ratio`.
+        max_distance (float): Maximum coordinate-distance of matched keypoints,
+            or of keypoints of image B from their predicted position (if `predicted`)
         indexParams (dict): Undocumented argument passed to `cv2.FlannBasedMatcher()`
         searchParams (dict): Undocumented argument passed to `cv2.FlannBasedMatcher()`
         return_ratios (bool): Whether to return the ratio of each (filtered) match
+        index (`cv2.flann_Index`): Prebuilt index of the descriptors of image B
+            (see `FlannIndexCache`). If `None`, an index is built.
+            Ignored if `predicted` is provided.
+        predicted (array): Predicted coordinates in image B of the keypoints of image A (n, 2).
+            Requires `max_distance`.
 
     Returns:
         array: Coordinates of matches in image A (n, 2)
         array: Coordinates of matches in image B (n, 2)
         array (optional): Ratio of each match (n, )
     """
+    if predicted is not None and not max_distance:
+        raise ValueError('max_distance is required for guided matching')
     compute_ratios = max_ratio or return_ratios
     n_nearest = 2 if compute_ratios else 1
-    if len(ka[0]) >= n_nearest and len(kb[0]) >= n_nearest:
-        flann = cv2.FlannBasedMatcher(indexParams=indexParams, searchParams=searchParams)
-        matches = flann.knnMatch(ka[1], kb[1], k=n_nearest, mask=mask)
-        uvA = np.array([ka[0][m[0].queryIdx].pt for m in matches]).reshape(-1, 2)
-        uvB = np.array([kb[0][m[0].trainIdx].pt for m in matches]).reshape(-1, 2)
+    # NOTE: Guided matching accepts a single candidate (see `_guided_match()`)
+    min_keypoints = 1 if predicted is not None else n_nearest
+    if len(ka[0]) >= min_keypoints and len(kb[0]) >= min_keypoints:
+        uvB_all = helpers.keypoint_coordinates(kb[0])
+        if predicted is None:
+            query, train, distances = _knn_match(ka[1], kb[1], k=n_nearest, mask=mask,
+                indexParams=indexParams, searchParams=searchParams, index=index)
+        else:
+            query, train, distances = _guided_match(ka[1], kb[1],
+                predicted=predicted, uvB=uvB_all, radius=max_distance, k=n_nearest,
+                mask=mask)
+        uvA = helpers.keypoint_coordinates(ka[0])[query]
+        uvB = uvB_all[train[:, 0]]
+        is_valid = np.ones(len(query), dtype=bool)
         if compute_ratios:
-            ratios = np.array([m.distance / n.distance for m, n in matches])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratios = distances[:, 0] / distances[:, 1]
+            # Two exact matches (0 / 0) are equally good: maximally ambiguous
+            ratios[(distances[:, 0] == 0) & (distances[:, 1] == 0)] = 1
+            # Single candidate within the window (see `_guided_match()`)
+            is_lone = train[:, 1] < 0
+            ratios[is_lone] = np.nan
         if max_ratio:
-            is_valid = np.array([m.distance / n.distance for m, n in matches]) < max_ratio
+            is_valid &= (ratios < max_ratio) | is_lone
+        if max_distance and predicted is None:
+            is_valid &= np.sum((uvA - uvB)**2, axis=1) < max_distance**2
+        if not is_valid.all():
             uvA = uvA[is_valid]
             uvB = uvB[is_valid]
-            if return_ratios:
-                ratios = ratios[is_valid]
-        if max_distance:
-            is_valid = np.linalg.norm(uvA - uvB, axis=1) < max_distance
-            uvA = uvA[is_valid]
-            uvB = uvB[is_valid]
-            if return_ratios:
+            if compute_ratios:
                 ratios = ratios[is_valid]
     else:
         # Not enough keypoints to match
@@ -1706,6 +3197,630 @@ def match_keypoints(ka, kb, mask=None, max_ratio=None, max_distance=None,
     else:
         return uvA, uvB
 
+class MatchDatabase(object):
+    """
+    `MatchDatabase` stores image-image point matches in a single indexed file.
+
+    Matches are stored in an SQLite database as one row per image pair,
+    keyed by image basenames (`basename_i`, `basename_j`), with the
+    image coordinates (`uvs`) and weights as binary arrays. Rows are only
+    appended (or replaced if `overwrite=True`), and all pairs of a set of
+    images are read with a single query.
+
+    Arguments:
+        path (str): Path to the database file (created if missing)
+
+    Attributes:
+        path (str): Path to the database file
+        connection (`sqlite3.Connection`): Database connection
+    """
+
+    def __init__(self, path):
+        self.path = path
+        helpers.make_path_directories(path, is_file=True)
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS matches ('
+                'a TEXT NOT NULL, b TEXT NOT NULL, size INTEGER NOT NULL, '
+                'uvs BLOB NOT NULL, weights BLOB, PRIMARY KEY (a, b))')
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS matches_b ON matches (b)')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __getstate__(self):
+        # Connections cannot be pickled
+        return dict(path=self.path)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM matches').fetchone()[0]
+
+    def __contains__(self, pair):
+        return self.connection.execute(
+            'SELECT 1 FROM matches WHERE a = ? AND b = ?', tuple(pair)).fetchone() is not None
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.connection.close()
+
+    def pairs(self):
+        """
+        Return the image basenames of all stored pairs.
+
+        Returns:
+            set: Image basename pairs (basename_i, basename_j)
+        """
+        return set(self.connection.execute('SELECT a, b FROM matches'))
+
+    @staticmethod
+    def _encode(uvs, weights=None):
+        uvs = np.hstack([np.asarray(uv, dtype=float).reshape(-1, 2) for uv in uvs])
+        if weights is not None:
+            weights = np.asarray(weights, dtype=float).tobytes()
+        return len(uvs), uvs.tobytes(), weights
+
+    @staticmethod
+    def _decode(uvs, weights=None):
+        # NOTE: Copy read-only buffers into independent, writeable arrays
+        uvs = np.frombuffer(uvs, dtype=float).reshape(-1, 4)
+        if weights is not None:
+            weights = np.frombuffer(weights, dtype=float).copy()
+        return (uvs[:, 0:2].copy(), uvs[:, 2:4].copy()), weights
+
+    def write(self, pairs, uvs, weights=None, overwrite=False):
+        """
+        Write the matches of image pairs.
+
+        All pairs are written in a single transaction.
+        Arguments are iterated lazily, so they may be generators.
+
+        Arguments:
+            pairs (iterable): Image basename pairs (basename_i, basename_j)
+            uvs (iterable): Pair of image coordinate arrays (n, 2) for each pair
+            weights (iterable): Weights (n, ) for each pair, or `None`
+            overwrite (bool): Whether to replace existing matches
+        """
+        if weights is None:
+            rows = (tuple(pair) + self._encode(uv)
+                for pair, uv in zip(pairs, uvs))
+        else:
+            rows = (tuple(pair) + self._encode(uv, w)
+                for pair, uv, w in zip(pairs, uvs, weights))
+        command = 'INSERT OR REPLACE' if overwrite else 'INSERT OR IGNORE'
+        with self.connection:
+            self.connection.executemany(
+                command + ' INTO matches (a, b, size, uvs, weights) VALUES (?, ?, ?, ?, ?)',
+                rows)
+
+    def read(self, pairs=None, images=None):
+        """
+        Read the matches of image pairs.
+
+        Arguments:
+            pairs (iterable): Image basename pairs (basename_i, basename_j) to read
+            images (iterable): Image basenames. If provided, all pairs of two
+                of these images are read (in addition to `pairs`).
+                If both `pairs` and `images` are `None`, all pairs are read.
+
+        Returns:
+            dict: Pair of image coordinate arrays and weights (or `None`)
+                for each image basename pair found
+        """
+        query = 'SELECT a, b, uvs, weights FROM matches'
+        if pairs is None and images is None:
+            rows = self.connection.execute(query)
+        else:
+            with self.connection:
+                self.connection.execute(
+                    'CREATE TEMP TABLE IF NOT EXISTS selection (a TEXT, b TEXT)')
+                self.connection.execute('DELETE FROM temp.selection')
+                if pairs is not None:
+                    self.connection.executemany(
+                        'INSERT INTO temp.selection VALUES (?, ?)', [tuple(pair) for pair in pairs])
+                self.connection.execute(
+                    'CREATE TEMP TABLE IF NOT EXISTS selected_images (name TEXT PRIMARY KEY)')
+                self.connection.execute('DELETE FROM temp.selected_images')
+                if images is not None:
+                    self.connection.executemany(
+                        'INSERT OR IGNORE INTO temp.selected_images VALUES (?)',
+                        [(name, ) for name in images])
+            rows = self.connection.execute(
+                query + ' JOIN temp.selection USING (a, b) UNION ' +
+                query + ' WHERE a IN temp.selected_images AND b IN temp.selected_images')
+        return {(a, b): self._decode(uvs, weights) for a, b, uvs, weights in rows}
+
+    def import_pickles(self, path, basenames=None, overwrite=False, batch_size=100):
+        """
+        Import matches from a directory of binary `pickle` files.
+
+        Files must be named `basename_i-basename_j.pkl`
+        (as written by `KeypointMatcher.build_matches()`) and contain `Matches`
+        objects with image coordinates (`uvs`).
+
+        Arguments:
+            path (str): Directory of match files
+            basenames (iterable): Image basenames, used to split file names
+                if basenames contain '-'. If `None`, file names must contain a single '-'.
+            overwrite (bool): Whether to replace existing matches
+            batch_size (int): Number of files read into memory and written
+                per transaction
+
+        Returns:
+            int: Number of files imported
+        """
+        if basenames is not None:
+            basenames = set(basenames)
+        count = 0
+        pairs, uvs, weights = [], [], []
+        for filename in sorted(os.listdir(path)):
+            if not filename.endswith('.pkl'):
+                continue
+            pair = self.__class__._split_filename(filename[:-4], basenames)
+            if pair is None:
+                raise ValueError('Cannot parse image basenames from ' + filename)
+            match = helpers.read_pickle(os.path.join(path, filename))
+            pairs.append(pair)
+            uvs.append(match.uvs)
+            weights.append(match.weights)
+            if len(pairs) >= batch_size:
+                self.write(pairs, uvs, weights, overwrite=overwrite)
+                count += len(pairs)
+                pairs, uvs, weights = [], [], []
+        if pairs:
+            self.write(pairs, uvs, weights, overwrite=overwrite)
+            count += len(pairs)
+        return count
+
+    @staticmethod
+    def _split_filename(name, basenames=None):
+        parts = name.split('-')
+        splits = [('-'.join(parts[:i]), '-'.join(parts[i:])) for i in range(1, len(parts))]
+        if basenames is not None:
+            splits = [pair for pair in splits
+                if pair[0] in basenames and pair[1] in basenames]
+        return splits[0] if len(splits) == 1 else None
+
+class MatchStore(object):
+    """
+    `MatchStore` stores the point matches of many image pairs in flat arrays.
+
+    The point matches of pair `k` (images `pairs[k]`) are rows
+    `offsets[k]:offsets[k + 1]` of the coordinate and weight arrays,
+    so that filters, conversions, and RANSAC run as vectorized operations
+    over all pairs rather than as calls to each `Matches` object.
+    Camera operations are applied once per image.
+
+    Arguments:
+        cams (iterable): Camera object of each image
+        pairs (array): Image indices (i, j) of each pair (m, 2)
+        sizes (iterable): Number of point matches of each pair (m, )
+        uvs (iterable): Image coordinates in images i and j (n, 2) of all pairs
+        xys (iterable): Normalized camera coordinates in images i and j (n, 2) of all pairs
+        weights (array): Weight of each point match (n, )
+
+    Attributes:
+        cams (list): Camera object of each image
+        pairs (array): Image indices (i, j) of each pair (m, 2)
+        offsets (array): Index of the first point match of each pair,
+            followed by the total number of point matches (m + 1, )
+        uvs (list): Image coordinates in images i and j (n, 2), or `None`
+        xys (list): Normalized camera coordinates in images i and j (n, 2), or `None`
+        weights (array): Weight of each point match (n, ), or `None`
+    """
+
+    def __init__(self, cams, pairs, sizes, uvs=None, xys=None, weights=None):
+        if uvs is None and xys is None:
+            raise ValueError('Either uvs or xys must be provided')
+        self.cams = list(cams)
+        self.pairs = np.asarray(pairs, dtype=int).reshape(-1, 2)
+        self.offsets = np.cumsum(np.append(0, sizes)).astype(int)
+        self.uvs = None if uvs is None else [
+            np.asarray(uv, dtype=float).reshape(-1, 2) for uv in uvs]
+        self.xys = None if xys is None else [
+            np.asarray(xy, dtype=float).reshape(-1, 2) for xy in xys]
+        self.weights = None if weights is None else np.asarray(weights, dtype=float)
+
+    @classmethod
+    def from_matches(cls, cams, pairs, matches):
+        """
+        Return a `MatchStore` built from `Matches` objects.
+
+        Coordinates and weights are only stored if present for all objects.
+
+        Arguments:
+            cams (iterable): Camera object of each image
+            pairs (array): Image indices (i, j) of each pair (m, 2)
+            matches (iterable): `Matches` object of each pair
+        """
+        matches = list(matches)
+        def stack(attr, i):
+            arrays = [getattr(m, attr)[i] for m in matches]
+            return np.vstack(arrays) if arrays else np.empty((0, 2))
+        has_uvs = all(m.uvs is not None for m in matches)
+        has_xys = all(getattr(m, 'xys', None) is not None for m in matches)
+        has_weights = all(m.weights is not None for m in matches)
+        return cls(cams=cams, pairs=pairs,
+            sizes=[m.size for m in matches],
+            uvs=[stack('uvs', i) for i in (0, 1)] if has_uvs else None,
+            xys=[stack('xys', i) for i in (0, 1)] if has_xys else None,
+            weights=np.concatenate([m.weights for m in matches] + [[]]) if has_weights else None)
+
+    @property
+    def size(self):
+        return self.offsets[-1]
+
+    @property
+    def sizes(self):
+        return np.diff(self.offsets)
+
+    def pair_index(self):
+        """
+        Return the pair index of each point match.
+        """
+        return np.repeat(np.arange(len(self.pairs)), self.sizes)
+
+    def _apply_cameras(self, images, array, fun):
+        """
+        Apply a camera function to array rows grouped by image.
+
+        Arguments:
+            images (array): Image index of each row (n, )
+            array (array): Array (n, d)
+            fun (callable): Function with signature `fun(cam, array)` that
+                returns an array with one row for each row of `array`
+        """
+        order = np.argsort(images, kind='mergesort')
+        keys, starts = np.unique(images[order], return_index=True)
+        result = None
+        for key, index in zip(keys, np.split(order, starts[1:])):
+            values = fun(self.cams[key], array[index])
+            if result is None:
+                result = np.empty((len(array), ) + values.shape[1:], dtype=values.dtype)
+            result[index] = values
+        if result is None:
+            result = np.empty(array.shape)
+        return result
+
+    def _select(self, selected):
+        """
+        Keep only selected point matches.
+
+        Arguments:
+            selected (array): Whether to keep each point match (n, )
+        """
+        sizes = np.bincount(self.pair_index()[selected], minlength=len(self.pairs))
+        self.offsets = np.cumsum(np.append(0, sizes)).astype(int)
+        if self.uvs is not None:
+            self.uvs = [uv[selected] for uv in self.uvs]
+        if self.xys is not None:
+            self.xys = [xy[selected] for xy in self.xys]
+        if self.weights is not None:
+            self.weights = self.weights[selected]
+
+    def build_xys(self):
+        """
+        Compute normalized camera coordinates from image coordinates, if missing.
+        """
+        if self.xys is None:
+            images = self.pairs[self.pair_index()]
+            self.xys = [
+                self._apply_cameras(images[:, i], self.uvs[i],
+                    lambda cam, uv: cam._image2camera(uv))
+                for i in (0, 1)]
+
+    def build_uvs(self):
+        """
+        Compute image coordinates from normalized camera coordinates, if missing.
+        """
+        if self.uvs is None:
+            images = self.pairs[self.pair_index()]
+            self.uvs = [
+                self._apply_cameras(images[:, i], self.xys[i],
+                    lambda cam, xy: cam._camera2image(xy))
+                for i in (0, 1)]
+
+    def predicted(self):
+        """
+        Predict image coordinates in image i from those in image j.
+
+        Equivalent to `Matches.predicted(cam=0)` for all pairs.
+        """
+        images = self.pairs[self.pair_index()]
+        if self.xys is None:
+            dxyz = self._apply_cameras(images[:, 1], self.uvs[1],
+                lambda cam, uv: cam.invproject(uv))
+        else:
+            dxyz = self._apply_cameras(images[:, 1], self.xys[1],
+                lambda cam, xy: cam._camera2world(xy))
+        return self._apply_cameras(images[:, 0], dxyz,
+            lambda cam, xyz: cam.project(xyz, directions=True))
+
+    def predicted_xys(self):
+        """
+        Predict normalized camera coordinates in image i from those in image j.
+
+        Equivalent to `RotationMatchesXY.predicted(cam=0)` for all pairs.
+        """
+        self.build_xys()
+        images = self.pairs[self.pair_index()]
+        dxyz = self._apply_cameras(images[:, 1], self.xys[1],
+            lambda cam, xy: cam._camera2world(xy))
+        return self._apply_cameras(images[:, 0], dxyz,
+            lambda cam, xyz: cam._world2camera(xyz, directions=True))
+
+    def filter(self, max_distance=None, max_error=None, min_weight=None, n_best=None, scaled=False,
+        normalized=False):
+        """
+        Filter point matches of all pairs.
+
+        Equivalent to `Matches.filter()` for all pairs, except that `n_best`
+        preserves the order of point matches. Errors are computed in the image
+        coordinates of image i, or in its normalized camera coordinates
+        (as for `RotationMatchesXY`) for the pairs selected by `normalized`.
+
+        Arguments:
+            max_distance (float): Maximum distance between point matches in image i
+                (coordinates of image j scaled to the size of image i)
+            max_error (float): Maximum reprojection error in image i
+            min_weight (float): Minimum weight
+            n_best (int): Maximum number of point matches to keep in each pair,
+                in order of descending weight
+            scaled (bool): Whether `max_distance` and `max_error` are relative
+                to the largest dimension of image i
+            normalized (bool or array): Whether `max_error` is in normalized
+                camera coordinates, for all pairs or for each pair (m, )
+        """
+        selected = np.ones(self.size, dtype=bool)
+        pair_index = self.pair_index()
+        images = self.pairs[pair_index]
+        if scaled:
+            scale = np.array([cam.imgsz.max() for cam in self.cams])[images[:, 0]]
+        if min_weight:
+            selected &= self.weights >= min_weight
+        if max_distance or max_error:
+            self.build_uvs()
+        if max_distance:
+            if scaled:
+                max_distance = max_distance * scale
+            imgszs = np.array([cam.imgsz for cam in self.cams])
+            distances = np.linalg.norm(
+                self.uvs[1] * (imgszs[images[:, 0]] / imgszs[images[:, 1]]) - self.uvs[0], axis=1)
+            selected &= distances <= max_distance
+        if max_error:
+            if scaled:
+                max_error = max_error * scale
+            normalized = np.broadcast_to(normalized, len(self.pairs)).astype(bool)[pair_index]
+            errors = np.empty(self.size)
+            if not normalized.all():
+                errors[~normalized] = np.linalg.norm(
+                    self.uvs[0] - self.predicted(), axis=1)[~normalized]
+            if normalized.any():
+                errors[normalized] = np.linalg.norm(
+                    self.xys[0] - self.predicted_xys(), axis=1)[normalized]
+            selected &= errors <= max_error
+        if n_best:
+            index = np.nonzero(selected)[0]
+            # Order by pair, then by descending weight
+            order = index[np.lexsort((-self.weights[index], pair_index[index]))]
+            starts = np.searchsorted(pair_index[order], np.arange(len(self.pairs)))
+            ranks = np.arange(len(order)) - starts[pair_index[order]]
+            selected[:] = False
+            selected[order[ranks < n_best]] = True
+        self._select(selected)
+
+    def _rotation_errors(self, R, pair_index, a, focal):
+        """
+        Return the errors of relative rotations of all point matches.
+
+        Arguments:
+            R (array): Rotation from camera j to camera i of each pair (m, 3, 3)
+            pair_index (array): Pair index of each point match (n, )
+            a (array): Normalized homogeneous camera coordinates in image j (n, 3)
+            focal (array): Mean focal length of image i of each point match (n, )
+        """
+        xyz = np.einsum('nab,nb->na', R[pair_index], a)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            errors = np.linalg.norm(xyz[:, 0:2] / xyz[:, 2:3] - self.xys[0], axis=1) * focal
+        errors[~(xyz[:, 2] > 0)] = np.inf
+        return errors
+
+    def ransac(self, max_error, min_inliers, sample_size=3, iterations=100, confidence=None):
+        """
+        Filter point matches of all pairs with RANSAC for a relative rotation.
+
+        Assumes the cameras of each pair are separated by a pure rotation
+        (as for `RotationMatches`). For all pairs at once, relative rotation
+        hypotheses are fit to random samples in closed form
+        (see `helpers.kabsch_rotation()`) and scored by their truncated squared errors (MSAC).
+        The best rotation of each pair is refit to its inliers.
+        Errors are the distances between observed and predicted normalized
+        camera coordinates in image i, scaled by its mean focal length
+        (pixels at the image center, ignoring distortion).
+
+        Arguments:
+            max_error (float): Error below which a point match is considered an inlier
+            min_inliers (int): Number of inliers (in addition to `sample_size`)
+                for a pair to be considered valid. All point matches of invalid
+                pairs are removed.
+            sample_size (int): Size of sample used to fit each hypothesis
+            iterations (int): Maximum number of iterations
+            confidence (float): Probability (0-1) of having drawn at least one sample
+                of only inliers for all pairs at which to stop early,
+                or `None` to run all `iterations` (see `optimize.ransac()`)
+
+        Returns:
+            array: Rotation from camera j to camera i of each pair (m, 3, 3)
+        """
+        self.build_xys()
+        pair_index = self.pair_index()
+        sizes = self.sizes
+        m = len(self.pairs)
+        # Normalized homogeneous camera coordinates
+        a, b = [np.column_stack((xy, np.ones(len(xy)))) for xy in self.xys[::-1]]
+        a *= 1 / np.linalg.norm(a, ord=2, axis=1).reshape(-1, 1)
+        b *= 1 / np.linalg.norm(b, ord=2, axis=1).reshape(-1, 1)
+        focal = np.array([cam.f.mean() for cam in self.cams])[self.pairs[pair_index, 0]]
+        def score(R):
+            errors = self._rotation_errors(R, pair_index, a, focal)
+            inliers = errors < max_error
+            losses = np.where(inliers, errors, max_error)**2
+            return (inliers,
+                np.bincount(pair_index, weights=losses, minlength=m),
+                np.bincount(pair_index, weights=inliers, minlength=m))
+        R = np.tile(np.eye(3), (m, 1, 1))
+        inliers, scores, counts = score(R)
+        sampled = np.nonzero(sizes > sample_size)[0]
+        max_iterations = iterations
+        i = 0
+        while i < iterations and len(sampled):
+            index = self.offsets[sampled].reshape(-1, 1) + _ransac_samples(
+                sizes[sampled], sample_size)
+            maybe_R = R.copy()
+            maybe_R[sampled] = helpers.kabsch_rotation(a[index], b[index])
+            maybe_inliers, maybe_scores, maybe_counts = score(maybe_R)
+            better = maybe_scores < scores
+            R[better] = maybe_R[better]
+            scores[better] = maybe_scores[better]
+            counts[better] = maybe_counts[better]
+            inliers[better[pair_index]] = maybe_inliers[better[pair_index]]
+            i += 1
+            if confidence is not None:
+                # Iterations needed by the pair with the lowest inlier ratio
+                ratio = (counts[sampled] / sizes[sampled]).min()
+                iterations = min(max_iterations,
+                    max(i, ransac_iterations(ratio, sample_size, confidence)))
+        # Refit rotations to their inliers
+        H = np.zeros((m, 3, 3))
+        np.add.at(H, pair_index[inliers], a[inliers, :, None] * b[inliers, None, :])
+        refit_R = helpers.kabsch_covariance_rotation(H)
+        refit_inliers, refit_scores, refit_counts = score(refit_R)
+        better = refit_scores < scores
+        R[better] = refit_R[better]
+        counts[better] = refit_counts[better]
+        inliers[better[pair_index]] = refit_inliers[better[pair_index]]
+        # Remove outliers and invalid pairs
+        valid = counts > sample_size + min_inliers
+        self._select(inliers & valid[pair_index])
+        return R
+
+    def to_matches(self, mtype=Matches):
+        """
+        Return `Matches` objects for all pairs.
+
+        Coordinates and weights of the returned objects are views into the
+        flat arrays of the store.
+
+        Arguments:
+            mtype (type): `Matches` class
+        """
+        if mtype is Matches:
+            self.build_uvs()
+        elif mtype is RotationMatches:
+            self.build_xys()
+            self.build_uvs()
+        else:
+            self.build_xys()
+        matches = []
+        for k, (i, j) in enumerate(self.pairs):
+            index = slice(self.offsets[k], self.offsets[k + 1])
+            kwargs = dict(
+                cams=(self.cams[i], self.cams[j]),
+                uvs=None if self.uvs is None else [uv[index] for uv in self.uvs],
+                weights=None if self.weights is None else self.weights[index])
+            if mtype is not Matches:
+                kwargs['xys'] = [xy[index] for xy in self.xys]
+            matches.append(mtype(**kwargs))
+        return matches
+
+class SparseMatches(object):
+    """
+    `SparseMatches` stores `Matches` objects as a sparse (n, n) image-image matrix.
+
+    Follows the Coordinate Format (COO) of `scipy.sparse.coo_matrix`,
+    which does not support object arrays. Entries are stored in the order they
+    were added, and can be appended as new images are added.
+
+    Arguments:
+        data (iterable): `Matches` object of each image pair (m, )
+        row (iterable): Index of the first image of each pair (m, )
+        col (iterable): Index of the second image of each pair (m, )
+        shape (tuple): Number of images (n, n).
+            If `None`, the largest image index plus one.
+
+    Attributes:
+        data (array): `Matches` object of each image pair (m, )
+        row (array): Index of the first image of each pair (m, )
+        col (array): Index of the second image of each pair (m, )
+        shape (tuple): Number of images (n, n)
+    """
+
+    def __init__(self, data, row, col, shape=None):
+        self.data = self._as_object_array(data)
+        self.row = np.asarray(row, dtype=int).reshape(-1)
+        self.col = np.asarray(col, dtype=int).reshape(-1)
+        if shape is None:
+            n = max(np.max(self.row, initial=-1), np.max(self.col, initial=-1)) + 1
+            shape = (n, n)
+        self._shape = tuple(shape)
+
+    @staticmethod
+    def _as_object_array(data):
+        data = list(data)
+        array = np.empty(len(data), dtype=object)
+        array[:] = data
+        return array
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    def tocoo(self):
+        return self
+
+    def eliminate_zeros(self):
+        """
+        Remove missing entries (`False` or `None`).
+        """
+        keep = np.array([m is not False and m is not None for m in self.data], dtype=bool)
+        if not keep.all():
+            self.data = self.data[keep]
+            self.row = self.row[keep]
+            self.col = self.col[keep]
+
+    def append(self, data, row, col, shape=None):
+        """
+        Append entries.
+
+        Arguments:
+            data (iterable): `Matches` object of each image pair
+            row (iterable): Index of the first image of each pair
+            col (iterable): Index of the second image of each pair
+            shape (tuple): New number of images (n, n).
+                If `None`, the matrix is enlarged as needed to fit the new entries.
+        """
+        self.data = np.concatenate((self.data, self._as_object_array(data)))
+        self.row = np.concatenate((self.row, np.asarray(row, dtype=int).reshape(-1)))
+        self.col = np.concatenate((self.col, np.asarray(col, dtype=int).reshape(-1)))
+        if shape is None:
+            n = max(self._shape[0], np.max(self.row, initial=-1) + 1,
+                np.max(self.col, initial=-1) + 1)
+            shape = (n, n)
+        self._shape = tuple(shape)
+
 class KeypointMatcher(object):
     """
     `KeypointMatcher` detects and matches image keypoints.
@@ -1721,7 +3836,7 @@ class KeypointMatcher(object):
     Attributes:
         images (array): Image objects in ascending temporal order
         clahe (cv2.CLAHE): CLAHE object
-        matches (scipy.sparse.coo.coo_matrix): Sparse matrix of image-image `Matches`
+        matches (SparseMatches): Sparse matrix of image-image `Matches`
     """
 
     def __init__(self, images, clahe=False):
@@ -1738,25 +3853,47 @@ class KeypointMatcher(object):
         # Placeholders
         self.matches = None
 
-    def _prepare_image(self, I):
+    def _prepare_image(self, I, clahe=None):
         """
         Prepare image data for keypoint detection.
+
+        Arguments:
+            I (array): Image data
+            clahe (cv2.CLAHE): CLAHE object to use instead of `self.clahe`
+                (e.g. a copy for use in a separate thread)
         """
+        if clahe is None:
+            clahe = self.clahe
         if I.ndim > 2:
             I = helpers.rgb_to_gray(I, method='average', weights=None)
-        if self.clahe is not None:
-            I = self.clahe.apply(I.astype(np.uint8))
+        if clahe is not None:
+            I = clahe.apply(I.astype(np.uint8))
         return I.astype(np.uint8)
 
+    def _copy_clahe(self):
+        """
+        Return a copy of the CLAHE object, if any.
+        """
+        if self.clahe is None:
+            return None
+        return cv2.createCLAHE(
+            clipLimit=self.clahe.getClipLimit(),
+            tileGridSize=self.clahe.getTilesGridSize())
+
     def build_keypoints(self, masks=None, overwrite=False,
-        clear_images=True, clear_keypoints=False, parallel=False, **params):
+        clear_images=True, clear_keypoints=False, parallel=False, backend=None,
+        size=None, imgs=None, boxes=None, **params):
         """
         Build image keypoints and their descriptors.
 
         The result for each `Image` is stored in `Image.keypoints`
         and written to a binary `pickle` file if `Image.keypoints_path` is set.
-        If `parallel == True`, `Image` attributes are not modified (for speed),
-        so `Image.keypoints_path` must be set for all images.
+        If `parallel == True` and processes are used, `Image` attributes are not
+        modified (for speed), so `Image.keypoints_path` must be set for all images.
+        Threads share memory, so keypoints are stored in `Image.keypoints`
+        and files are not required. Since OpenCV releases the Python global
+        interpreter lock, image reads and keypoint detection overlap across threads.
+        OpenCV's own threading is disabled while the thread pool runs.
 
         Arguments:
             masks (iterable): Boolean array(s) (uint8) indicating regions in which to detect keypoints
@@ -1767,21 +3904,71 @@ class KeypointMatcher(object):
             parallel: Number of image keypoints to detect in parallel (int),
                 or whether to detect in parallel (bool). If `True`,
                 defaults to `os.cpu_count()`.
+            backend (str): Parallel backend, either 'process' or 'thread'.
+                If `None`, the backend set by `config.set_sharedmem_backend()`.
+            size: Scale factor (float) or target image size (iterable)
+                at which to detect keypoints, passed to `Camera.resize()` on a copy
+                of each camera. Images are read at this size (and not cached)
+                and keypoint coordinates scaled back to the camera image size.
+                Masks must match the camera image size.
+            imgs (iterable): Index of images for which to build keypoints.
+                If `None`, all images. `masks`, if iterable, should match `imgs`.
+            boxes (iterable): Image regions (left, top, right, bottom) relative to
+                the camera image size in which to detect keypoints. Only these regions
+                are read (and not cached), and their keypoints combined.
             **params: Additional arguments to `optimize.detect_keypoints()`
         """
+        images = self.images if imgs is None else self.images[np.asarray(imgs, dtype=int)]
         # Enforce defaults
         if masks is None or isinstance(masks, np.ndarray):
-            masks = (masks, ) * len(self.images)
+            masks = (masks, ) * len(images)
         parallel = helpers._parse_parallel(parallel)
-        if parallel and any((img.keypoints_path is None for img in self.images)):
+        if backend is None:
+            MapReduce = config._MapReduce
+        else:
+            MapReduce = config._MapReduceBackends[backend]
+        threads = MapReduce is config._MapReduceBackends['thread']
+        if (parallel and not threads and
+            any((img.keypoints_path is None for img in images))):
             raise ValueError('Image.keypoints_path must be set for parallel processing')
         # Define parallel process
         def process(img, mask):
             print(img.path)
             no_keypoints_file = img.keypoints_path is None or not os.path.isfile(img.keypoints_path)
             if overwrite or (img.keypoints is None and no_keypoints_file):
-                I = self._prepare_image(img.read())
-                img.keypoints = detect_keypoints(I, mask=mask, **params)
+                # NOTE: CLAHE objects are not safe to share between threads
+                clahe = self._copy_clahe() if threads and parallel else None
+                if size is None:
+                    reader, scale = img, np.ones(2)
+                else:
+                    # Read image at reduced size without modifying img
+                    reader = copy.copy(img)
+                    reader.cam = img.cam.copy()
+                    reader.cam.resize(size)
+                    reader.I = None
+                    scale = img.cam.imgsz / reader.cam.imgsz
+                results = []
+                for box in ([None] if boxes is None else boxes):
+                    region_mask = mask
+                    if box is None:
+                        I = reader.read() if size is None else reader.read(cache=False)
+                        offset = np.zeros(2)
+                    else:
+                        box = np.round(box).astype(int)
+                        if mask is not None:
+                            region_mask = mask[box[1]:box[3], box[0]:box[2]]
+                        box = np.round(box / np.tile(scale, 2)).astype(int)
+                        I = reader.read(box=box, cache=False)
+                        offset = box[0:2]
+                    I = self._prepare_image(I, clahe=clahe)
+                    if region_mask is not None and region_mask.shape != I.shape:
+                        region_mask = cv2.resize(region_mask.astype(np.uint8),
+                            tuple(I.shape[1::-1]), interpolation=cv2.INTER_NEAREST)
+                    keypoints, descriptors = detect_keypoints(I, mask=region_mask, **params)
+                    if size is not None or box is not None:
+                        keypoints = _transform_keypoints(keypoints, scale=scale, offset=offset)
+                    results.append((keypoints, descriptors))
+                img.keypoints = _concatenate_keypoints(results)
                 if img.keypoints_path:
                     img.write_keypoints()
                     if clear_keypoints:
@@ -1789,20 +3976,39 @@ class KeypointMatcher(object):
                 if clear_images:
                     img.I = None
         # Run process in parallel
-        with config._MapReduce(np=parallel) as pool:
-            pool.map(process, tuple(zip(self.images, masks)), star=True)
+        if threads and parallel:
+            # Parallelize over images rather than within OpenCV functions
+            cv2_threads = cv2.getNumThreads()
+            cv2.setNumThreads(1)
+        try:
+            with MapReduce(np=parallel) as pool:
+                pool.map(process, tuple(zip(images, masks)), star=True)
+        finally:
+            if threads and parallel:
+                cv2.setNumThreads(cv2_threads)
 
     def build_matches(self, maxdt=None, min_nearest=0, seq=None, imgs=None,
         path=None, overwrite=False, skip_missing=False, clear_keypoints=True,
         clear_matches=False, parallel=False, weights=False,
-        as_type=None, filter=None, **params):
+        as_type=None, filter=None, database=None, max_indices=None, guided=False,
+        append=False, **params):
         """
         Build matches between each image and its nearest neighbors.
 
-        Results are stored in `self.matches` as an (n, n) upper-triangular sparse matrix of `Matches`,
+        Results are stored in `self.matches` as an (n, n) upper-triangular `SparseMatches`,
         and the result for each `Image` pair (i, j) optionally written to a binary `pickle`
-        file with name `basenames[i]-basenames[j].pkl`. If `clear_matches` is `True`,
-        missing files are written but results are not stored in memory.
+        file with name `basenames[i]-basenames[j].pkl`, or to a single `MatchDatabase`.
+        If `clear_matches` is `True`, missing files are written but results are not
+        stored in memory.
+
+        The FLANN index of each image's descriptors is built once and held in a
+        `FlannIndexCache` for reuse by all pairs that image takes part in.
+
+        If `guided`, the position of each keypoint of image A in image B is
+        predicted from the current camera orientations, assuming the cameras
+        share the same position (as for an `Observer`), and only the keypoints of
+        image B within `max_distance` of that position are considered
+        (see `optimize.match_keypoints()`).
 
         Arguments:
             maxdt (`datetime.timedelta`): Maximum time separation between
@@ -1821,24 +4027,39 @@ class KeypointMatcher(object):
                 file is missing
             clear_keypoints (bool): Whether to clear cached keypoints (`Image.keypoints`)
             clear_matches (bool): Whether to clear matches rather than return them
-                (requires `path`). Useful for avoiding memory overruns when
+                (requires `path` or `database`). Useful for avoiding memory overruns when
                 processing very large image sets.
             parallel: Number of image keypoints to detect in parallel (int),
                 or whether to detect in parallel (bool). If `True`,
                 defaults to `os.cpu_count()`.
             weights (bool): Whether to include weights in `Matches` objects,
                 computed as the inverse of the maximum descriptor-distance ratio
+                (see `_ratio_weights()`)
             filter (dict): Arguments to `optimize.Matches.filter()`.
                 If truthy, `Matches` are filtered before being saved to `self.matches`.
                 Ignored if `clear_matches=True`.
+            database: Path to a `MatchDatabase` file (str) or `MatchDatabase`
+                to read and write matches (instead of `path`)
+            max_indices (int): Maximum number of FLANN indices to hold in memory
+                (per parallel process). If `None`, the maximum number of images
+                matched to any one image. If 0, indices are not reused.
+            guided (bool): Whether to restrict matches to a spatial window around
+                the position predicted from the cameras (requires `max_distance`)
+            append (bool): Whether to append the new matches to `self.matches`
+                rather than replace them. Pairs should not already be in `self.matches`
+                (see `self.append_images()`).
             **params: Additional arguments to `optimize.match_keypoints()`
         """
-        if clear_matches and not path:
-            raise ValueError('path must be set when clear_matches=True')
+        if clear_matches and not path and database is None:
+            raise ValueError('path or database must be set when clear_matches=True')
+        if path and database is not None:
+            raise ValueError('path and database cannot both be set')
+        if guided and not params.get('max_distance'):
+            raise ValueError('max_distance must be set when guided=True')
         parallel = helpers._parse_parallel(parallel)
         params = helpers.merge_dicts(params, dict(return_ratios=weights))
         # Compute basenames
-        if path:
+        if path or database is not None:
             basenames = [helpers.strip_path(img.path)
                 for img in self.images]
             if len(basenames) != len(set(basenames)):
@@ -1846,7 +4067,7 @@ class KeypointMatcher(object):
         # Match images
         n = len(self.images)
         if maxdt is None:
-            matching_images = [tuple(range(i + 1, n)) for i in range(n)]
+            matching_images = [np.arange(i + 1, n) for i in range(n)]
         else:
             datetimes = np.array([img.datetime for img in self.images])
             ends = np.searchsorted(datetimes, datetimes + maxdt, side='right')
@@ -1865,20 +4086,51 @@ class KeypointMatcher(object):
                 matching_images[i] = np.unique(np.concatenate((m, iseq)))
         # Filter matched image pairs
         if imgs is not None:
-            empty = np.array([])
+            is_img = np.isin(np.arange(n), imgs)
             for i, m in enumerate(matching_images):
-                matching_images[i] = m[np.isin(m, imgs)]
+                if not is_img[i]:
+                    matching_images[i] = m[is_img[m]]
+        # Read existing matches from database
+        if database is not None:
+            close_database = not isinstance(database, MatchDatabase)
+            if close_database:
+                database = MatchDatabase(database)
+            existing = set() if overwrite else database.pairs()
+            stored = dict()
+            if not clear_matches and existing:
+                keys = [(basenames[i], basenames[j])
+                    for i, js in enumerate(matching_images) for j in js]
+                stored = database.read(pairs=[key for key in keys if key in existing])
+        # Prepare index cache
+        if max_indices is None:
+            max_indices = max([len(js) for js in matching_images] + [0])
+        if max_indices and not guided and params.get('mask') is None:
+            index_cache = FlannIndexCache(maxsize=max_indices,
+                indexParams=params.get('indexParams', dict(algorithm=1, trees=5)))
+        else:
+            index_cache = None
         # Define parallel process
         def process(i, js):
             if len(js) > 0:
-                print('Matching', i, '->', ', '.join(js.astype(str)))
+                print('Matching', i, '->', ', '.join(np.asarray(js).astype(str)))
             matches = []
+            new = []
             imgA = self.images[i]
             for j in js:
                 imgB = self.images[j]
                 if path:
                     outfile = os.path.join(path, basenames[i] + '-' + basenames[j] + '.pkl')
-                if path and not overwrite and os.path.exists(outfile):
+                if database is not None:
+                    key = basenames[i], basenames[j]
+                if database is not None and key in existing:
+                    if not clear_matches:
+                        uvs, match_weights = stored[key]
+                        match = Matches(cams=(imgA.cam, imgB.cam), uvs=uvs,
+                            weights=match_weights)
+                        if as_type:
+                            match = match.as_type(as_type)
+                        matches.append(match)
+                elif path and not overwrite and os.path.exists(outfile):
                     if not clear_matches:
                         match = helpers.read_pickle(outfile)
                         # Point matches to existing Camera objects
@@ -1889,21 +4141,35 @@ class KeypointMatcher(object):
                 elif skip_missing:
                     matches.append(False)
                 else:
-                    result = match_keypoints(imgA.read_keypoints(), imgB.read_keypoints(), **params)
+                    ka, kb = imgA.read_keypoints(), imgB.read_keypoints()
+                    index, predicted = None, None
+                    if index_cache is not None and len(kb[0]):
+                        index = index_cache.get(j, kb[1])
+                    if guided:
+                        dxyz = imgA.cam.invproject(helpers.keypoint_coordinates(ka[0]))
+                        predicted = imgB.cam.project(dxyz, directions=True)
+                    result = match_keypoints(ka, kb, index=index, predicted=predicted, **params)
                     match = Matches(
                         cams=(imgA.cam, imgB.cam), uvs=result[0:2],
-                        weights=(1 / result[2]) if weights else None)
+                        weights=_ratio_weights(result[2]) if weights else None)
                     if path is not None:
                         helpers.write_pickle(match, outfile)
+                    if database is not None:
+                        new.append((key, match.uvs, match.weights))
                     if not clear_matches:
                         if as_type:
                             match = match.as_type(as_type)
                         matches.append(match)
             if clear_keypoints:
                 imgA.keypoints = None
-            return None if clear_matches else matches
-        def reduce(matches):
-            if filter:
+            if index_cache is not None:
+                # Image i is not matched as image B by any later image
+                index_cache.discard(i)
+            return (None if clear_matches else matches), new
+        def reduce(matches, new):
+            if new:
+                database.write(*zip(*new), overwrite=overwrite)
+            if filter and matches:
                 for match in matches:
                     if match:
                         match.filter(**filter)
@@ -1914,21 +4180,24 @@ class KeypointMatcher(object):
                 func=process, reduce=reduce, star=True,
                 sequence=tuple(enumerate(matching_images)))
             if not clear_matches:
-                # Build Compressed Sparse Row (CSR) matrix
-                matches = scipy.sparse.csr_matrix((
-                    np.concatenate(matches), # data
-                    np.concatenate(matching_images), # column indices
-                    np.cumsum([0] + [len(row) for row in matching_images]))) # row ranges
-                # Convert to Coordinate Format (COO) matrix
-                matches = matches.tocoo()
+                matches = SparseMatches(
+                    data=[m for row in matches for m in row],
+                    row=np.repeat(np.arange(n), [len(js) for js in matching_images]),
+                    col=np.concatenate([np.asarray(js, dtype=int) for js in matching_images]),
+                    shape=(n, n))
                 if skip_missing:
                     matches.eliminate_zeros()
+        if database is not None and close_database:
+            database.close()
         if clear_matches:
-            self.matches = None
+            if not append:
+                self.matches = None
+        elif append and self.matches is not None:
+            self.matches.append(matches.data, matches.row, matches.col, shape=(n, n))
         else:
             self.matches = matches
-            if parallel:
-                self._assign_cameras()
+        if parallel and self.matches is not None:
+            self._assign_cameras()
 
     def _test_matches(self):
         if self.matches is None:
@@ -1938,40 +4207,162 @@ class KeypointMatcher(object):
         for m, i, j in zip(self.matches.data, self.matches.row, self.matches.col):
             m.cams = self.images[i].cam, self.images[j].cam
 
-    def convert_matches(self, mtype, clear_uvs=False, parallel=False):
+    def matches_as_type(self, mtype, copy=True):
+        """
+        Return matches converted to a different type.
+
+        Arguments:
+            mtype (type): `Matches` class
+            copy (bool): Whether to return new `SparseMatches` (True)
+                or convert `self.matches` in place and return it (False)
+
+        Returns:
+            `SparseMatches`: Matches of type `mtype`
+        """
+        if not copy:
+            self.convert_matches(mtype)
+            return self.matches
+        store = self._match_store()
+        return SparseMatches(
+            data=store.to_matches(mtype), row=self.matches.row.copy(),
+            col=self.matches.col.copy(), shape=self.matches.shape)
+
+    def append_images(self, images, maxdt=None, min_nearest=0, seq=None,
+        keypoints=None, **params):
+        """
+        Append images to the sequence and match them to the existing images.
+
+        Only image pairs with at least one new image are matched,
+        and their matches are appended to `self.matches`.
+
+        Arguments:
+            images (iterable): Image objects in ascending temporal order,
+                all later than the last image of the sequence
+            maxdt (`datetime.timedelta`): Maximum time separation between
+                pairs of images to match (see `self.build_matches()`)
+            min_nearest (int): Minimum nearest neighbors to match on either side
+                of each image (see `self.build_matches()`)
+            seq (iterable): Positive index of neighbors to match to each image
+                (see `self.build_matches()`)
+            keypoints (dict): Arguments to `self.build_keypoints()` for the new images.
+                If `None`, keypoints are not built
+                (and must be cached or written to `Image.keypoints_path`).
+            **params: Additional arguments to `self.build_matches()`
+
+        Returns:
+            array: Index of the new images in `self.images`
+        """
+        images = np.asarray(images)
+        if not len(images):
+            return np.array([], dtype=int)
+        datetimes = [img.datetime for img in images]
+        if len(self.images):
+            datetimes.insert(0, self.images[-1].datetime)
+        if np.any(np.diff(datetimes) < datetime.timedelta(0)):
+            raise ValueError('Images are not in ascending temporal order')
+        n = len(self.images)
+        self.images = np.concatenate((self.images, images))
+        imgs = np.arange(n, len(self.images))
+        if keypoints is not None:
+            self.build_keypoints(imgs=imgs, **keypoints)
+        self.build_matches(maxdt=maxdt, min_nearest=min_nearest, seq=seq,
+            imgs=imgs, append=True, **params)
+        return imgs
+
+    def _match_store(self):
+        """
+        Return the matches as a `MatchStore`.
+        """
         self._test_matches()
-        parallel = helpers._parse_parallel(parallel)
-        def process(i, m):
-            m = m.as_type(mtype)
+        return MatchStore.from_matches(
+            cams=[img.cam for img in self.images],
+            pairs=np.column_stack((self.matches.row, self.matches.col)),
+            matches=self.matches.data)
+
+    def _update_matches(self, store):
+        """
+        Point matches to the (filtered) coordinates and weights of a `MatchStore`.
+
+        Coordinates are only updated if present in the matches.
+        Each pair receives copies, so that the matches do not share memory.
+
+        Arguments:
+            store (`MatchStore`): Store built by `self._match_store()`
+        """
+        for k, m in enumerate(self.matches.data):
+            index = slice(store.offsets[k], store.offsets[k + 1])
+            if m.uvs is not None:
+                m.uvs = [uv[index].copy() for uv in store.uvs]
+            if getattr(m, 'xys', None) is not None:
+                m.xys = [xy[index].copy() for xy in store.xys]
+            m.weights = None if store.weights is None else store.weights[index].copy()
+
+    def convert_matches(self, mtype, clear_uvs=False, parallel=False):
+        """
+        Convert matches to a different type.
+
+        Normalized camera coordinates are computed once for each image
+        (see `MatchStore.to_matches()`).
+
+        Arguments:
+            mtype (type): `Matches` class
+            clear_uvs (bool): Whether to clear image coordinates
+                (`RotationMatchesXY` and `RotationMatchesXYZ` only)
+            parallel: Deprecated and ignored, as conversions are vectorized
+                over all matches
+        """
+        if parallel:
+            warnings.warn(
+                '`parallel` is deprecated and ignored by convert_matches()', DeprecationWarning)
+        store = self._match_store()
+        for k, m in enumerate(store.to_matches(mtype)):
             if clear_uvs and mtype in (RotationMatchesXY, RotationMatchesXYZ):
                 m.uvs = None
-            return i, m
-        def reduce(i, m):
-            self.matches.data[i] = m
-        with config._MapReduce(np=parallel) as pool:
-            _ = pool.map(
-                func=process, reduce=reduce, star=True,
-                sequence=tuple(zip(range(self.matches.data.size), self.matches.data)))
-        if parallel:
-            self._assign_cameras()
+            self.matches.data[k] = m
 
     def filter_matches(self, clear_weights=False, parallel=False, **params):
-        self._test_matches()
-        parallel = helpers._parse_parallel(parallel)
-        def process(i, m):
-            if params:
-                m.filter(**params)
-            if clear_weights:
-                m.weights = None
-            return i, m
-        def reduce(i, m):
-            self.matches.data[i] = m
-        with config._MapReduce(np=parallel) as pool:
-            _ = pool.map(
-                func=process, reduce=reduce, star=True,
-                sequence=tuple(zip(range(self.matches.data.size), self.matches.data)))
+        """
+        Filter matches.
+
+        As for `Matches.filter()`, `max_error` is in the units of each match type:
+        normalized camera coordinates for `RotationMatchesXY`,
+        image coordinates otherwise, and unsupported for `RotationMatchesXYZ`.
+
+        Arguments:
+            clear_weights (bool): Whether to clear match weights
+            parallel: Deprecated and ignored, as filters are vectorized
+                over all matches
+            **params: Additional arguments to `MatchStore.filter()`
+        """
         if parallel:
-            self._assign_cameras()
+            warnings.warn(
+                '`parallel` is deprecated and ignored by filter_matches()', DeprecationWarning)
+        store = self._match_store()
+        if params.get('max_error'):
+            if any(isinstance(m, RotationMatchesXYZ) for m in self.matches.data):
+                raise AttributeError('max_error not supported by RotationMatchesXYZ')
+            params.setdefault('normalized', np.array(
+                [isinstance(m, RotationMatchesXY) for m in self.matches.data], dtype=bool))
+        if params:
+            store.filter(**params)
+        if clear_weights:
+            store.weights = None
+        self._update_matches(store)
+
+    def ransac_matches(self, **params):
+        """
+        Filter matches with RANSAC for the relative rotation of each image pair.
+
+        Arguments:
+            **params: Arguments to `MatchStore.ransac()`
+
+        Returns:
+            array: Rotation from camera j to camera i of each image pair (m, 3, 3)
+        """
+        store = self._match_store()
+        R = store.ransac(**params)
+        self._update_matches(store)
+        return R
 
     def _images_mask(self, imgs):
         if np.iterable(imgs):
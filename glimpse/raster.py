@@ -1,7 +1,7 @@
 from __future__ import (print_function, division, unicode_literals)
 from .backports import *
 from .imports import (require,
-    np, scipy, osgeo, matplotlib, datetime, copy, warnings, numbers)
+    np, scipy, osgeo, matplotlib, datetime, copy, warnings, numbers, collections)
 from . import (helpers)
 
 class Grid(object):
@@ -430,7 +430,7 @@ class Grid(object):
             tuple: Pairs of slice objects (rows, cols) with which to subset
                 gridded values
         """
-        n = np.round(self.n / size).astype(int)
+        n = np.maximum(np.round(self.n / size), 1).astype(int)
         xi = np.floor(np.arange(self.n[0]) / np.ceil(self.n[0] / n[0]))
         yi = np.floor(np.arange(self.n[1]) / np.ceil(self.n[1] / n[1]))
         xends = np.insert(np.searchsorted(xi, np.unique(xi), side='right'), 0, 0)
@@ -472,6 +472,7 @@ class Raster(Grid):
         self.crs = crs
         # Placeholders
         self._Zf = None
+        self._Zs = None
 
     def __eq__(self, other):
         return (
@@ -480,25 +481,8 @@ class Raster(Grid):
             (self.ylim == other.ylim).all())
 
     def __getitem__(self, indices):
-        if not isinstance(indices, tuple):
-            indices = (indices, slice(None))
-        if not all((isinstance(idx, (int, slice)) for idx in indices)):
-            raise IndexError('Only integers and slices are valid indices')
-        i, j = indices[0], indices[1]
-        if not isinstance(i, slice):
-            i = slice(i, i + 1)
-        if not isinstance(j, slice):
-            j = slice(j, j + 1)
-        d = self.d
-        if i.step and i.step > 1:
-            d[1] *= i.step
-        if j.step and j.step > 1:
-            d[0] *= j.step
-        x, y = self.x[j], self.y[i]
-        if len(x) < 3:
-            x = x[[0, -1]] + (-0.5, 0.5) * d[0:1]
-        if len(y) < 3:
-            y = y[[0, -1]] + (-0.5, 0.5) * d[1:2]
+        i, j = self._parse_indices(indices)
+        x, y = self._index_xy(i, j)
         return self.__class__(self.Z[i, j], x=x, y=y, datetime=self.datetime)
 
     @classmethod
@@ -564,7 +548,7 @@ class Raster(Grid):
     def Z(self, value):
         value = np.atleast_2d(value)
         if hasattr(self, '_Z'):
-            self._clear_cache(['Zf'])
+            self._clear_cache(['Zf', 'Zs'])
             if value.shape != self._Z.shape:
                 self._clear_cache(['x', 'X', 'y', 'Y'])
         self._Z = value
@@ -618,7 +602,7 @@ class Raster(Grid):
 
         If `grid` is True:
 
-            - Uses a `scipy.interpolate.RectBivariateSpline` object
+            - Uses a cached `scipy.interpolate.RectBivariateSpline` object (`self._Zs`)
             - Supports interpolation `order` 1 to 5
             - Much faster for large grids
 
@@ -708,6 +692,41 @@ class Raster(Grid):
                     samples = np.full(len(xy), self.Z.flat[0])
         return samples
 
+    def _parse_indices(self, indices):
+        """
+        Parse `__getitem__()` indices into row and column slices.
+        """
+        if not isinstance(indices, tuple):
+            indices = (indices, slice(None))
+        if not all((isinstance(idx, (int, slice)) for idx in indices)):
+            raise IndexError('Only integers and slices are valid indices')
+        i, j = indices[0], indices[1]
+        if not isinstance(i, slice):
+            i = slice(i, i + 1)
+        if not isinstance(j, slice):
+            j = slice(j, j + 1)
+        return i, j
+
+    def _index_xy(self, i, j):
+        """
+        Return the x and y coordinates of a subset of rows and columns.
+
+        Arguments:
+            i (slice): Row slice
+            j (slice): Column slice
+        """
+        d = self.d
+        if i.step and i.step > 1:
+            d[1] *= i.step
+        if j.step and j.step > 1:
+            d[0] *= j.step
+        x, y = self.x[j], self.y[i]
+        if len(x) < 3:
+            x = x[[0, -1]] + (-0.5, 0.5) * d[0:1]
+        if len(y) < 3:
+            y = y[[0, -1]] + (-0.5, 0.5) * d[1:2]
+        return x, y
+
     def _sample_1d(self, x, dim, kind='linear'):
         xdir = np.sign(self.d[dim]).astype(int)
         xi = (self.y if dim else self.x)[::xdir]
@@ -719,23 +738,62 @@ class Raster(Grid):
 
     def _sample_grid(self, xy, kx=1, ky=1, s=0):
         x, y = xy
-        signs = np.sign(self.d).astype(int)
-        # HACK: scipy.interpolate.RectBivariateSpline does not support NAN
-        Zmin = np.nanmin(self.Z)
-        is_nan = np.isnan(self.Z)
-        self.Z[is_nan] = helpers.numpy_dtype_minmax(self.Z.dtype)[0]
-        fun = scipy.interpolate.RectBivariateSpline(
-            self.y[::signs[1]], self.x[::signs[0]],
-            self.Z[::signs[1], ::signs[0]],
-            bbox=(min(self.ylim), max(self.ylim), min(self.xlim), max(self.xlim)),
-            kx=kx, ky=ky, s=s)
+        fun, nan_fun = self._spline(kx=kx, ky=ky, s=s)
         xdir = 1 if (len(x) < 2) or x[1] > x[0] else -1
         ydir = 1 if (len(y) < 2) or y[1] > y[0] else -1
         samples = fun(y[::ydir], x[::xdir], grid=True)[::ydir, ::xdir]
-        samples[samples < Zmin] = np.nan
-        self.Z[is_nan] = np.nan
+        if nan_fun is not None:
+            # NOTE: Tolerance absorbs round-off of zero spline weights
+            is_nan = nan_fun(y[::ydir], x[::xdir], grid=True)[::ydir, ::xdir] > 1e-9
+            samples[is_nan] = np.nan
         return samples
 
+    def _spline(self, kx=1, ky=1, s=0):
+        """
+        Return cached spline interpolants of `Z`.
+
+        Since `scipy.interpolate.RectBivariateSpline` does not support NaN,
+        missing values are filled with the nearest non-missing value (in a copy)
+        before fitting. A linear spline is fit to the missing-value mask, so that
+        samples which depend on missing values can be set to NaN.
+        `Z` itself is never modified. Splines are cached in `self._Zs`
+        by `kx`, `ky`, and `s` until `Z` is changed.
+
+        Arguments:
+            kx, ky (int): Spline degree in x and y
+            s (float): Smoothing factor
+
+        Returns:
+            `scipy.interpolate.RectBivariateSpline`: Spline of `Z`
+            `scipy.interpolate.RectBivariateSpline`: Linear spline of the
+                missing values in `Z`, or `None` if none are missing
+        """
+        key = (kx, ky, s)
+        if self._Zs is None:
+            self._Zs = dict()
+        if key not in self._Zs:
+            signs = np.sign(self.d).astype(int)
+            x, y = self.x[::signs[0]], self.y[::signs[1]]
+            Z = self.Z[::signs[1], ::signs[0]]
+            bbox = (min(self.ylim), max(self.ylim), min(self.xlim), max(self.xlim))
+            is_nan = np.isnan(Z)
+            if is_nan.all():
+                Z = np.zeros(Z.shape, dtype=float)
+            elif is_nan.any():
+                # Fill with nearest non-missing value
+                index = scipy.ndimage.distance_transform_edt(
+                    is_nan, return_distances=False, return_indices=True)
+                Z = Z[tuple(index)]
+            fun = scipy.interpolate.RectBivariateSpline(
+                y, x, Z, bbox=bbox, kx=kx, ky=ky, s=s)
+            if is_nan.any():
+                nan_fun = scipy.interpolate.RectBivariateSpline(
+                    y, x, is_nan.astype(float), bbox=bbox, kx=1, ky=1, s=0)
+            else:
+                nan_fun = None
+            self._Zs[key] = fun, nan_fun
+        return self._Zs[key]
+
     def resample(self, grid, order=1, bounds_error=False, fill_value=np.nan):
         """
         Resample `Raster`.
@@ -815,6 +873,7 @@ class Raster(Grid):
                 warnings.warn('Z cast to float to accommodate NaN')
                 self.Z = self.Z.astype(float)
             self.Z[outbounds] = np.nan
+            self._clear_cache(['Zf', 'Zs'])
 
     def resize(self, scale, order=1):
         """
@@ -840,6 +899,8 @@ class Raster(Grid):
         if dz is not None:
             # Prevent reset of cached interpolants
             self._Z += dz
+        # Reset cached splines (knots depend on x, y)
+        self._clear_cache(['Zs'])
         if self._Zf is not None:
             # Shift cached interpolants
             if dx is not None:
@@ -874,6 +935,7 @@ class Raster(Grid):
                 ind.extend(self.rowcol_to_idx(rowcols))
         # Apply
         self.Z.flat[ind] = value
+        self._clear_cache(['Zf', 'Zs'])
 
     def hillshade(self, azimuth=315, altitude=45, **kwargs):
         """
@@ -890,7 +952,7 @@ class Raster(Grid):
         return light.hillshade(self.Z, dx=self.d[0], dy=self.d[1], **kwargs)
 
     def fill_crevasses(self, maximum=dict(size=5), gaussian=dict(sigma=5),
-        mask=None, fill=False):
+        mask=None, fill=False, tile_size=None, parallel=False):
         """
         Apply a maximum filter to `Z`, then perform Gaussian smoothing.
 
@@ -901,11 +963,31 @@ class Raster(Grid):
                 or callable that generates the mask from `self.Z`.
                 If `None`, all cells are included.
             fill (bool): Whether to fill cells excluded by `mask` with interpolated values
+            tile_size (iterable): Target size of tiles to filter separately
+                (see `Grid.tile_indices()`). Results are identical to filtering
+                the whole raster. If `None`, the whole raster is filtered at once.
+            parallel: Number of parallel processes (int),
+                or whether to work in parallel (bool). If `True`,
+                defaults to `os.cpu_count()`. Only used with `tile_size`.
         """
         if callable(mask):
             mask = mask(self.Z)
-        self.Z = helpers.gaussian_filter(
-            helpers.maximum_filter(self.Z, **maximum, mask=mask, fill=fill),
+        if tile_size is None:
+            self.Z = self._fill_crevasses(self.Z, mask=mask,
+                maximum=maximum, gaussian=gaussian, fill=fill)
+        else:
+            halo = (
+                helpers.maximum_filter_radius(**maximum) +
+                helpers.gaussian_filter_radius(**gaussian))
+            self.Z = helpers.tiled_filter(self._fill_crevasses, self.Z,
+                tiles=self.tile_indices(size=tile_size), halo=halo, mask=mask,
+                parallel=parallel, maximum=maximum, gaussian=gaussian, fill=fill)
+
+    @staticmethod
+    def _fill_crevasses(Z, mask=None, maximum=dict(size=5), gaussian=dict(sigma=5),
+        fill=False):
+        return helpers.gaussian_filter(
+            helpers.maximum_filter(Z, **maximum, mask=mask, fill=fill),
             **gaussian, mask=mask, fill=fill)
 
     def viewshed(self, origin, correction=False):
@@ -1147,6 +1229,323 @@ class Raster(Grid):
         self._x = x
         self._y = y
 
+class LazyRaster(Raster):
+    """
+    A `LazyRaster` is a `Raster` whose values are read on demand.
+
+    Values are read from `Z` in blocks, and up to `max_blocks` blocks are cached
+    (least recently used blocks are discarded first).
+    `crop()` only updates the extent of the raster, while `__getitem__()` and
+    `sample()` read only the blocks they need into an in-memory `Raster`.
+    Accessing `Z` reads the full extent without caching the result.
+    Setting `Z` (for example, with `resize()` or `resample()`)
+    converts the `LazyRaster` to an in-memory raster.
+
+    Arguments:
+        Z: 2-dimensional array-like supporting `shape`, `dtype` and slicing
+            with `Z[rows, cols]`, for example a memory-mapped array
+            (`np.load(path, mmap_mode='r')`)
+        x (array-like): Either `xlim` or `x`
+        y (array-like): Either `ylim` or `y`
+
+    Attributes (in addition to those inherited from `Raster`):
+        block_size (array): Size of the blocks read from `Z` (nx, ny)
+        max_blocks (int): Maximum number of blocks to cache
+        lazy (bool): Whether values are read on demand (True)
+            or held in memory (False)
+    """
+
+    def __init__(self, Z, x=None, y=None, datetime=None, crs=None,
+        block_size=(256, 256), max_blocks=64):
+        self._source = Z
+        # Current extent as source (start, stop) rows and columns
+        self._window = np.array([[0, Z.shape[0]], [0, Z.shape[1]]])
+        self._zlim = None
+        self._dz = None
+        self._blocks = collections.OrderedDict()
+        self.block_size = np.array(helpers.format_list(block_size, length=2), dtype=int)
+        self.max_blocks = max_blocks
+        self.xlim, self._x, self._X = self._parse_xy(x, dim=0)
+        self.ylim, self._y, self._Y = self._parse_xy(y, dim=1)
+        self.datetime = datetime
+        self.crs = crs
+        # Placeholders
+        self._Zf = None
+        self._Zs = None
+
+    def __getitem__(self, indices):
+        if not self.lazy:
+            return super().__getitem__(indices)
+        i, j = self._parse_indices(indices)
+        x, y = self._index_xy(i, j)
+        rows = range(*i.indices(self.n[1]))
+        cols = range(*j.indices(self.n[0]))
+        if not rows or not cols:
+            raise IndexError('Indices select an empty raster')
+        Z = self._read(
+            (min(rows), max(rows) + 1),
+            (min(cols), max(cols) + 1))[::rows.step, ::cols.step]
+        return Raster(Z, x=x, y=y, datetime=self.datetime, crs=self.crs)
+
+    @classmethod
+    @require('osgeo')
+    def read(cls, path, band=1, xlim=None, ylim=None, datetime=None,
+        nan=None, **kwargs):
+        """
+        Read LazyRaster from gdal raster file.
+
+        Only the file metadata is read. Missing values are handled as in
+        `Raster.read()`.
+
+        Arguments:
+            path (str): Path to file
+            band (int): Raster band to read (1 = first band)
+            xlim (array-like): Crop bounds in x.
+                If `None` (default), read from file.
+            ylim (array-like): Crop bounds in y.
+                If `None` (default), read from file.
+            datetime (datetime): Capture date and time
+            nan (number): Value to interpret as missing
+            **kwargs: Additional arguments to `LazyRaster()`
+        """
+        raster = osgeo.gdal.Open(path, osgeo.gdal.GA_ReadOnly)
+        transform = raster.GetGeoTransform()
+        crs = raster.GetProjection()
+        obj = cls(_GDALBand(raster, band=band, nan=nan),
+            x=transform[0] + transform[1] * np.array([0, raster.RasterXSize]),
+            y=transform[3] + transform[5] * np.array([0, raster.RasterYSize]),
+            datetime=datetime, crs=crs if crs else None, **kwargs)
+        if xlim is not None or ylim is not None:
+            obj.crop(xlim=xlim, ylim=ylim)
+        return obj
+
+    @property
+    def lazy(self):
+        return self._source is not None
+
+    @property
+    def Z(self):
+        if self.lazy:
+            return self._read((0, self.n[1]), (0, self.n[0]))
+        return self._Z
+
+    @Z.setter
+    def Z(self, value):
+        if getattr(self, '_source', None) is not None:
+            # Convert to in-memory raster
+            self._source = None
+            self._blocks = collections.OrderedDict()
+            self._zlim, self._dz = None, None
+            self._clear_cache(['x', 'X', 'y', 'Y', 'Zf', 'Zs'])
+        value = np.atleast_2d(value)
+        if hasattr(self, '_Z'):
+            self._clear_cache(['Zf', 'Zs'])
+            if value.shape != self._Z.shape:
+                self._clear_cache(['x', 'X', 'y', 'Y'])
+        self._Z = value
+
+    @property
+    def n(self):
+        if self.lazy:
+            return np.diff(self._window, axis=1).ravel()[::-1].astype(int)
+        return super().n
+
+    @property
+    def zlim(self):
+        if not self.lazy:
+            return super().zlim
+        # Read in strips of blocks to limit memory use
+        limits = []
+        for start in range(0, self.n[1], self.block_size[1]):
+            stop = min(start + self.block_size[1], self.n[1])
+            Z = self._read((start, stop), (0, self.n[0]))
+            limits.append((np.nanmin(Z), np.nanmax(Z)))
+        limits = np.array(limits)
+        return np.array((np.nanmin(limits[:, 0]), np.nanmax(limits[:, 1])))
+
+    # ---- Methods (private) ----
+
+    def _read_block(self, i, j):
+        """
+        Return a cached block of source values.
+
+        Arguments:
+            i (int): Block row index
+            j (int): Block column index
+        """
+        key = i, j
+        if key in self._blocks:
+            self._blocks.move_to_end(key)
+        else:
+            nx, ny = self.block_size
+            self._blocks[key] = np.asarray(
+                self._source[(i * ny):((i + 1) * ny), (j * nx):((j + 1) * nx)])
+            while len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+        return self._blocks[key]
+
+    def _read(self, rows, cols):
+        """
+        Read values from source blocks.
+
+        Arguments:
+            rows (iterable): Start and stop row, relative to the current extent
+            cols (iterable): Start and stop column, relative to the current extent
+        """
+        rows = np.add(rows, self._window[0, 0]).astype(int)
+        cols = np.add(cols, self._window[1, 0]).astype(int)
+        nx, ny = self.block_size
+        dtype = np.dtype(self._source.dtype)
+        if self._zlim is not None and not np.issubdtype(dtype, np.floating):
+            dtype = np.dtype(float)
+        Z = np.empty((max(rows[1] - rows[0], 0), max(cols[1] - cols[0], 0)), dtype=dtype)
+        for i in range(rows[0] // ny, -(-rows[1] // ny)):
+            for j in range(cols[0] // nx, -(-cols[1] // nx)):
+                block = self._read_block(i, j)
+                r = max(rows[0], i * ny), min(rows[1], i * ny + block.shape[0])
+                c = max(cols[0], j * nx), min(cols[1], j * nx + block.shape[1])
+                Z[(r[0] - rows[0]):(r[1] - rows[0]), (c[0] - cols[0]):(c[1] - cols[0])] = block[
+                    (r[0] - i * ny):(r[1] - i * ny), (c[0] - j * nx):(c[1] - j * nx)]
+        if self._zlim is not None:
+            Z[(Z < self._zlim[0]) | (Z > self._zlim[1])] = np.nan
+        if self._dz is not None:
+            Z = Z + self._dz
+        return Z
+
+    def _sample_window(self, xy, grid=False, margin=1):
+        """
+        Return the rows and columns needed to sample points.
+
+        Arguments:
+            xy (array-like): Input coordinates (see `sample()`)
+            grid (bool): Whether `xy` defines a grid or invidual points
+            margin (int): Number of cells to include beyond the points
+
+        Returns:
+            slice: Row slice
+            slice: Column slice
+        """
+        if grid:
+            origin = np.append(self.xlim[0], self.ylim[0])
+            colrow = [
+                (np.asarray(xy[dim], dtype=float) - origin[dim]) / self.d[dim] - 0.5
+                for dim in (0, 1)]
+        else:
+            xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+            colrow = self.xy_to_rowcol(xy)[:, ::-1].T
+        slices = []
+        for dim in (1, 0):
+            x = colrow[dim][~np.isnan(colrow[dim])]
+            if not x.size:
+                slices.append(slice(0, 1))
+                continue
+            start = int(np.floor(x.min())) - margin
+            stop = int(np.ceil(x.max())) + margin + 1
+            slices.append(slice(
+                min(max(start, 0), self.n[dim] - 1),
+                max(min(stop, self.n[dim]), 1)))
+        return tuple(slices)
+
+    # ---- Methods (public) ----
+
+    def copy(self):
+        if not self.lazy:
+            return Raster(
+                self.Z.copy(), x=self.xlim.copy(), y=self.ylim.copy(),
+                datetime=copy.copy(self.datetime), crs=self.crs)
+        # NOTE: Copies share the (read-only) block cache
+        raster = copy.copy(self)
+        raster._window = self._window.copy()
+        raster._xlim, raster._ylim = self.xlim.copy(), self.ylim.copy()
+        raster._clear_cache(['x', 'X', 'y', 'Y', 'Zf', 'Zs'])
+        raster.datetime = copy.copy(self.datetime)
+        return raster
+
+    def sample(self, xy, grid=False, order=1, bounds_error=True, fill_value=np.nan):
+        """
+        Sample `LazyRaster` at points.
+
+        Reads only the region around the points (see `Raster.sample()`).
+        For spline interpolation (`grid=True` and `order > 1`),
+        results may differ slightly from those of the full raster.
+        """
+        if not self.lazy:
+            return super().sample(xy, grid=grid, order=order,
+                bounds_error=bounds_error, fill_value=fill_value)
+        rows, cols = self._sample_window(xy, grid=grid, margin=max(1, 2 * order))
+        return self[rows, cols].sample(xy, grid=grid, order=order,
+            bounds_error=bounds_error, fill_value=fill_value)
+
+    def crop(self, xlim=None, ylim=None, zlim=None):
+        """
+        Crop `LazyRaster`.
+
+        Crops are applied when values are read.
+        See `Raster.crop()` for details.
+        """
+        if not self.lazy:
+            return super().crop(xlim=xlim, ylim=ylim, zlim=zlim)
+        if xlim is not None or ylim is not None:
+            xlim, ylim, rows, cols = self.crop_extent(xlim=xlim, ylim=ylim)
+            self._window = self._window[:, 0:1] + np.array(
+                [[rows[0], rows[1] + 1], [cols[0], cols[1] + 1]])
+            self._clear_cache(['x', 'X', 'y', 'Y'])
+            self.xlim = xlim
+            self.ylim = ylim
+        if zlim is not None:
+            # Convert to source values
+            zlim = np.subtract((min(zlim), max(zlim)), self._dz or 0)
+            if self._zlim is not None:
+                zlim = max(zlim[0], self._zlim[0]), min(zlim[1], self._zlim[1])
+            self._zlim = tuple(zlim)
+        self._clear_cache(['Zf', 'Zs'])
+
+    def shift(self, dx=None, dy=None, dz=None):
+        if not self.lazy:
+            return super().shift(dx=dx, dy=dy, dz=dz)
+        self._shift_xy(dx=dx, dy=dy)
+        if dz is not None:
+            self._dz = dz + (self._dz or 0)
+        self._clear_cache(['Zf', 'Zs'])
+
+class _GDALBand(object):
+    """
+    Array-like access to a gdal raster band.
+
+    Missing values are handled as in `Raster.read()`.
+
+    Arguments:
+        dataset (`osgeo.gdal.Dataset`): Open gdal dataset
+        band (int): Raster band (1 = first band)
+        nan (number): Value to interpret as missing
+    """
+
+    def __init__(self, dataset, band=1, nan=None):
+        # NOTE: Reference dataset to keep band valid
+        self.dataset = dataset
+        self.band = dataset.GetRasterBand(band)
+        self.shape = dataset.RasterYSize, dataset.RasterXSize
+        dtype = np.dtype(osgeo.gdal_array.GDALTypeCodeToNumericTypeCode(
+            self.band.DataType))
+        default_nan = self.band.GetNoDataValue()
+        is_float = np.issubdtype(dtype, np.floating)
+        if nan is None and is_float and default_nan:
+            nan = default_nan
+        self.nan = nan
+        self.dtype = dtype if nan is None or is_float else np.dtype(float)
+
+    def __getitem__(self, indices):
+        rows = indices[0].indices(self.shape[0])
+        cols = indices[1].indices(self.shape[1])
+        Z = self.band.ReadAsArray(
+            # ReadAsArray() requires int, not numpy.int#
+            xoff=int(cols[0]), yoff=int(rows[0]),
+            win_xsize=int(cols[1] - cols[0]), win_ysize=int(rows[1] - rows[0]))
+        if self.nan is not None:
+            Z = Z.astype(self.dtype, copy=False)
+            Z[Z == self.nan] = np.nan
+        return Z
+
 class RasterInterpolant(object):
     """
     Attributes:
@@ -1158,14 +1557,39 @@ class RasterInterpolant(object):
         x (array): 1-dimensional coordinates of the observations,
             as either numbers or `datetime.datetime`.
             If `None`, tries to read datetimes from `means`.
+        max_pairs (int): Maximum number of co-registered Raster pairs to cache
+            (least recently used pairs are discarded first).
+            Pairs read with `fun` are not cached.
+            The cache is cleared when `means` or `sigmas` are set,
+            but not if the Rasters they contain are modified in place.
     """
 
-    def __init__(self, means, x=None, sigmas=None):
+    def __init__(self, means, x=None, sigmas=None, max_pairs=4):
         self.means = means
         if x is None:
             x = [raster.datetime for raster in means]
         self.x = np.asarray(x)
         self.sigmas = sigmas
+        self.max_pairs = max_pairs
+
+    @property
+    def means(self):
+        return self._means
+
+    @means.setter
+    def means(self, value):
+        self._means = value
+        self._grids = dict()
+        self._pairs = collections.OrderedDict()
+
+    @property
+    def sigmas(self):
+        return self._sigmas
+
+    @sigmas.setter
+    def sigmas(self, value):
+        self._sigmas = value
+        self._pairs = collections.OrderedDict()
 
     def _parse_as_raster(self, obj, xi=None, d=None, xlim=None, ylim=None):
         t = xi if isinstance(xi, datetime.datetime) else None
@@ -1225,12 +1649,92 @@ class RasterInterpolant(object):
         if isinstance(obj, Raster):
             return obj.grid
         elif isinstance(obj, str):
-            return Grid.read(obj)
+            if index not in self._grids:
+                self._grids[index] = Grid.read(obj)
+            return self._grids[index]
         elif isinstance(obj, numbers.Number):
             return Grid(n=(1, 1), x=(-np.inf, np.inf), y=(-np.inf, np.inf))
         else:
             raise ValueError('Cannot cast as Grid: ' + str(type(obj)))
 
+    def _pair_extent(self, ij, d=None, xlim=None, ylim=None):
+        """
+        Return the common grid of a pair of Rasters.
+
+        Uses the lowest resolution and smallest extent (see `__call__()`).
+
+        Returns:
+            float: Grid cell size
+            array: Limits in x
+            array: Limits in y
+        """
+        grids = [self._read_mean_grid(k) for k in ij]
+        if d is None:
+            d = np.max(np.abs(np.stack([grid.d for grid in grids])))
+        if xlim is None:
+            xlim = (-np.inf, np.inf)
+        if ylim is None:
+            ylim = (-np.inf, np.inf)
+        boxes = [grid.box2d for grid in grids]
+        boxes.append([min(xlim), min(ylim), max(xlim), max(ylim)])
+        box = helpers.intersect_boxes(boxes)
+        return d, box[0::2], box[1::2]
+
+    def _read_pair(self, ij, d, xlim, ylim, zlim=None, sigma=False,
+        fun=None, **kwargs):
+        """
+        Return a pair of co-registered Rasters.
+
+        Pairs are read from a least-recently-used cache unless `fun` is used.
+
+        Arguments:
+            ij (iterable): Indices of the Rasters
+            d (float): Grid cell size
+            xlim (iterable): Crop bounds in x
+            ylim (iterable): Crop bounds in y
+            zlim (iterable): (means only) Crop bounds in z
+            sigma (bool): Whether to also read the sigma Rasters
+            fun (callable): (means only) Function to apply to each Raster
+            **kwargs (dict): Additional arguments passed to `fun`
+
+        Returns:
+            dict: means (list of `Raster`), dz (array: difference of means),
+                and if `sigma` is True, sigmas (list of `Raster`) and
+                variances (tuple of array: first and sum of variances)
+        """
+        key = (
+            tuple(ij), float(d), tuple(np.asarray(xlim, dtype=float)),
+            tuple(np.asarray(ylim, dtype=float)),
+            None if zlim is None else tuple(zlim))
+        cache = fun is None and self.max_pairs
+        if cache and key in self._pairs:
+            self._pairs.move_to_end(key)
+            pair = self._pairs[key]
+        else:
+            means = [self._read_mean(k, d=d, xlim=xlim, ylim=ylim, zlim=zlim,
+                fun=fun, **kwargs)
+                for k in ij]
+            if means[0].grid != means[1].grid:
+                if means[1] is self.means[ij[1]]:
+                    means[1] = means[1].copy()
+                means[1].resample(means[0])
+            pair = dict(means=means, dz=means[1].Z - means[0].Z)
+            if cache:
+                self._pairs[key] = pair
+                while len(self._pairs) > self.max_pairs:
+                    self._pairs.popitem(last=False)
+        if sigma and 'sigmas' not in pair:
+            sigmas = [self._read_sigma(k, d=d, xlim=xlim, ylim=ylim) for k in ij]
+            if sigmas[0].grid != sigmas[1].grid:
+                if self.sigmas is not None and sigmas[1] is self.sigmas[ij[1]]:
+                    sigmas[1] = sigmas[1].copy()
+                sigmas[1].resample(sigmas[0])
+            pair['sigmas'] = sigmas
+            # Variance of the first sigma and sum of variances
+            variance = sigmas[0].Z**2
+            pair['variances'] = variance, variance + sigmas[1].Z**2
+        return pair
+
     def nearest(self, xi, extrapolate=False):
         """
         Return the indices of the two nearest Rasters.
@@ -1257,26 +1761,70 @@ class RasterInterpolant(object):
         ij.sort(key=lambda index: self.x[index])
         return ij
 
-    def _interpolate(self, means, x, xi, sigmas=None):
-        dz = means[1].Z - means[0].Z
+    def _interpolate_arrays(self, pair, x, xi, sigma=False):
+        """
+        Interpolate values between a pair of Rasters.
+
+        Arguments:
+            pair (dict): Rasters as returned by `_read_pair()`
+            x (iterable): 1-dimensional coordinates of the pair
+            xi (iterable): 1-dimensional coordinates to interpolate to
+            sigma (bool): Whether to also return the interpolated sigmas
+
+        Returns:
+            array: Interpolated means (n, rows, cols)
+            array: Interpolated sigmas (n, rows, cols), if `sigma` is True
+        """
+        means, dz = pair['means'], pair['dz']
         dx = x[1] - x[0]
-        scale = ((xi - x[0]) / dx)
-        z = means[0].Z + dz * scale
-        t = xi if isinstance(xi, datetime.datetime) else None
-        raster = means[0].__class__(z,
-            x=means[0].xlim, y=means[0].ylim, datetime=t)
-        if sigmas is not None:
-            # Bounds uncertainty: error propagation of z above
-            # NOTE: 'a * (1 - scale) + b * scale' form underestimates uncertainty
-            z_var = sigmas[0].Z**2 + scale**2 * (sigmas[0].Z**2 + sigmas[1].Z**2)
-            # Interpolation uncertainty: nearest bound at 99.7%
-            nearest_dx = np.min(np.abs(np.subtract(xi, x)))
-            zi_var = ((1 / 3) * dz * (nearest_dx / dx))**2
-            sigma = raster.__class__(np.sqrt(z_var + zi_var),
+        xi = np.asarray(xi)
+        def fraction(dxi):
+            # NOTE: Pair is a single Raster if xi falls on an observation
+            if not dx:
+                return np.zeros((len(dxi), 1, 1))
+            return np.reshape((dxi / dx).astype(float), (-1, 1, 1))
+        scale = fraction(xi - x[0])
+        z = dz * scale
+        z += means[0].Z
+        if not sigma:
+            return z
+        variances = pair['variances']
+        # Bounds uncertainty: error propagation of z above
+        # NOTE: 'a * (1 - scale) + b * scale' form underestimates uncertainty
+        z_var = variances[0] + scale**2 * variances[1]
+        # Interpolation uncertainty: nearest bound at 99.7%
+        nearest_dx = np.abs(np.subtract.outer(xi, x)).min(axis=1)
+        zi_var = ((1 / 3) * dz * fraction(nearest_dx))**2
+        return z, np.sqrt(z_var + zi_var)
+
+    def _interpolate(self, pair, x, xi, sigma=False):
+        """
+        Interpolate between a pair of Rasters.
+
+        Arguments:
+            pair (dict): Rasters as returned by `_read_pair()`
+            x (iterable): 1-dimensional coordinates of the pair
+            xi (iterable): 1-dimensional coordinates of the interpolated Rasters
+            sigma (bool): Whether to also return the interpolated sigmas
+
+        Returns:
+            list: Interpolated means (`Raster`), or
+                means and sigmas (`Raster`, `Raster`) if `sigma` is True
+        """
+        means = pair['means']
+        z = self._interpolate_arrays(pair, x=x, xi=xi, sigma=sigma)
+        if sigma:
+            z, zsigma = z
+        results = []
+        for k, xik in enumerate(xi):
+            t = xik if isinstance(xik, datetime.datetime) else None
+            raster = means[0].__class__(z[k],
                 x=means[0].xlim, y=means[0].ylim, datetime=t)
-            return raster, sigma
-        else:
-            return raster
+            if sigma:
+                raster = raster, raster.__class__(zsigma[k],
+                    x=means[0].xlim, y=means[0].ylim, datetime=t)
+            results.append(raster)
+        return results
 
     def __call__(self, xi, d=None, xlim=None, ylim=None, zlim=None,
         return_sigma=False, extrapolate=False, fun=None, **kwargs):
@@ -1303,34 +1851,76 @@ class RasterInterpolant(object):
         """
         ij = self.nearest(xi, extrapolate=extrapolate)
         # Determine common grid (lowest resolution, smallest extent)
-        grids = [self._read_mean_grid(k) for k in ij]
-        if d is None:
-            d = np.max(np.abs(np.stack([grid.d for grid in grids])))
-        if xlim is None:
-            xlim = (-np.inf, np.inf)
-        if ylim is None:
-            ylim = (-np.inf, np.inf)
-        boxes = [grid.box2d for grid in grids]
-        boxes.append([min(xlim), min(ylim), max(xlim), max(ylim)])
-        box = helpers.intersect_boxes(boxes)
-        xlim, ylim = box[0::2], box[1::2]
-        # Read mean rasters
-        means = [self._read_mean(k, d=d, xlim=xlim, ylim=ylim, zlim=zlim,
-            fun=fun, **kwargs)
-            for k in ij]
-        if means[0].grid != means[1].grid:
-            if means[1] is self.means[ij[1]]:
-                means[1] = means[1].copy()
-            means[1].resample(means[0])
-        # Read sigma rasters
+        d, xlim, ylim = self._pair_extent(ij, d=d, xlim=xlim, ylim=ylim)
+        # Read mean (and sigma) rasters
+        pair = self._read_pair(ij, d=d, xlim=xlim, ylim=ylim, zlim=zlim,
+            sigma=return_sigma, fun=fun, **kwargs)
+        # Interpolate
+        return self._interpolate(pair, x=self.x[ij], xi=[xi], sigma=return_sigma)[0]
+
+    def iterate(self, xi, d=None, xlim=None, ylim=None, zlim=None,
+        return_sigma=False, extrapolate=False, fun=None, chunk_size=16, **kwargs):
+        """
+        Generate interpolated Rasters.
+
+        Each pair of Rasters is read once for each run of consecutive `xi`
+        that it brackets (and may be reused from cache, see `max_pairs`),
+        and interpolated in vectorized chunks.
+
+        Arguments:
+            xi (iterable): 1-dimensional coordinates of the interpolated Rasters
+            chunk_size (int): Maximum number of Rasters to interpolate at once
+            **kwargs (dict): Additional arguments passed to `fun`.
+                See `__call__()` for the remaining arguments.
+
+        Yields:
+            `Raster`: Interpolated Raster, or
+                (`Raster`, `Raster`): Interpolated mean and sigma if `return_sigma` is True
+        """
+        xi = list(xi)
+        pairs = [tuple(self.nearest(xik, extrapolate=extrapolate)) for xik in xi]
+        start = 0
+        while start < len(xi):
+            # Find run of coordinates bracketed by the same pair
+            stop = start + 1
+            while stop < len(xi) and pairs[stop] == pairs[start]:
+                stop += 1
+            ij = list(pairs[start])
+            # Determine common grid (lowest resolution, smallest extent)
+            pair_d, pair_xlim, pair_ylim = self._pair_extent(
+                ij, d=d, xlim=xlim, ylim=ylim)
+            # Read mean (and sigma) rasters
+            pair = self._read_pair(ij, d=pair_d, xlim=pair_xlim, ylim=pair_ylim,
+                zlim=zlim, sigma=return_sigma, fun=fun, **kwargs)
+            # Interpolate
+            for k in range(start, stop, chunk_size):
+                results = self._interpolate(pair, x=self.x[ij],
+                    xi=xi[k:min(k + chunk_size, stop)], sigma=return_sigma)
+                for result in results:
+                    yield result
+            start = stop
+
+    def write(self, xi, paths, sigma_paths=None, nan=None, crs=None, **kwargs):
+        """
+        Write interpolated Rasters to file.
+
+        Rasters are generated (see `iterate()`) and written one at a time.
+
+        Arguments:
+            xi (iterable): 1-dimensional coordinates of the interpolated Rasters
+            paths (iterable): Path to file of each interpolated mean
+            sigma_paths (iterable): Path to file of each interpolated sigma.
+                If `None`, sigmas are not computed.
+            nan (number): Value to write for missing values (see `Raster.write()`)
+            crs: Coordinate reference system (see `Raster.write()`)
+            **kwargs (dict): Additional arguments passed to `iterate()`
+        """
+        return_sigma = sigma_paths is not None
+        rasters = self.iterate(xi, return_sigma=return_sigma, **kwargs)
         if return_sigma:
-            sigmas = [self._read_sigma(k, d=d, xlim=xlim, ylim=ylim) for k in ij]
-            if sigmas[0].grid != sigmas[1].grid:
-                if sigmas[1] is self.sigmas[ij[1]]:
-                    sigmas[1] = sigmas[1].copy()
-                sigmas[1].resample(sigmas[0])
+            for (mean, sigma), path, sigma_path in zip(rasters, paths, sigma_paths):
+                mean.write(path, nan=nan, crs=crs)
+                sigma.write(sigma_path, nan=nan, crs=crs)
         else:
-            sigmas = None
-        # Interpolate
-        return self._interpolate(
-            means=means, sigmas=sigmas, x=self.x[ij], xi=xi)
+            for mean, path in zip(rasters, paths):
+                mean.write(path, nan=nan, crs=crs)
@@ -2,7 +2,7 @@ from __future__ import (print_function, division, unicode_literals)
 from .backports import *
 from .imports import (np, cv2, warnings, datetime, scipy, matplotlib, sys,
     traceback, collections)
-from . import (helpers, raster, config)
+from . import (helpers, raster, config, image)
 
 class Tracker(object):
     """
@@ -118,8 +118,10 @@ class Tracker(object):
             imgs (iterable): Image index for each Observer, or `None` to skip
             motion_model (MotionModel): Motion model
         """
-        log_likelihoods = [self.compute_observer_log_likelihoods(obs, img)
-            for obs, img in enumerate(imgs)]
+        imgs = list(imgs)
+        uvs = self.project_particles(imgs)
+        log_likelihoods = [self.compute_observer_log_likelihoods(obs, img, uv=uv)
+            for obs, (img, uv) in enumerate(zip(imgs, uvs))]
         if motion_model:
             log_likelihoods.append(
                 motion_model.compute_log_likelihoods(self.particles))
@@ -450,13 +452,48 @@ class Tracker(object):
             obs=obs, img=img, box=box, return_histogram=True)
         self.templates[obs] = template
 
-    def compute_observer_log_likelihoods(self, obs, img):
+    def project_particles(self, imgs):
+        """
+        Project particle positions into the image of each Observer.
+
+        Particles are projected into the images of all Observers with the same
+        elevation correction at once (see `image.CameraArray`).
+
+        Arguments:
+            imgs (iterable): Image index for each Observer, or `None` to skip
+
+        Returns:
+            list: Image coordinates (n, 2) for each Observer, or `None`
+        """
+        uvs = [None] * len(self.observers)
+        groups = []
+        for obs, img in enumerate(imgs):
+            if img is None:
+                continue
+            correction = self.observers[obs].correction
+            for group in groups:
+                if group[0] == correction:
+                    group[1].append(obs)
+                    break
+            else:
+                groups.append((correction, [obs]))
+        for correction, group in groups:
+            cams = image.CameraArray.from_cameras(
+                [self.observers[obs].images[imgs[obs]].cam for obs in group])
+            puvs = cams.project(self.particles[:, 0:3], correction=correction)
+            for obs, uv in zip(group, puvs):
+                uvs[obs] = uv
+        return uvs
+
+    def compute_observer_log_likelihoods(self, obs, img, uv=None):
         """
         Compute the log likelihoods of each particle for an Observer.
 
         Arguments:
             obs (int): Observer index
             img (int): Image index for Observer `obs`
+            uv (array): Image coordinates of particles in image `img` (n, 2).
+                If `None`, particles are projected with `Observer.project()`.
 
         Returns:
             array: Particle log likelihoods, or `None`
@@ -466,7 +503,8 @@ class Tracker(object):
             return constant_log_likelihood
         # Build image box around all particles, with a buffer for template matching
         size = np.asarray(self.templates[obs]['tile'].shape[0:2][::-1])
-        uv = self.observers[obs].project(self.particles[:, 0:3], img=img)
+        if uv is None:
+            uv = self.observers[obs].project(self.particles[:, 0:3], img=img)
         halfsize = size * 0.5
         box = np.row_stack((
             uv.min(axis=0) - halfsize,
@@ -62,3 +62,43 @@ def test_reprojection_distorted_extreme(tol=1e-12):
     cam = glimpse.Camera(k=-2)
     err = reprojection_errors(cam)
     assert err.max() < tol
+
+def test_camera_array_projection(tol=1e-9):
+    np.random.seed(0)
+    cams = [
+        glimpse.Camera(xyz=(0, 0, 10), viewdir=(5, -3, 1), imgsz=(200, 150), f=(180, 185)),
+        glimpse.Camera(xyz=(5, -2, 12), viewdir=(12, -4, -2), imgsz=(200, 150),
+            f=(190, 190), c=(3, -2), k=(0.05, -0.01, 0, 0, 0, 0), p=(0.001, -0.002)),
+        glimpse.Camera(xyz=(-3, 1, 8), viewdir=(-8, 2, 0), imgsz=(300, 200),
+            f=(250, 240), k=-0.1)]
+    cams_array = glimpse.CameraArray.from_cameras(cams)
+    assert len(cams_array) == len(cams)
+    xyz = np.column_stack((
+        np.random.uniform(-100, 100, 20),
+        np.random.uniform(300, 500, 20),
+        np.random.uniform(-20, 20, 20)))
+    uv, depth = cams_array.project(xyz, return_depth=True)
+    assert uv.shape == (3, 20, 2)
+    for i, cam in enumerate(cams):
+        cuv, cdepth = cam.project(xyz, return_depth=True)
+        np.testing.assert_allclose(uv[i], cuv, rtol=0, atol=tol)
+        np.testing.assert_allclose(depth[i], cdepth, rtol=0, atol=tol)
+    xyz_i = cams_array.invproject(uv, directions=False, depth=depth)
+    assert np.abs(xyz_i - xyz).max() < 1e-6
+    np.testing.assert_equal(cams_array.inframe(uv),
+        [cam.inframe(cuv) for cam, cuv in zip(cams, uv)])
+
+def test_camera_array_indexing():
+    cams = [glimpse.Camera(viewdir=(i, 0, 0)) for i in range(3)]
+    cams_array = glimpse.CameraArray.from_cameras(cams)
+    cam = cams_array[1]
+    assert isinstance(cam, glimpse.Camera)
+    cam.viewdir = (10, 0, 0)
+    assert all(cams_array.viewdir[1] == (10, 0, 0))
+    assert all(cams[1].viewdir == (1, 0, 0))
+    subset = cams_array[[0, 2]]
+    assert isinstance(subset, glimpse.CameraArray)
+    np.testing.assert_equal(subset.vectors, cams_array.vectors[[0, 2]])
+    copies = cams_array.to_cameras()
+    copies[0].viewdir = (20, 0, 0)
+    assert all(cams_array.viewdir[0] == (0, 0, 0))
@@ -1,5 +1,7 @@
 from .context import *
-from glimpse.imports import (np)
+from glimpse.imports import (np, datetime, lmfit)
+import types
+import pytest
 
 def test_ransac_polynomial():
     data = np.column_stack((
@@ -11,6 +13,42 @@ def test_ransac_polynomial():
         sample_size=2, max_error=0.5, min_inliers=2, iterations=100)
     assert set(rindex) == set(inliers)
 
+def test_ransac_adaptive():
+    np.random.seed(0)
+    x = np.arange(100, dtype=float)
+    y = 2 * x + 1 + np.random.normal(scale=0.1, size=100)
+    outliers = np.random.choice(100, size=20, replace=False)
+    y[outliers] += np.random.uniform(5, 50, size=20)
+    model = glimpse.optimize.Polynomial(np.column_stack((x, y)), deg=1)
+    inliers = np.setdiff1d(np.arange(100), outliers)
+    for method in ('ransac', 'msac', 'lo-msac'):
+        rvalues, rindex = glimpse.optimize.ransac(model, sample_size=2,
+            max_error=1, min_inliers=10, iterations=1000, confidence=0.99,
+            method=method, parallel=2, batch_size=4)
+        np.testing.assert_equal(rindex, inliers)
+        assert np.abs(rvalues - (2, 1)).max() < 0.1
+    assert glimpse.optimize.ransac_iterations(0.8, 2, confidence=0.99) == 5
+
+def test_ransac_failed_fits():
+    class Model(glimpse.optimize.Polynomial):
+        def fit(self, index=slice(None)):
+            return None
+    model = Model(np.random.random((10, 2)))
+    with pytest.raises(ValueError):
+        glimpse.optimize.ransac(model, sample_size=2, max_error=1,
+            min_inliers=2, iterations=10)
+
+def test_ransac_refit_min_inliers():
+    np.random.seed(0)
+    x = np.arange(20, dtype=float)
+    model = glimpse.optimize.Polynomial(np.column_stack((x, 2 * x + 1)), deg=1)
+    # Refit to the inliers of the best hypothesis has no inliers
+    model.fit = lambda index=slice(None): np.array([0.0, 100.0])
+    hypothesis = lambda index: glimpse.optimize.Polynomial.fit(model, index)
+    rvalues, rindex = glimpse.optimize.ransac(model, sample_size=2, max_error=1,
+        min_inliers=5, iterations=10, method='msac', hypothesis=hypothesis)
+    assert np.allclose(rvalues, (2, 1)) and len(rindex) == 20
+
 def test_ransac_camera_viewdir(tol=0.1):
     path = os.path.join(test_dir, 'AK10b_20141013_020336.JPG')
     imgA = glimpse.Image(path)
@@ -31,3 +69,656 @@ def test_ransac_camera_viewdir(tol=0.1):
     rvalues, rindex = glimpse.optimize.ransac(model,
         sample_size=12, max_error=5, min_inliers=10, iterations=10)
     assert all(abs(rvalues - viewdir) < tol)
+
+def _finite_jacobian(model, params, step=1e-6):
+    residuals = model.residuals(params=params).ravel()
+    columns = []
+    for i in range(len(params)):
+        stepped = params.copy()
+        stepped[i] += step
+        columns.append((model.residuals(params=stepped).ravel() - residuals) / step)
+    return np.column_stack(columns)
+
+def test_cameras_jacobian(tol=1e-4):
+    np.random.seed(0)
+    internals = dict(imgsz=(200, 150), f=(180, 185), c=(3, -2),
+        k=(0.05, -0.01, 0, 0, 0, 0), p=(0.001, -0.002))
+    camA = glimpse.Camera(xyz=(0, 0, 10), viewdir=(10, -5, 1), **internals)
+    camB = glimpse.Camera(xyz=(0, 0, 10), viewdir=(14, -4, 0), **internals)
+    xyz = np.column_stack((
+        np.random.uniform(-50, 100, 50),
+        np.random.uniform(300, 500, 50),
+        np.random.uniform(-20, 20, 50)))
+    uvA, uvB = camA.project(xyz), camB.project(xyz)
+    inframe = camA.inframe(uvA) & camB.inframe(uvB)
+    points = glimpse.optimize.Points(camA, uvA + 0.5, xyz)
+    matches = glimpse.optimize.Matches((camA, camB), (uvA[inframe], uvB[inframe]))
+    model = glimpse.optimize.Cameras((camA, camB), (points, matches),
+        cam_params=(dict(viewdir=True, p=True), dict(viewdir=[0, 1], f=True, k=0)),
+        group_indices=(0, 1), group_params=dict(c=True, viewdir=2))
+    params = np.array(list(model.params.valuesdict().values()))
+    J = model.jacobian(params=params)
+    assert J.shape == (2 * model.data_size(), len(params))
+    np.testing.assert_allclose(J.toarray(), _finite_jacobian(model, params),
+        rtol=0, atol=tol * np.abs(J).max())
+
+def test_cameras_fit_jacobian(tol=1e-3):
+    np.random.seed(0)
+    cams = [glimpse.Camera(xyz=(0, 0, 10), viewdir=(3 * i, -5, 0),
+        imgsz=(400, 300), f=(380, 380)) for i in range(4)]
+    xyz = np.column_stack((
+        np.random.uniform(-1000, 1000, 2000),
+        np.random.uniform(200, 1000, 2000),
+        np.random.uniform(-30, 50, 2000)))
+    matches = []
+    for camA, camB in zip(cams[:-1], cams[1:]):
+        uvA, uvB = camA.project(xyz), camB.project(xyz)
+        inframe = camA.inframe(uvA) & camB.inframe(uvB)
+        matches.append(glimpse.optimize.RotationMatches(
+            (camA, camB), (uvA[inframe], uvB[inframe])))
+    viewdirs = [cam.viewdir.copy() for cam in cams]
+    for cam in cams[1:]:
+        cam.viewdir += (0.5, -0.5, 0.2)
+    model = glimpse.optimize.Cameras(cams, matches,
+        cam_params=[dict()] + [dict(viewdir=True)] * 3)
+    values = model.fit(jacobian=True)
+    assert np.abs(values - np.concatenate(viewdirs[1:])).max() < tol
+
+def test_cameras_set_cameras_scatter():
+    cams = [glimpse.Camera(viewdir=(3 * i, 0, 0), imgsz=(100, 100), f=(100, 100))
+        for i in range(3)]
+    uv = np.random.uniform(40, 60, size=(5, 2))
+    matches = [glimpse.optimize.Matches((camA, camB), (uv, uv))
+        for camA, camB in zip(cams[:-1], cams[1:])]
+    model = glimpse.optimize.Cameras(cams, matches,
+        cam_params=[dict(viewdir=True), dict(viewdir=[0, 1], f=[0]), dict()],
+        group_indices=[[0, 1], [1, 2]], group_params=[dict(k=[0]), dict(f=True)])
+    params = np.random.uniform(size=model.cam_breaks[-1])
+    model.set_cameras(list(params))
+    expected = [cam.vector.copy() for cam in cams]
+    model.reset_cameras()
+    model.set_cameras(params)
+    for cam, vector in zip(cams, expected):
+        np.testing.assert_equal(cam.vector, vector)
+    # Camera vectors are updated in place
+    cams_array = glimpse.CameraArray.from_cameras(cams)
+    linked = [cams_array[i] for i in range(len(cams))]
+    model = glimpse.optimize.Cameras(linked, [glimpse.optimize.Matches((camA, camB), (uv, uv))
+        for camA, camB in zip(linked[:-1], linked[1:])], cam_params=[dict(viewdir=True)] * 3)
+    params = np.random.uniform(size=9)
+    model.set_cameras(params)
+    np.testing.assert_equal(cams_array.viewdir, params.reshape(-1, 3))
+    model.reset_cameras()
+    np.testing.assert_equal(cams_array.vectors, np.row_stack(model.vectors))
+
+def test_cameras_fit_backends(tol=1e-3):
+    np.random.seed(0)
+    cams = [glimpse.Camera(xyz=(0, 0, 10), viewdir=(3 * i, -5, 0),
+        imgsz=(400, 300), f=(380, 380)) for i in range(3)]
+    xyz = np.column_stack((
+        np.random.uniform(-1000, 1000, 500),
+        np.random.uniform(200, 1000, 500),
+        np.random.uniform(-30, 50, 500)))
+    matches = []
+    for camA, camB in zip(cams[:-1], cams[1:]):
+        uvA, uvB = camA.project(xyz), camB.project(xyz)
+        inframe = camA.inframe(uvA) & camB.inframe(uvB)
+        matches.append(glimpse.optimize.Matches(
+            (camA, camB), (uvA[inframe], uvB[inframe])))
+    viewdirs = np.concatenate([cam.viewdir.copy() for cam in cams[1:]])
+    for cam in cams[1:]:
+        cam.viewdir += (0.5, -0.5, 0.2)
+    model = glimpse.optimize.Cameras(cams, matches,
+        cam_params=[dict()] + [dict(viewdir=True)] * 2)
+    scipy_values = model.fit(backend='scipy')
+    lmfit_values = model.fit(backend='lmfit', method='leastsq')
+    assert np.abs(scipy_values - viewdirs).max() < tol
+    assert np.abs(lmfit_values - viewdirs).max() < tol
+    with pytest.raises(ValueError):
+        model.fit(backend='scipy', method='leastsq')
+    with pytest.raises(ValueError):
+        model.fit(backend='scipy', nan_policy='raise')
+    # lmfit is used by default, even if controls support the analytic jacobian
+    result = model.fit(method='leastsq', full=True)
+    assert isinstance(result, lmfit.minimizer.MinimizerResult)
+
+def test_cameras_sparsity():
+    cams = [glimpse.Camera(viewdir=(3 * i, 0, 0), imgsz=(100, 100), f=(100, 100))
+        for i in range(4)]
+    uv = np.random.uniform(40, 60, size=(5, 2))
+    matches = [glimpse.optimize.Matches((camA, camB), (uv, uv))
+        for camA, camB in zip(cams[:-1], cams[1:])]
+    model = glimpse.optimize.Cameras(cams, matches,
+        cam_params=[dict(viewdir=True)] * 3 + [dict()],
+        group_indices=[[0, 1]], group_params=[dict(f=True)])
+    # Columns: group f (0, 1) | cam0 (2-4) | cam1 (5-7) | cam2 (8-10)
+    expected = np.zeros((30, 11), dtype=int)
+    expected[0:10, 0:8] = 1
+    expected[10:20, 0:2] = 1
+    expected[10:20, 5:11] = 1
+    expected[20:30, 8:11] = 1
+    np.testing.assert_equal(model.sparsity.toarray(), expected)
+    # Sparsity includes all nonzero derivatives
+    J = model.jacobian().toarray()
+    assert not (J[expected == 0]).any()
+
+def test_cameras_residuals_layout():
+    np.random.seed(0)
+    cams = [glimpse.Camera(viewdir=(3 * i, 0, 0), imgsz=(100, 100), f=(100, 100))
+        for i in range(3)]
+    matches = [glimpse.optimize.RotationMatches((camA, camB),
+        (np.random.uniform(20, 80, size=(n, 2)), np.random.uniform(20, 80, size=(n, 2))))
+        for camA, camB, n in zip(cams[:-1], cams[1:], (4, 6))]
+    model = glimpse.optimize.Cameras(cams, matches,
+        cam_params=[dict(viewdir=True)] * 3, weights=np.arange(1, 11))
+    np.testing.assert_equal(model.control_breaks, (0, 4, 10))
+    expected = np.vstack([m.predicted() for m in matches])
+    np.testing.assert_equal(model.predicted(), expected)
+    index = np.array([7, 1, 5, 0])
+    np.testing.assert_equal(model.predicted(index=index), expected[index])
+    residuals = model.residuals()
+    np.testing.assert_equal(model.residuals(index=index), residuals[index])
+    mask = np.arange(10) % 2 == 0
+    np.testing.assert_equal(model.residuals(index=mask), residuals[mask])
+    # Returned residuals are not overwritten by later evaluations
+    model.residuals(params=model.params)
+    np.testing.assert_equal(model.residuals(), residuals)
+    # Observations are returned as new arrays
+    observed = model.observed()
+    observed += 1
+    np.testing.assert_equal(model.observed(), observed - 1)
+    # Layout is rebuilt once invalidated
+    matches[1].weights = np.arange(6.)
+    matches[1].filter(n_best=3)
+    model.invalidate()
+    np.testing.assert_equal(model.control_breaks, (0, 4, 10))
+    np.testing.assert_equal(model.observed(), np.vstack([m.observed() for m in matches]))
+    np.testing.assert_equal(model.control_breaks, (0, 4, 7))
+    model.weights = None
+    assert model.residuals().shape == (7, 2)
+
+def test_observer_cameras_fit(tol=1e-6):
+    np.random.seed(0)
+    path = os.path.join(test_dir, 'AK10b_20141013_020336.JPG')
+    exif = glimpse.Exif(path)
+    start = datetime.datetime(2014, 1, 1)
+    images = [glimpse.Image(path, exif=exif, datetime=start + datetime.timedelta(hours=i),
+        cam=glimpse.Camera(viewdir=(0.5 * i, 0, 0), imgsz=(800, 600), f=(600, 600)))
+        for i in range(5)]
+    viewdirs = np.vstack([img.cam.viewdir for img in images])
+    pairs = [(i, j) for i in range(5) for j in range(i + 1, min(i + 3, 5))]
+    data = []
+    for i, j in pairs:
+        uv = np.random.uniform((100, 100), (700, 500), size=(20, 2))
+        dxyz = images[i].cam.invproject(uv)
+        data.append(glimpse.optimize.RotationMatchesXYZ((images[i].cam, images[j].cam),
+            uvs=(uv, images[j].cam.project(dxyz, directions=True))))
+    for img in images[1:]:
+        img.cam.viewdir = img.cam.viewdir + np.random.normal(0, 0.5, size=3)
+    observer = glimpse.Observer(images, cache=False)
+    rows, cols = zip(*pairs)
+    matches = types.SimpleNamespace(data=data, row=np.array(rows), col=np.array(cols))
+    model = glimpse.optimize.ObserverCameras(observer, matches=matches, anchors=[0])
+    result = model.fit()
+    assert np.abs(result.x.reshape(-1, 3) - viewdirs).max() < tol
+    # Rotation matrices are vectorized over view directions
+    R = glimpse.Camera._rotation_matrix(viewdirs)
+    np.testing.assert_allclose(R[2], glimpse.Camera(viewdir=viewdirs[2]).R)
+
+def test_ransac_rotation_model(tol=1e-6):
+    np.random.seed(0)
+    camA = glimpse.Camera(viewdir=(10, 5, -2), imgsz=(800, 600), f=(600, 600), k=(0.1, 0))
+    camB = glimpse.Camera(viewdir=(12, 4, -1), imgsz=(800, 600), f=(600, 600), k=(0.1, 0))
+    viewdir = camB.viewdir.copy()
+    uv = np.random.uniform((50, 50), (750, 550), size=(200, 2))
+    uvB = camB.project(camA.invproject(uv), directions=True)
+    outliers = np.arange(0, 200, 4)
+    uvB[outliers] += np.random.uniform(10, 50, size=(len(outliers), 2))
+    camB.viewdir = (10, 5, -2)
+    matches = glimpse.optimize.RotationMatches((camA, camB), (uv, uvB))
+    rotation = glimpse.optimize.RotationModel(matches, cam=1)
+    inliers = np.setdiff1d(np.arange(200), outliers)
+    assert np.abs(rotation.fit(inliers) - viewdir).max() < tol
+    assert rotation.errors(viewdir, inliers).max() < tol
+    # Errors do not modify the (shared) camera
+    assert np.array_equal(camB.viewdir, (10, 5, -2))
+    model = glimpse.optimize.Cameras((camA, camB), matches,
+        cam_params=(dict(), dict(viewdir=True)), scales=False, sparsity=False)
+    rvalues, rindex = glimpse.optimize.ransac(model, sample_size=3, max_error=1,
+        min_inliers=10, iterations=100, confidence=0.99, method='msac',
+        hypothesis=rotation.fit)
+    np.testing.assert_equal(rindex, inliers)
+    assert np.abs(rvalues - viewdir).max() < tol
+    # View directions are recovered from rotation matrices
+    assert np.abs(glimpse.Camera._rotation_matrix_viewdir(camA.R) - camA.viewdir).max() < tol
+
+def _rotation_pairs(n_images=4, n_points=50, outliers=10):
+    np.random.seed(0)
+    cams = [glimpse.Camera(viewdir=(2 * i, i, 0), imgsz=(800, 600), f=(600, 610), k=(0.1, 0))
+        for i in range(n_images)]
+    viewdirs = [cam.viewdir.copy() for cam in cams]
+    pairs, matches = [], []
+    for i in range(n_images):
+        for j in range(i + 1, n_images):
+            uv = np.random.uniform((300, 200), (500, 400), size=(n_points, 2))
+            uvB = cams[j].project(cams[i].invproject(uv), directions=True)
+            uvB[:outliers] += np.random.uniform(10, 50, size=(outliers, 2))
+            pairs.append((i, j))
+            matches.append(glimpse.optimize.Matches((cams[i], cams[j]), (uv, uvB),
+                weights=np.random.random(n_points)))
+    return cams, viewdirs, np.array(pairs), matches
+
+def test_match_store_filter():
+    cams, viewdirs, pairs, matches = _rotation_pairs()
+    store = glimpse.optimize.MatchStore.from_matches(cams, pairs, matches)
+    np.testing.assert_equal(store.offsets, np.arange(0, 301, 50))
+    np.testing.assert_allclose(store.predicted()[50:100], matches[1].predicted())
+    params = dict(max_distance=0.25, max_error=0.01, min_weight=0.1, scaled=True)
+    store.filter(**params)
+    for k, m in enumerate(matches):
+        m.filter(**params)
+        index = slice(store.offsets[k], store.offsets[k + 1])
+        np.testing.assert_equal(store.uvs[0][index], m.uvs[0])
+        np.testing.assert_equal(store.weights[index], m.weights)
+    assert store.size < 300 and store.sizes.min() > 5
+    store.filter(n_best=5)
+    assert (store.sizes == 5).all()
+    xyz = store.to_matches(glimpse.optimize.RotationMatchesXYZ)
+    np.testing.assert_allclose(xyz[0].xys[1], cams[1]._image2camera(store.uvs[1][:5]))
+
+def test_match_store_filter_normalized():
+    cams, viewdirs, pairs, matches = _rotation_pairs()
+    matches = [glimpse.optimize.RotationMatchesXY(m.cams, uvs=m.uvs, weights=m.weights)
+        for m in matches]
+    store = glimpse.optimize.MatchStore.from_matches(cams, pairs, matches)
+    # Errors in normalized camera coordinates, as for RotationMatchesXY.filter()
+    store.filter(max_error=0.01, normalized=True)
+    for k, m in enumerate(matches):
+        m.filter(max_error=0.01)
+        index = slice(store.offsets[k], store.offsets[k + 1])
+        np.testing.assert_equal(store.xys[0][index], m.xys[0])
+    assert store.size < 300 and store.sizes.min() > 5
+
+def test_match_store_ransac(tol=1e-6):
+    cams, viewdirs, pairs, matches = _rotation_pairs()
+    for cam in cams:
+        cam.viewdir = cam.viewdir + np.random.normal(0, 1, size=3)
+    store = glimpse.optimize.MatchStore.from_matches(cams, pairs, matches)
+    R = store.ransac(max_error=1, min_inliers=10, iterations=100, confidence=0.99)
+    np.testing.assert_equal(store.sizes, 40)
+    np.testing.assert_equal(store.uvs[0], np.vstack([m.uvs[0][10:] for m in matches]))
+    # Relative rotations are independent of the (wrong) absolute view directions
+    Ri, Rj = [glimpse.Camera(viewdir=viewdirs[k]).R for k in pairs[0]]
+    np.testing.assert_allclose(R[0], Ri.dot(Rj.T), atol=tol)
+
+def test_ransac_samples():
+    np.random.seed(0)
+    sizes = np.array([4, 5, 100] * 1000)
+    samples = glimpse.optimize._ransac_samples(sizes, 3)
+    # Samples are drawn without replacement
+    assert np.all((samples >= 0) & (samples < sizes.reshape(-1, 1)))
+    samples.sort(axis=1)
+    assert np.all(np.diff(samples, axis=1) > 0)
+    # All indices are equally likely
+    counts = np.bincount(samples[sizes == 4].ravel(), minlength=4)
+    assert np.allclose(counts / counts.sum(), 0.25, atol=0.02)
+
+def test_match_database(tmpdir):
+    np.random.seed(0)
+    uvs = [np.random.random((5, 2)), np.random.random((5, 2))]
+    weights = np.random.random(5)
+    path = str(tmpdir.join('matches.db'))
+    with glimpse.optimize.MatchDatabase(path) as db:
+        db.write([('a', 'b'), ('b', 'c-d')], [uvs, uvs], [weights, None])
+        # Existing matches are not replaced
+        db.write([('a', 'b')], [[uvs[1], uvs[0]]])
+        assert len(db) == 2 and ('b', 'c-d') in db
+        matches = db.read(images=['a', 'b'])
+        assert list(matches) == [('a', 'b')]
+        np.testing.assert_equal(matches[('a', 'b')][0][1], uvs[1])
+        np.testing.assert_equal(matches[('a', 'b')][1], weights)
+        # Arrays read from the database are writeable
+        (uvA, uvB), w = matches[('a', 'b')]
+        uvA += 1
+        w *= 2
+        np.testing.assert_equal(uvB, uvs[1])
+        assert db.read(pairs=[('b', 'c-d')])[('b', 'c-d')][1] is None
+        # Arguments may be generators
+        db.write((pair for pair in [('x', 'y')]), (uv for uv in [uvs]))
+        assert ('x', 'y') in db
+    # Import pickle files
+    matches = glimpse.optimize.Matches(
+        (glimpse.Camera(), glimpse.Camera()), uvs, weights=weights)
+    glimpse.helpers.write_pickle(matches, str(tmpdir.join('pickles', 'c-d-e.pkl')))
+    db = glimpse.optimize.MatchDatabase(path)
+    assert db.import_pickles(str(tmpdir.join('pickles')), basenames=('c-d', 'e')) == 1
+    np.testing.assert_equal(db.read(pairs=[('c-d', 'e')])[('c-d', 'e')][0][0], uvs[0])
+    # Files are imported in batches
+    for name in ('f-g', 'g-h', 'h-i'):
+        glimpse.helpers.write_pickle(matches, str(tmpdir.join('pickles', name + '.pkl')))
+    assert db.import_pickles(str(tmpdir.join('pickles')),
+        basenames=('c-d', 'e', 'f', 'g', 'h', 'i'), overwrite=True, batch_size=2) == 4
+    assert len(db) == 7
+
+def test_keypoints_array(tmpdir):
+    import cv2
+    np.random.seed(0)
+    xy = np.random.uniform(0, 100, size=(20, 2))
+    keypoints = [cv2.KeyPoint(x, y, 5) for x, y in xy]
+    descriptors = np.random.random((20, 8)).astype(np.float32)
+    array = glimpse.helpers.keypoints_to_array(keypoints)
+    assert np.allclose(glimpse.helpers.keypoint_coordinates(array), xy, atol=1e-4)
+    path = str(tmpdir.join('keypoints.npy'))
+    glimpse.helpers.write_keypoints((keypoints, descriptors), path)
+    ka = glimpse.helpers.read_keypoints(path)
+    assert isinstance(ka[0], np.memmap) and isinstance(ka[1], np.memmap)
+    # Descriptors are memory-mapped as a separate contiguous array
+    assert ka[1].flags.c_contiguous and ka[1].dtype == np.float32
+    assert np.array_equal(ka[1], descriptors)
+    # Structured keypoints match identically to cv2.KeyPoint objects
+    kb = (keypoints[::-1], descriptors[::-1])
+    uvA, uvB = glimpse.optimize.match_keypoints(ka, kb, max_ratio=None)
+    uvA0, uvB0 = glimpse.optimize.match_keypoints((keypoints, descriptors), kb, max_ratio=None)
+    assert np.allclose(uvA, uvA0, atol=1e-4) and np.allclose(uvB, uvB0, atol=1e-4)
+    assert np.allclose(uvA, uvB, atol=1e-4)
+
+def test_match_keypoints_ratios():
+    np.random.seed(0)
+    n = 50
+    uv = np.random.uniform(0, 100, size=(n, 2))
+    keypoints = glimpse.helpers.keypoints_to_array(
+        [types.SimpleNamespace(pt=xy, size=1, angle=0, response=0, octave=0) for xy in uv])
+    descriptors = np.random.random((n, 8)).astype(np.float32)
+    da, db = descriptors, descriptors + 1e-3
+    query, train, distances = glimpse.optimize._knn_match(da, db, k=2)
+    uvA, uvB, ratios = glimpse.optimize.match_keypoints((keypoints, da), (keypoints, db),
+        max_ratio=0.5, return_ratios=True)
+    expected = distances[:, 0] / distances[:, 1]
+    assert np.allclose(np.sort(ratios), np.sort(expected[expected < 0.5]))
+    assert np.allclose(uvA, uvB)
+    uvA, uvB = glimpse.optimize.match_keypoints((keypoints, da), (keypoints[::-1], db[::-1]),
+        max_distance=1)
+    assert np.allclose(uvA, uvB)
+    # Two exact matches are ambiguous
+    uvA, uvB = glimpse.optimize.match_keypoints((keypoints, da),
+        (np.concatenate((keypoints, keypoints)), np.vstack((da, da))), max_ratio=0.5)
+    assert len(uvA) == 0
+    uvA, uvB, ratios = glimpse.optimize.match_keypoints((keypoints, da),
+        (np.concatenate((keypoints, keypoints)), np.vstack((da, da))), return_ratios=True)
+    assert len(uvA) == n and np.all(ratios == 1)
+
+def test_flann_index_cache():
+    np.random.seed(0)
+    descriptors = [np.random.random((20, 8)).astype(np.float32) for _ in range(3)]
+    cache = glimpse.optimize.FlannIndexCache(maxsize=2)
+    for i in (0, 1, 0, 2):
+        index = cache.get(i, lambda: descriptors[i])
+    assert (cache.hits, cache.misses) == (1, 3)
+    # Least recently used index (1) is discarded
+    assert 0 in cache and 2 in cache and 1 not in cache
+    # Cached index returns same matches as a new index
+    query, train, distances = glimpse.optimize._knn_match(
+        descriptors[2], descriptors[2], k=1, index=index)
+    assert np.array_equal(train[:, 0], query)
+    assert np.allclose(distances, 0)
+
+def test_match_keypoints_guided():
+    np.random.seed(0)
+    n = 200
+    uv = np.random.uniform(0, 1000, size=(n, 2))
+    descriptors = np.random.random((n, 8)).astype(np.float32)
+    keypoints = glimpse.helpers.keypoints_to_array(
+        [types.SimpleNamespace(pt=xy, size=1, angle=0, response=0, octave=0) for xy in uv])
+    ka = keypoints, descriptors
+    # Image B is shifted by 100 pixels, with keypoints in reverse order
+    kb = keypoints[::-1].copy(), descriptors[::-1].copy()
+    kb[0]['x'] += 100
+    predicted = uv + (100, 0)
+    uvA, uvB = glimpse.optimize.match_keypoints(ka, kb,
+        max_distance=10, predicted=predicted)
+    assert len(uvA) == n
+    assert np.allclose(uvB - uvA, (100, 0), atol=1e-3)
+    # Keypoints are only matched within the window
+    uvA, uvB = glimpse.optimize.match_keypoints(ka, kb,
+        max_distance=10, predicted=uv)
+    assert np.all(np.linalg.norm(uvB - uvA, axis=1) <= 10)
+    # Keypoints with a single candidate have no ratio, but are kept
+    uvA, uvB, ratios = glimpse.optimize.match_keypoints(ka,
+        kb, max_distance=1e-3, predicted=predicted, max_ratio=0.8,
+        return_ratios=True)
+    assert len(uvA) == n and np.all(np.isnan(ratios))
+    # Keypoints predicted behind the camera (NaN) have no candidates
+    predicted_nan = predicted.copy()
+    predicted_nan[:10] = np.nan
+    uvA, uvB = glimpse.optimize.match_keypoints(ka,
+        kb, max_distance=10, predicted=predicted_nan)
+    assert len(uvA) == n - 10
+    # Mask of permissible matches is applied
+    mask = np.ones((n, n), dtype=np.uint8)
+    mask[0] = 0
+    uvA, uvB = glimpse.optimize.match_keypoints(ka,
+        kb, max_distance=10, predicted=predicted, mask=mask)
+    assert len(uvA) == n - 1 and not np.any(np.all(uvA == uv[0], axis=1))
+
+class _ArrayImage(object):
+    """Image read from an array and resized to the camera image size."""
+
+    def __init__(self, I, datetime):
+        self.path = str(datetime)
+        self.datetime = datetime
+        self.cam = glimpse.Camera(imgsz=I.shape[1::-1], f=(100, 100))
+        self.I = None
+        self.keypoints = None
+        self.keypoints_path = None
+        self.anchor = False
+        self._I = I
+
+    def read(self, box=None, cache=True):
+        import cv2
+        I = cv2.resize(self._I, tuple(self.cam.imgsz.astype(int)),
+            interpolation=cv2.INTER_AREA)
+        return I if box is None else I[box[1]:box[3], box[0]:box[2]]
+
+    def read_keypoints(self):
+        return self.keypoints
+
+def test_build_matches_guided_weights():
+    np.random.seed(0)
+    images = [_ArrayImage(np.zeros((200, 300), dtype=np.uint8),
+        datetime.datetime(2000, 1, 1, i)) for i in range(2)]
+    n = 50
+    uv = np.random.uniform((10, 10), (290, 190), size=(n, 2))
+    descriptors = np.random.random((n, 8)).astype(np.float32)
+    keypoints = glimpse.helpers.keypoints_to_array(
+        [types.SimpleNamespace(pt=xy, size=1, angle=0, response=0, octave=0) for xy in uv])
+    for img in images:
+        img.keypoints = keypoints, descriptors
+    matcher = glimpse.optimize.KeypointMatcher(images)
+    # Each keypoint is the only candidate in its window
+    with np.errstate(divide='raise'):
+        matcher.build_matches(guided=True, max_distance=1e-3, max_ratio=0.8,
+            weights=True, clear_keypoints=False)
+    match = matcher.matches.data[0]
+    assert match.size == n
+    np.testing.assert_equal(match.weights, 1)
+
+def test_build_keypoints_threads():
+    import cv2
+    np.random.seed(0)
+    I = (np.random.random((200, 300)) * 255).astype(np.uint8)
+    I = cv2.normalize(cv2.GaussianBlur(I, (0, 0), 2), None, 0, 255, cv2.NORM_MINMAX)
+    images = [_ArrayImage(I, datetime.datetime(2000, 1, 1, i)) for i in range(3)]
+    matcher = glimpse.optimize.KeypointMatcher(images, clahe=True)
+    # Threads do not require keypoints_path
+    matcher.build_keypoints(parallel=2, backend='thread')
+    assert all(len(img.keypoints[0]) > 0 for img in images)
+    # Keypoints detected at half size are scaled to camera image size
+    keypoints = [img.keypoints for img in images]
+    for img in images:
+        img.keypoints = None
+    matcher.build_keypoints(parallel=2, backend='thread', size=0.5, as_array=True)
+    assert all(img.cam.imgsz[0] == 300 for img in images)
+    uv = glimpse.helpers.keypoint_coordinates(images[0].keypoints[0])
+    assert uv[:, 0].max() > 200
+    uvA, uvB = glimpse.optimize.match_keypoints(keypoints[0], images[0].keypoints,
+        max_ratio=0.8)
+    assert len(uvA) > 0 and np.median(np.linalg.norm(uvA - uvB, axis=1)) < 2
+
+def test_observer_cameras_append_images(tol=1e-6):
+    np.random.seed(0)
+    path = os.path.join(test_dir, 'AK10b_20141013_020336.JPG')
+    exif = glimpse.Exif(path)
+    start = datetime.datetime(2014, 1, 1)
+    images = [glimpse.Image(path, exif=exif, datetime=start + datetime.timedelta(hours=i),
+        cam=glimpse.Camera(viewdir=(0.5 * i, 0, 0), imgsz=(800, 600), f=(600, 600)))
+        for i in range(5)]
+    viewdirs = np.vstack([img.cam.viewdir for img in images])
+    # Keypoints are projections of the same rays with the same descriptors
+    dxyz = images[0].cam.invproject(np.random.uniform((100, 100), (700, 500), size=(50, 2)))
+    descriptors = np.random.random((50, 8)).astype(np.float32)
+    for img in images:
+        uv = img.cam.project(dxyz, directions=True)
+        keypoints = [types.SimpleNamespace(pt=xy, size=1, angle=0, response=0, octave=0)
+            for xy in uv]
+        img.keypoints = glimpse.helpers.keypoints_to_array(keypoints), descriptors
+    for img in images[1:]:
+        img.cam.viewdir = img.cam.viewdir + np.random.normal(0, 0.5, size=3)
+    observer = glimpse.Observer(images[:3], cache=False)
+    model = glimpse.optimize.ObserverCameras(observer, anchors=[0])
+    model.build_matches(clear_keypoints=False)
+    assert model.matches.shape == (3, 3) and len(model.matches.data) == 3
+    model.fit()
+    assert np.abs(model.solution - viewdirs[:3]).max() < tol
+    # Only pairs with new images are matched
+    model.append_images(images[3:], maxdt=datetime.timedelta(hours=2), clear_keypoints=False)
+    assert model.matches.shape == (5, 5)
+    pairs = set(zip(model.matches.row, model.matches.col))
+    assert pairs == {(0, 1), (0, 2), (1, 2), (1, 3), (2, 3), (2, 4), (3, 4)}
+    result = model.fit(warm_start=True)
+    assert np.abs(result.x.reshape(-1, 3) - viewdirs).max() < tol
+
+def test_observer_cameras_fit_segments(tol=1e-6):
+    np.random.seed(0)
+    path = os.path.join(test_dir, 'AK10b_20141013_020336.JPG')
+    exif = glimpse.Exif(path)
+    start = datetime.datetime(2014, 1, 1)
+    images = [glimpse.Image(path, exif=exif, datetime=start + datetime.timedelta(hours=i),
+        cam=glimpse.Camera(viewdir=(0.5 * i, 0, 0), imgsz=(800, 600), f=(600, 600)))
+        for i in range(6)]
+    viewdirs = np.vstack([img.cam.viewdir for img in images])
+    # Two segments (0, 1, 2) and (3, 4, 5), each with an anchor
+    pairs = [(0, 1), (0, 2), (1, 2), (3, 4), (3, 5), (4, 5)]
+    data = []
+    for i, j in pairs:
+        uv = np.random.uniform((100, 100), (700, 500), size=(20, 2))
+        dxyz = images[i].cam.invproject(uv)
+        data.append(glimpse.optimize.RotationMatchesXYZ((images[i].cam, images[j].cam),
+            uvs=(uv, images[j].cam.project(dxyz, directions=True))))
+    for img in images:
+        if img is not images[0] and img is not images[3]:
+            img.cam.viewdir = img.cam.viewdir + np.random.normal(0, 0.5, size=3)
+    observer = glimpse.Observer(images, cache=False)
+    rows, cols = zip(*pairs)
+    matches = glimpse.optimize.SparseMatches(data, rows, cols)
+    model = glimpse.optimize.ObserverCameras(observer, matches=matches, anchors=[0, 3])
+    segments = model.segments()
+    assert [list(idx) for idx in segments] == [[0, 1, 2], [3, 4, 5]]
+    result = model.fit(segments=True, method='l-bfgs-b',
+        options=dict(maxcor=10, ftol=1e-15), parallel=2)
+    assert result.success and len(result.results) == 2
+    assert np.abs(result.x.reshape(-1, 3) - viewdirs).max() < tol
+
+def test_observer_cameras_fit_online(tol=1e-6):
+    np.random.seed(0)
+    path = os.path.join(test_dir, 'AK10b_20141013_020336.JPG')
+    exif = glimpse.Exif(path)
+    start = datetime.datetime(2014, 1, 1)
+    n = 8
+    images = [glimpse.Image(path, exif=exif, datetime=start + datetime.timedelta(hours=i),
+        cam=glimpse.Camera(viewdir=(0.5 * i, 0, 0), imgsz=(800, 600), f=(600, 600)))
+        for i in range(n)]
+    viewdirs = np.vstack([img.cam.viewdir for img in images])
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, min(i + 3, n))]
+    data = []
+    for i, j in pairs:
+        uv = np.random.uniform((100, 100), (700, 500), size=(20, 2))
+        dxyz = images[i].cam.invproject(uv)
+        data.append(glimpse.optimize.RotationMatchesXYZ((images[i].cam, images[j].cam),
+            uvs=(uv, images[j].cam.project(dxyz, directions=True))))
+    for img in images[1:]:
+        img.cam.viewdir = img.cam.viewdir + np.random.normal(0, 0.5, size=3)
+    observer = glimpse.Observer(images, cache=False)
+    rows, cols = zip(*pairs)
+    matches = glimpse.optimize.SparseMatches(data, rows, cols)
+    model = glimpse.optimize.ObserverCameras(observer, matches=matches, anchors=[0])
+    result = model.fit_online(window=3)
+    assert np.abs(result.x.reshape(-1, 3) - viewdirs).max() < tol
+    # Cameras are reset to their original view directions
+    assert np.abs(images[1].cam.viewdir - viewdirs[1]).max() > tol
+    # Restart from the middle of the previous solution
+    previous = model.solution.copy()
+    result = model.fit_online(window=2, start=4)
+    assert np.abs(result.x.reshape(-1, 3) - viewdirs).max() < tol
+    # Images before start are held, even in the window of later images
+    np.testing.assert_equal(result.x.reshape(-1, 3)[:4], previous[:4])
+    # Matches must be from earlier to later images
+    model.matches = glimpse.optimize.SparseMatches(data, cols, rows)
+    with pytest.raises(ValueError):
+        model.fit_online(window=2, start=0)
+
+def _render_rotations(viewdirs, imgsz=(480, 360), f=(480, 480), sigma=1.5, noise=0.3):
+    """Render images of a textured panorama seen by rotated cameras."""
+    import cv2
+    imgsz = np.array(imgsz)
+    panorama = glimpse.Camera(imgsz=3 * imgsz, f=f)
+    texture = (np.random.random((3 * imgsz[1] // 8, 3 * imgsz[0] // 8)) * 255).astype(np.float32)
+    texture = cv2.resize(texture, tuple(3 * imgsz), interpolation=cv2.INTER_CUBIC)
+    texture = cv2.normalize(cv2.GaussianBlur(texture, (0, 0), sigma), None, 0, 255,
+        cv2.NORM_MINMAX).astype(np.uint8)
+    u, v = np.meshgrid(np.arange(imgsz[0]) + 0.5, np.arange(imgsz[1]) + 0.5)
+    uv = np.column_stack((u.ravel(), v.ravel()))
+    images = []
+    for i, viewdir in enumerate(viewdirs):
+        cam = glimpse.Camera(imgsz=imgsz, f=f, viewdir=viewdir)
+        puv = panorama.project(cam.invproject(uv), directions=True).astype(np.float32) - 0.5
+        I = cv2.remap(texture, puv[:, 0].reshape(imgsz[::-1]), puv[:, 1].reshape(imgsz[::-1]),
+            cv2.INTER_LINEAR)
+        images.append(_ArrayImage(I, datetime.datetime(2000, 1, 1, i)))
+        images[-1].cam = cam
+        if i > 0:
+            cam.viewdir = viewdir + np.random.normal(0, noise, size=3)
+    return images
+
+def test_observer_cameras_fit_coarse_to_fine(tol=0.01):
+    np.random.seed(0)
+    imgsz = (480, 360)
+    viewdirs = np.vstack(((0, 0, 0), np.random.normal(0, 1, size=(2, 3))))
+    images = _render_rotations(viewdirs, imgsz=imgsz)
+    observer = glimpse.Observer(images, cache=False)
+    model = glimpse.optimize.ObserverCameras(observer, anchors=[0])
+    boxes = model._grid_boxes(imgsz, n=(2, 2), size=(160, 160))
+    result = model.fit_coarse_to_fine(size=0.5, boxes=boxes, max_distance=10,
+        matches=dict(max_ratio=0.6))
+    assert np.abs(result.coarse.x.reshape(-1, 3) - viewdirs).max() < 10 * tol
+    assert np.abs(result.x.reshape(-1, 3) - viewdirs).max() < tol
+    # Keypoints are cleared and matches are from the boxes
+    assert all(img.keypoints is None for img in images)
+    uv = model.matches.data[0].uvs[0]
+    inside = [np.all((uv >= box[:2]) & (uv <= box[2:]), axis=1) for box in boxes]
+    assert np.any(inside, axis=0).all()
+
+def test_observer_cameras_fit_direct(tol=0.01):
+    np.random.seed(0)
+    viewdirs = np.vstack(((0, 0, 0), np.random.normal(0, 2, size=(2, 3))))
+    images = _render_rotations(viewdirs, imgsz=(320, 240), f=(320, 320), sigma=3, noise=1)
+    # Align to an anchor in the middle of the sequence
+    images[1].cam.viewdir = viewdirs[1]
+    observer = glimpse.Observer(images, cache=False)
+    model = glimpse.optimize.ObserverCameras(observer, anchors=[1])
+    result = model.fit_direct(levels=3)
+    assert result.success and not result.failed
+    assert np.abs(result.x.reshape(-1, 3) - viewdirs).max() < tol
+    assert np.abs(images[2].cam.viewdir - viewdirs[2]).max() > tol
+    # Alignments that do not converge are reported
+    result = model.fit_direct(levels=3, iterations=1, phase_correlation=False)
+    assert not result.success and result.failed == [0, 2]
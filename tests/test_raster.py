@@ -53,6 +53,25 @@ def test_raster_sample(tol=1e-13):
     dz_points = dem.sample(xy_diagonal) - dem.Z.diagonal()
     assert all(dz_points < tol)
 
+def test_raster_sample_grid_nan():
+    Z = np.arange(36, dtype=float).reshape(6, 6)
+    Z[2, 3] = np.nan
+    dem = glimpse.Raster(Z.copy(), (0, 6), (6, 0))
+    x = np.linspace(0.5, 5.5, 11)
+    y = np.linspace(5.5, 0.5, 11)
+    samples = dem.sample((x, y), grid=True)
+    # Z not modified
+    np.testing.assert_equal(dem.Z, Z)
+    # Only samples adjacent to missing value are missing
+    is_nan = np.zeros(samples.shape, dtype=bool)
+    is_nan[3:6, 5:8] = True
+    assert (np.isnan(samples) == is_nan).all()
+    # Spline is cached until Z changes
+    splines = dem._spline(kx=1, ky=1)
+    assert dem._spline(kx=1, ky=1) is splines
+    dem.Z = Z + 1
+    assert dem._spline(kx=1, ky=1) is not splines
+
 def test_raster_crop_ascending():
     Z = np.arange(9).reshape(3, 3)
     dem = glimpse.Raster(Z, (0, 3), (0, 3))
@@ -125,6 +144,36 @@ def test_raster_resize():
     assert all(rdem.d == dem.d / 2)
     assert all(rdem.xlim == dem.xlim)
 
+def test_lazy_raster_memmap(tmp_path):
+    Z = np.arange(400, dtype=float).reshape(20, 20)
+    path = str(tmp_path / 'Z.npy')
+    np.save(path, Z)
+    dem = glimpse.Raster(Z.copy(), (0, 20), (20, 0))
+    lazy = glimpse.LazyRaster(
+        np.load(path, mmap_mode='r'), (0, 20), (20, 0),
+        block_size=(5, 5), max_blocks=4)
+    assert (lazy.n == dem.n).all()
+    # Crop reads no values
+    dem.crop(xlim=(3, 17), ylim=(16, 2), zlim=(50, 350))
+    lazy.crop(xlim=(3, 17), ylim=(16, 2), zlim=(50, 350))
+    assert not lazy._blocks
+    np.testing.assert_equal(lazy.Z, dem.Z)
+    assert len(lazy._blocks) <= lazy.max_blocks
+    # Subsets and samples read only needed blocks
+    lazy._blocks.clear()
+    sub = lazy[1:4, 1:4]
+    assert isinstance(sub, glimpse.Raster)
+    np.testing.assert_equal(sub.Z, dem[1:4, 1:4].Z)
+    assert set(lazy._blocks) == {(1, 0), (1, 1)}
+    xy = np.array([(5.2, 10.1), (6.7, 9.3)])
+    np.testing.assert_allclose(lazy.sample(xy), dem.sample(xy))
+    # Shifts are applied on read
+    lazy.shift(dz=1)
+    np.testing.assert_equal(lazy[::2, ::3].Z, dem[::2, ::3].Z + 1)
+    # Setting Z loads raster into memory
+    lazy.resize(0.5)
+    assert not lazy.lazy and not lazy._blocks
+
 def test_raster_io():
     old = glimpse.Raster(
         Z=np.array([(0, 0, 0), (0, np.nan, 0), (1, 1, 1)], dtype=float),
@@ -189,3 +238,57 @@ def test_raster_interpolant():
             # Test whether Raster.datetime set when appropriate
             assert imean.datetime == xi
             assert isigma.datetime == xi
+
+def test_raster_interpolant_cache():
+    means = [
+        glimpse.Raster(np.zeros((4, 4)), x=(0, 4), y=(4, 0)),
+        glimpse.Raster(np.ones((4, 4)), x=(0, 4), y=(4, 0)),
+        glimpse.Raster(np.full((4, 4), 3.0), x=(0, 4), y=(4, 0))]
+    interpolant = glimpse.RasterInterpolant(means=means, x=(0, 1, 2), max_pairs=1)
+    assert (interpolant(0.25).Z == 0.25).all()
+    assert len(interpolant._pairs) == 1
+    pair = next(iter(interpolant._pairs.values()))
+    # Cached pair reused for all xi between the same Rasters
+    mean, sigma = interpolant(0.75, return_sigma=True)
+    assert (mean.Z == 0.75).all()
+    assert next(iter(interpolant._pairs.values())) is pair
+    # Cache limited in size
+    assert (interpolant(1.5).Z == 2).all()
+    assert len(interpolant._pairs) == 1
+    assert next(iter(interpolant._pairs.values())) is not pair
+    # Cache cleared when means are set
+    interpolant.means = means[::-1]
+    assert not interpolant._pairs
+    assert (interpolant(1.5).Z == 0.5).all()
+
+def test_raster_interpolant_iterate():
+    means = [
+        glimpse.Raster(np.zeros((4, 4)), x=(0, 4), y=(4, 0)),
+        glimpse.Raster(np.ones((4, 4)), x=(0, 4), y=(4, 0)),
+        glimpse.Raster(np.full((8, 8), 3.0), x=(0, 4), y=(4, 0))]
+    sigmas = [0.1, 0.2, 0.3]
+    x = [datetime.datetime(2000, 1, 1), datetime.datetime(2000, 1, 2),
+        datetime.datetime(2000, 1, 4)]
+    interpolant = glimpse.RasterInterpolant(means=means, x=x, sigmas=sigmas)
+    xi = [x[0] + datetime.timedelta(hours=6 * i) for i in range(12)]
+    results = interpolant.iterate(xi, return_sigma=True, chunk_size=3)
+    assert not isinstance(results, (list, tuple))
+    for xik, (mean, sigma) in zip(xi, results):
+        imean, isigma = interpolant(xik, return_sigma=True)
+        assert mean.datetime == xik and sigma.datetime == xik
+        np.testing.assert_equal(mean.Z, imean.Z)
+        np.testing.assert_allclose(sigma.Z, isigma.Z)
+
+def test_raster_fill_crevasses_tiled():
+    Z = np.random.RandomState(0).normal(size=(60, 50))
+    mask = Z > -1
+    dem = glimpse.Raster(Z)
+    tiled = dem.copy()
+    dem.fill_crevasses(mask=mask)
+    tiled.fill_crevasses(mask=mask, tile_size=(16, 16))
+    np.testing.assert_equal(tiled.Z, dem.Z)
+    tiled = glimpse.Raster(Z)
+    tiled.fill_crevasses(mask=mask, fill=True, tile_size=(16, 16), parallel=2)
+    dem = glimpse.Raster(Z)
+    dem.fill_crevasses(mask=mask, fill=True)
+    np.testing.assert_equal(tiled.Z, dem.Z)